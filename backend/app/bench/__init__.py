@@ -0,0 +1 @@
+# Benchmarks (python -m app.bench.rpa)
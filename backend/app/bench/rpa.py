@@ -0,0 +1,364 @@
+"""
+RPA Throughput Benchmark
+Drives concurrent fills against the local /demo-govt portals and saves the numbers as JSON
+
+    python -m app.bench.rpa                      # start the app, both engines, 3 rounds
+    python -m app.bench.rpa --engine http --concurrency 8 --rounds 10
+    python -m app.bench.rpa --base-url http://localhost:8000 --compare bench-results/previous.json
+
+Every round fills each supplier in SUPPLIER_TEMPLATES once. The ``http``
+engine is the browserless submitter; the ``browser`` engine navigates,
+fills the form with one batch_fill round trip and submits it. A fill counts
+as successful when the reply carries a confirmation number.
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import socket
+import argparse
+import platform
+import threading
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# One applicant covering the inputs of every demo template
+SAMPLE_DATA = {
+    "city": "Ahmedabad",
+    "district": "Ahmedabad",
+    "zone": "East Zone",
+    "taluka": "Daskroi",
+    "village": "Bopal",
+    "survey_number": "123/4",
+    "bp_number": "BP100200",
+    "new_name": "Bench Applicant",
+    "mobile": "9876543210",
+    "email": "bench@example.com",
+    "address": "1 Benchmark Road, Ahmedabad",
+}
+
+
+def percentile(samples: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q * len(ordered)))
+    return round(ordered[rank - 1], 1)
+
+
+def latency_summary(samples: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(samples),
+        "mean_ms": round(sum(samples) / len(samples), 1) if samples else None,
+        "p50_ms": percentile(samples, 0.50),
+        "p95_ms": percentile(samples, 0.95),
+        "p99_ms": percentile(samples, 0.99),
+        "max_ms": round(max(samples), 1) if samples else None,
+    }
+
+
+class RSSSampler:
+    """Samples the resident memory of process trees in the background and keeps the peaks"""
+
+    def __init__(self, pids: Dict[str, int], interval: float = 0.25):
+        self.pids = pids
+        self.interval = interval
+        self.peaks = {name: 0 for name in pids}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bench-rss", daemon=True)
+
+    def _run(self):
+        from app.services.process_memory import process_tree_rss
+        while True:
+            for name, pid in self.pids.items():
+                self.peaks[name] = max(self.peaks[name], process_tree_rss(pid))
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def peaks_mb(self) -> Dict[str, float]:
+        from app.services.process_memory import peak_rss_self
+        peaks = {name: round(value / 2 ** 20, 1) for name, value in self.peaks.items()}
+        if not peaks.get("bench"):
+            # No /proc: at least report this process
+            peaks["bench"] = round(peak_rss_self() / 2 ** 20, 1)
+        return peaks
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, timeout: float = 60) -> subprocess.Popen:
+    """Run the app with uvicorn and wait until the demo portal answers"""
+    import httpx
+
+    env = dict(os.environ, RPA_EXECUTION_MODE="workers", RPA_DRIVER_POOL_PREWARM="0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"App exited with code {server.returncode} during start-up")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/demo-govt/torrent-power", timeout=2).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    server.terminate()
+    raise RuntimeError(f"App did not answer on port {port} within {timeout:.0f}s")
+
+
+def build_tasks(rounds: int) -> List[Dict[str, Any]]:
+    from app.routers.demo_government_simple import SUPPLIER_TEMPLATES
+
+    tasks = []
+    for round_index in range(rounds):
+        for supplier_id, template in SUPPLIER_TEMPLATES.items():
+            serial = f"{round_index:02d}{len(tasks):05d}"
+            data = dict(SAMPLE_DATA, consumer_number=f"BENCH{serial}", connection_id=f"WC{serial}")
+            tasks.append({"supplier": supplier_id, "recipe": f"demo-{template}", "data": data})
+    return tasks
+
+
+def _fill_http(task: Dict[str, Any], state: Dict[str, Any]) -> bool:
+    from app.services.http_submitter import submit_http, http_client
+
+    if "client" not in state:
+        state["client"] = http_client()
+    return submit_http(task["recipe"], task["data"], task["supplier"], client=state["client"])["success"]
+
+
+def _fill_browser(task: Dict[str, Any], state: Dict[str, Any]) -> bool:
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from app.config import get_settings
+    from app.services.batch_filler import batch_fill
+    from app.services.network_profiles import navigate
+    from app.services.recipe_engine import get_recipe_engine
+
+    driver = state["driver"]
+    plan = get_recipe_engine().recipe(task["recipe"]).http
+    defaults = plan.get("defaults", {})
+    fields = [
+        {"key": name, "selectors": [f"[name='{name}']"],
+         "value": next((task["data"][key] for key in sources if task["data"].get(key)), defaults.get(name))}
+        for name, sources in plan["fields"].items()
+    ]
+
+    url = plan["form_url"].format(demo_base_url=get_settings().DEMO_BASE_URL, supplier_id=task["supplier"])
+    navigate(driver, url, task["supplier"], headless=True)
+    batch_fill(driver, fields, highlight=False, portal=task["supplier"])
+    driver.execute_script("document.getElementById('applicationForm').submit();")
+
+    pattern = re.compile(plan.get("confirmation_pattern", r"[A-Z]{2,}\d{6,}"))
+    try:
+        WebDriverWait(driver, 20).until(lambda d: pattern.search(d.find_element(By.TAG_NAME, "body").text))
+        return True
+    except Exception:
+        return False
+
+
+def _launch_driver() -> Dict[str, Any]:
+    from app.services.driver_pool import build_chrome_options, create_chrome_driver
+
+    started = time.monotonic()
+    driver = create_chrome_driver(build_chrome_options(headless=True))
+    return {"driver": driver, "startup_ms": (time.monotonic() - started) * 1000}
+
+
+def run_engine(engine: str, tasks: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    """Fill every task with ``concurrency`` workers, each keeping its own session"""
+    fill = _fill_http if engine == "http" else _fill_browser
+    lock = threading.Lock()
+    pending = list(reversed(tasks))
+    latencies: List[float] = []
+    per_template: Dict[str, List[float]] = {}
+    failures: Dict[str, int] = {}
+    startup_ms: List[float] = []
+
+    def worker():
+        state: Dict[str, Any] = {}
+        if engine == "browser":
+            launched = _launch_driver()
+            state["driver"] = launched["driver"]
+            with lock:
+                startup_ms.append(launched["startup_ms"])
+        try:
+            while True:
+                with lock:
+                    if not pending:
+                        return
+                    task = pending.pop()
+                started = time.monotonic()
+                try:
+                    ok = fill(task, state)
+                except Exception as e:
+                    print(f"  ✗ {task['supplier']}: {type(e).__name__}: {e}", file=sys.stderr)
+                    ok = False
+                elapsed = (time.monotonic() - started) * 1000
+                with lock:
+                    if ok:
+                        latencies.append(elapsed)
+                        per_template.setdefault(task["recipe"], []).append(elapsed)
+                    else:
+                        failures[task["supplier"]] = failures.get(task["supplier"], 0) + 1
+        finally:
+            if "driver" in state:
+                state["driver"].quit()
+            if "client" in state:
+                state["client"].close()
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    wall = time.monotonic() - started
+
+    result = {
+        "fills": len(tasks),
+        "succeeded": len(latencies),
+        "failed": sum(failures.values()),
+        "failures": failures,
+        "wall_seconds": round(wall, 2),
+        "fills_per_second": round(len(latencies) / wall, 2) if wall else None,
+        "latency": latency_summary(latencies),
+        "per_template": {recipe: latency_summary(samples) for recipe, samples in sorted(per_template.items())},
+    }
+    if engine == "browser":
+        result["driver_startup"] = latency_summary(startup_ms)
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]):
+    """Print throughput and tail-latency changes against an earlier result file"""
+    print(f"\nCompared with {previous['meta'].get('commit')} ({previous['meta'].get('timestamp')}):")
+    for engine, result in current["engines"].items():
+        before = previous.get("engines", {}).get(engine)
+        if not before:
+            continue
+        for label, path in (("fills/s", ("fills_per_second",)), ("p95 ms", ("latency", "p95_ms")),
+                            ("p99 ms", ("latency", "p99_ms"))):
+            now, then = result, before
+            for key in path:
+                now, then = (now or {}).get(key), (then or {}).get(key)
+            if now is not None and then:
+                print(f"  {engine:8} {label:8} {then:>9} -> {now:>9} ({(now - then) / then * 100:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark RPA fills against the local demo portals")
+    parser.add_argument("--engine", choices=("http", "browser", "both"), default="both")
+    parser.add_argument("--concurrency", type=int, default=4, help="parallel sessions per engine")
+    parser.add_argument("--rounds", type=int, default=3, help="fills per supplier")
+    parser.add_argument("--base-url", help="use a running app instead of starting one (e.g. http://localhost:8000)")
+    parser.add_argument("--output", help="result file (default bench-results/rpa-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.base_url:
+        base_url = args.base_url.rstrip("/")
+    else:
+        port = _free_port()
+        print(f"🚀 Starting the app on port {port}...")
+        server = start_server(port)
+        base_url = f"http://127.0.0.1:{port}"
+
+    # Point the engines at the local demo portals before any settings are read
+    os.environ["DEMO_BASE_URL"] = f"{base_url}/demo-govt"
+
+    engines = ("http", "browser") if args.engine == "both" else (args.engine,)
+    try:
+        from app.services.chrome_binaries import chrome_binaries_info, resolve_chrome_binaries
+
+        tasks = build_tasks(args.rounds)
+        pids = {"bench": os.getpid()}
+        if server:
+            pids["server"] = server.pid
+
+        results: Dict[str, Any] = {}
+        with RSSSampler(pids) as sampler:
+            binaries_ms = None
+            if "browser" in engines:
+                started = time.monotonic()
+                resolve_chrome_binaries()
+                binaries_ms = round((time.monotonic() - started) * 1000, 1)
+
+            for engine in engines:
+                print(f"⏱️  {engine}: {len(tasks)} fills, {args.concurrency} concurrent...")
+                results[engine] = run_engine(engine, tasks, args.concurrency)
+                latency = results[engine]["latency"]
+                print(f"   {results[engine]['fills_per_second']} fills/s, p50 {latency['p50_ms']} ms, "
+                      f"p95 {latency['p95_ms']} ms, p99 {latency['p99_ms']} ms, "
+                      f"{results[engine]['failed']} failed")
+
+        report = {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "concurrency": args.concurrency,
+                "rounds": args.rounds,
+                "suppliers": len({task["supplier"] for task in tasks}),
+                "base_url": base_url,
+                "chrome": chrome_binaries_info() if "browser" in engines else None,
+                "binary_resolution_ms": binaries_ms,
+            },
+            "engines": results,
+            "peak_rss_mb": sampler.peaks_mb(),
+        }
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    output = args.output or os.path.join(
+        "bench-results", f"rpa-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Saved {output} (peak RSS {report['peak_rss_mb']} MB)")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+    failed = sum(result["failed"] for result in results.values())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
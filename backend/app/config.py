@@ -41,6 +41,78 @@ class Settings(BaseSettings):
     RPA_MODE: str = "DEMO"  # DEMO, STAGING, PRODUCTION
     DEMO_BASE_URL: str = "http://localhost:8000/demo-govt"
     
+    # RPA Browser Pool
+    RPA_DRIVER_POOL_SIZE: int = 3  # Max concurrent headless Chrome drivers
+    RPA_VISIBLE_DRIVER_POOL_SIZE: int = 1  # Max visible drivers for login-assisted flows
+    RPA_DRIVER_POOL_PREWARM: int = 1  # Drivers launched at startup
+    RPA_DRIVER_MAX_USES: int = 25  # Recycle a driver after this many jobs
+    RPA_DRIVER_CHECKOUT_TIMEOUT: int = 60  # Seconds to wait for a free driver
+    RPA_BROWSER_BACKEND: str = "pool"  # pool (one Chrome per job) or contexts (shared Chrome, per-job contexts)
+    RPA_MAX_BROWSER_CONTEXTS: int = 8  # Concurrent jobs per shared Chrome in contexts mode
+    RPA_CHROMEDRIVER_PATH: str = ""  # Empty = system ChromeDriver, then webdriver-manager
+    RPA_CHROME_BINARY: str = ""  # Empty = first Chrome/Chromium found in /usr/bin
+    RPA_CHROME_BINARY_CACHE: str = "data/chrome_binaries.json"  # Resolved paths and versions, re-checked by stat
+    
+    # RPA Memory Governor (0 disables a limit)
+    RPA_MEMORY_DRIVER_MAX_MB: int = 1024  # Recycle a driver whose ChromeDriver/Chrome process tree grew past this
+    RPA_MEMORY_PRESSURE_PERCENT: float = 85  # Container memory use at which drivers are recycled and checkouts wait
+    RPA_MEMORY_SHM_MAX_PERCENT: float = 80  # Same for /dev/shm usage
+    RPA_MEMORY_CHECKOUT_WAIT: int = 30  # Seconds a checkout waits for headroom before it is refused
+    RPA_MEMORY_SAMPLE_SECONDS: float = 2.0  # Container memory and /dev/shm are re-read at most this often
+    RPA_MEMORY_DEFER_SECONDS: int = 30  # Queued browser jobs wait this long while memory is short
+    
+    # RPA Form Filling
+    RPA_DEMO_PACING: bool = False  # Add visible pauses between fields (demos only)
+    RPA_SELECTOR_CACHE_PATH: str = "data/selector_cache.json"  # Learned selectors per portal
+    RPA_NETWORK_PROFILE: str = "form-only"  # Headless resource blocking: form-only, interactive, full
+    RPA_NETWORK_BASELINE_RATE: float = 0.05  # Share of runs loaded unblocked for timing comparison
+    
+    # RPA Portal Limits (per supplier id, overridable with "rpa_limits" in services_data.json)
+    RPA_PORTAL_MAX_IN_FLIGHT: int = 2  # Concurrent sessions against one portal
+    RPA_PORTAL_RATE_PER_MINUTE: float = 10  # Token-bucket refill rate
+    RPA_PORTAL_BURST: int = 3  # Token-bucket capacity
+    RPA_BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive failures that open the breaker
+    RPA_BREAKER_RESET_SECONDS: int = 120  # Open time before a probe job is allowed
+    RPA_BREAKER_OPEN_ACTION: str = "defer"  # defer or fail jobs while a portal's breaker is open
+    
+    # RPA Screenshots
+    RPA_SCREENSHOT_DIR: str = "screenshots"
+    RPA_SCREENSHOT_FORMAT: str = "webp"  # webp or jpeg
+    RPA_SCREENSHOT_QUALITY: int = 60
+    RPA_SCREENSHOT_RETENTION_HOURS: int = 72
+    RPA_SCREENSHOT_MAX_FILES: int = 2000
+    
+    # RPA HTTP Submission (suppliers with "http_recipe" in services_data.json, "demo_http_recipe" in DEMO mode)
+    RPA_HTTP_TIMEOUT: float = 20.0
+    RPA_HTTP_FALLBACK_TO_BROWSER: bool = True  # Retry on the browser engine when the form needs JavaScript
+    
+    # RPA Review Sessions (browsers left open for the user after automation)
+    RPA_REVIEW_SESSION_IDLE_SECONDS: int = 300  # Close a review browser after this long without user activity
+    RPA_REVIEW_SESSION_MAX_SECONDS: int = 1800  # Hard cap on how long one review browser stays open
+    RPA_REVIEW_SESSION_REAP_SECONDS: int = 15  # How often idle and closed browsers are looked for
+    
+    # RPA Pre-navigation (portal form loaded while the user fills in ours)
+    RPA_PRENAV_MAX: int = 2  # Browsers reserved speculatively at once
+    RPA_PRENAV_TTL_SECONDS: int = 120  # An unclaimed reservation is released after this long
+    RPA_PRENAV_REAP_SECONDS: int = 5  # How often expired reservations are looked for
+    
+    # RPA Session Vault (saved logins for login-assisted portals)
+    RPA_SESSION_VAULT_PATH: str = "user_data/session_vault.db"
+    RPA_SESSION_VAULT_TTL_HOURS: float = 12  # Saved sessions older than this are dropped
+    RPA_SESSION_RESTORE_TIMEOUT: int = 10  # Seconds to wait for a restored session to show the dashboard
+    
+    # RPA Job Queue
+    RPA_EXECUTION_MODE: str = "inline"  # inline (threads in the API process) or workers (python -m app.rpa_worker)
+    RPA_QUEUE_WORKERS: int = 2  # Concurrent RPA jobs in this process (inline mode)
+    RPA_RETRY_BACKOFF_SECONDS: int = 30  # Multiplied by the attempt number
+    RPA_WORKER_PROCESSES: int = 0  # Worker processes per machine, 0 = one per CPU core
+    RPA_WORKER_SLOTS: int = 2  # Concurrent jobs (browser slots) per worker process
+    RPA_LEASE_SECONDS: int = 60  # A job whose lease is not renewed for this long is re-queued
+    RPA_HEARTBEAT_SECONDS: int = 15
+    RPA_WORKER_POLL_SECONDS: float = 1.0
+    RPA_BULK_MAX_ROWS: int = 500  # Applications accepted in one bulk upload
+    RPA_BULK_PARALLEL_GROUPS: int = 2  # Supplier groups of a bulk upload run at the same time
+    
     # Blocked URLs for safety
     BLOCKED_URLS: list = [
         "https://connect.torrentpower.com",
@@ -1,3 +1,4 @@
 from .service_loader import get_service_loader, ServiceLoader
+from .catalog import get_catalog, ServiceCatalog
 
-__all__ = ['get_service_loader', 'ServiceLoader']
+__all__ = ['get_service_loader', 'ServiceLoader', 'get_catalog', 'ServiceCatalog']
@@ -0,0 +1,187 @@
+"""
+Service Catalog
+Process-wide, indexed view of services_data.json with hot reload on file change
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from .search_index import SupplierSearchIndex
+
+logger = logging.getLogger(__name__)
+
+# Browsers and the extension revalidate after a minute; unchanged data costs a 304
+CACHE_CONTROL = "public, max-age=60, must-revalidate"
+
+CANDIDATE_PATHS = [
+    os.path.join(os.path.dirname(__file__), "services_data.json"),
+    "/app/app/data/services_data.json",
+    "/app/data/services_data.json",
+    "backend/app/data/services_data.json",
+]
+
+
+def _resolve_path() -> Optional[str]:
+    for path in CANDIDATE_PATHS:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class CatalogSnapshot:
+    """
+    Immutable indexes built from one version of the catalog file.
+
+    Readers grab a snapshot and use it for the whole request, so a reload
+    never exposes a half-built index.
+    """
+
+    def __init__(self, data: Dict[str, List[Dict[str, Any]]], version: int, mtime: float):
+        self.data = data
+        self.version = version
+        self.mtime = mtime
+
+        self.by_id: Dict[str, Tuple[Dict[str, Any], str]] = {}
+        self.by_name: Dict[str, Tuple[Dict[str, Any], str]] = {}
+        self.by_automation_type: Dict[str, List[Dict[str, Any]]] = {}
+        self.suppliers: List[Dict[str, Any]] = []
+
+        for category, suppliers in data.items():
+            for supplier in suppliers:
+                entry = (supplier, category)
+                if supplier.get('id'):
+                    self.by_id[supplier['id']] = entry
+                if supplier.get('name'):
+                    self.by_name[supplier['name'].lower()] = entry
+
+                flat = {**supplier, "category": category}
+                self.suppliers.append(flat)
+                automation_type = supplier.get('automation_type', 'manual_only')
+                self.by_automation_type.setdefault(automation_type, []).append(flat)
+
+        self.search_index = SupplierSearchIndex(self.suppliers)
+        self._rendered: Dict[str, Tuple[bytes, str]] = {}
+
+    def render(self, key: str, builder: Callable[["CatalogSnapshot"], Any]) -> Tuple[bytes, str]:
+        """
+        Build, serialize and hash a response body once per catalog version.
+        Returns (json bytes, strong ETag).
+        """
+        rendered = self._rendered.get(key)
+        if rendered is None:
+            body = json.dumps(builder(self), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            rendered = self._rendered.setdefault(key, (body, etag))
+        return rendered
+
+
+class ServiceCatalog:
+    """
+    Loads the services catalog once and swaps in a new snapshot when the file's
+    mtime changes. The mtime is checked at most every ``check_interval`` seconds
+    so hot paths do no disk I/O.
+    """
+
+    def __init__(self, path: Optional[str] = None, check_interval: float = 5.0):
+        self.path = path or _resolve_path()
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._snapshot = CatalogSnapshot({}, version=0, mtime=0.0)
+
+        if self.path:
+            self._reload()
+        else:
+            logger.error("Services data file not found in any expected location")
+
+    def _reload(self):
+        mtime = os.stat(self.path).st_mtime
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self._snapshot = CatalogSnapshot(data, version=self._snapshot.version + 1, mtime=mtime)
+        logger.info(f"📚 Services catalog v{self._snapshot.version} loaded from {self.path} "
+                    f"({len(self._snapshot.by_id)} suppliers)")
+
+    def snapshot(self) -> CatalogSnapshot:
+        """Current catalog indexes, reloading first if the file has changed"""
+        now = time.monotonic()
+        if self.path and now - self._checked_at >= self.check_interval:
+            with self._lock:
+                if now - self._checked_at >= self.check_interval:
+                    self._checked_at = now
+                    try:
+                        if os.stat(self.path).st_mtime != self._snapshot.mtime:
+                            self._reload()
+                    except Exception as e:
+                        # Keep serving the last good version
+                        logger.error(f"Error reloading services data: {e}")
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self.snapshot().version
+
+    def get_all(self) -> Dict[str, List[Dict[str, Any]]]:
+        return self.snapshot().data
+
+    def get_supplier(self, supplier_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """(supplier, category) for an id, or (None, None)"""
+        return self.snapshot().by_id.get(supplier_id, (None, None))
+
+    def get_supplier_by_name(self, name: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """(supplier, category) for a case-insensitive name, or (None, None)"""
+        return self.snapshot().by_name.get(name.lower(), (None, None))
+
+    def get_category(self, category: str) -> Optional[List[Dict[str, Any]]]:
+        return self.snapshot().data.get(category)
+
+    def get_by_automation_type(self, automation_type: str) -> List[Dict[str, Any]]:
+        """Suppliers (with their category) using the given automation type"""
+        return self.snapshot().by_automation_type.get(automation_type, [])
+
+    def get_suppliers(self) -> List[Dict[str, Any]]:
+        """Every supplier flattened with its category"""
+        return self.snapshot().suppliers
+
+    def search(self, query: str, limit: int = 20, offset: int = 0,
+               category: Optional[str] = None) -> Dict[str, Any]:
+        """Ranked supplier search over ids, names, aliases, categories and facilities"""
+        return self.snapshot().search_index.search(query, limit=limit, offset=offset, category=category)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def catalog_response(request: Request, key: str, builder: Callable[[CatalogSnapshot], Any]) -> Response:
+    """JSON response materialized per catalog version, answering 304 when the client's copy is current"""
+    body, etag = get_catalog().snapshot().render(key, builder)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Global instance
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> ServiceCatalog:
+    """Get or create the process-wide service catalog"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ServiceCatalog()
+        return _catalog
@@ -0,0 +1,154 @@
+"""
+Supplier Search Index
+Inverted index with prefix and trigram fuzzy matching over the service catalog
+"""
+import re
+import bisect
+import unicodedata
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+# Field weights - an id or name hit outranks a match buried in a facility description
+FIELD_WEIGHTS = {
+    "id": 5.0,
+    "name": 4.0,
+    "aliases": 4.0,
+    "category": 2.0,
+    "type": 1.5,
+    "automation_type": 1.5,
+    "name_change_facility": 1.0,
+    "address_change_facility": 1.0,
+}
+
+# Vernacular names for the categories so "પાણી" or "बिजली" finds the right suppliers
+CATEGORY_ALIASES = {
+    "gas": ["ગેસ", "गैस", "lpg", "png"],
+    "electricity": ["વીજળી", "બિજલી", "बिजली", "light", "power"],
+    "water": ["પાણી", "पानी", "jal"],
+    "property": ["મિલકત", "જમીન", "संपत्ति", "ज़मीन", "land"],
+}
+
+STOPWORDS = {"yes", "no", "via", "and", "or", "the", "of", "for", "to", "a", "an", "by", "ltd", "only", "not"}
+
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.8
+FUZZY_MATCH = 0.6
+FUZZY_THRESHOLD = 0.4
+
+# Split on whitespace and punctuation only; \w would break Gujarati/Devanagari
+# words apart at their combining vowel signs
+_TOKEN_RE = re.compile(r"[^\s\-_/\\(),.;:&–—'\"|]+")
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_RE.findall(normalize(text)) if token not in STOPWORDS]
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SupplierSearchIndex:
+    """
+    Built once per catalog version. Each query token is matched exactly, then as
+    a prefix, then fuzzily by trigram similarity; a supplier's score is the sum
+    of its best weighted hit per query token.
+    """
+
+    def __init__(self, suppliers: List[Dict[str, Any]]):
+        self.suppliers = suppliers
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._names: List[str] = []
+
+        for doc_id, supplier in enumerate(suppliers):
+            self._names.append(normalize(supplier.get("name", "")))
+            for field, weight in FIELD_WEIGHTS.items():
+                for text in self._field_texts(supplier, field):
+                    for token in tokenize(text):
+                        postings = self._postings.setdefault(token, {})
+                        postings[doc_id] = max(postings.get(doc_id, 0.0), weight)
+
+        self._tokens = sorted(self._postings)
+        for token in self._tokens:
+            for gram in trigrams(token):
+                self._trigrams.setdefault(gram, set()).add(token)
+
+    @staticmethod
+    def _field_texts(supplier: Dict[str, Any], field: str) -> List[str]:
+        value = supplier.get(field)
+        if field == "category" and value:
+            return [value] + CATEGORY_ALIASES.get(value, [])
+        if isinstance(value, list):
+            return [str(v) for v in value]
+        if field == "id" and value:
+            # Index the joined id too, so "torrentpower" finds "torrent-power"
+            return [value, value.replace("-", "")]
+        return [str(value)] if value else []
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        """Index tokens matching a query token, with their match strength"""
+        matches = {}
+        if token in self._postings:
+            matches[token] = EXACT_MATCH
+
+        start = bisect.bisect_left(self._tokens, token)
+        for candidate in self._tokens[start:]:
+            if not candidate.startswith(token):
+                break
+            matches.setdefault(candidate, PREFIX_MATCH)
+
+        if not matches and len(token) >= 3:
+            grams = trigrams(token)
+            shared: Dict[str, int] = {}
+            for gram in grams:
+                for candidate in self._trigrams.get(gram, ()):
+                    shared[candidate] = shared.get(candidate, 0) + 1
+            for candidate, count in shared.items():
+                similarity = 2 * count / (len(grams) + len(trigrams(candidate)))
+                if similarity >= FUZZY_THRESHOLD:
+                    matches[candidate] = FUZZY_MATCH * similarity
+
+        return list(matches.items())
+
+    def search(self, query: str, limit: int = 20, offset: int = 0,
+               category: Optional[str] = None) -> Dict[str, Any]:
+        """Ranked, paginated matches: ``{"total": n, "results": [supplier + score]}``"""
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return {"total": 0, "results": []}
+
+        scores: Dict[int, float] = {}
+        matched_tokens: Dict[int, int] = {}
+        for token in query_tokens:
+            best: Dict[int, float] = {}
+            for candidate, strength in self._expand(token):
+                for doc_id, weight in self._postings[candidate].items():
+                    best[doc_id] = max(best.get(doc_id, 0.0), weight * strength)
+            for doc_id, score in best.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+                matched_tokens[doc_id] = matched_tokens.get(doc_id, 0) + 1
+
+        phrase = normalize(query).strip()
+        for doc_id in scores:
+            if phrase and phrase in self._names[doc_id]:
+                scores[doc_id] += FIELD_WEIGHTS["name"]
+
+        ranked = [
+            doc_id for doc_id in scores
+            if not category or self.suppliers[doc_id].get("category") == category
+        ]
+        # Suppliers matching more of the query come first, then by score
+        ranked.sort(key=lambda doc_id: (-matched_tokens[doc_id], -scores[doc_id], self._names[doc_id]))
+
+        return {
+            "total": len(ranked),
+            "results": [
+                {**self.suppliers[doc_id], "score": round(scores[doc_id], 3)}
+                for doc_id in ranked[offset:offset + limit]
+            ],
+        }
@@ -1,24 +1,18 @@
 """
 Service Data Loader
-Loads all services from JSON file
+Category-scoped view over the shared service catalog
 """
-import json
-import os
 from typing import Dict, List, Any
 
+from .catalog import get_catalog
+
 class ServiceLoader:
     def __init__(self):
-        self.data_file = os.path.join(os.path.dirname(__file__), 'services_data.json')
-        self.services = self._load_services()
+        self.catalog = get_catalog()
     
-    def _load_services(self) -> Dict[str, List[Dict[str, Any]]]:
-        """Load services from JSON file"""
-        try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error loading services: {e}")
-            return {}
+    @property
+    def services(self) -> Dict[str, List[Dict[str, Any]]]:
+        return self.catalog.get_all()
     
     def get_all_services(self) -> Dict[str, List[Dict[str, Any]]]:
         """Get all services"""
@@ -30,10 +24,9 @@ class ServiceLoader:
     
     def get_service_by_id(self, category: str, service_id: str) -> Dict[str, Any]:
         """Get specific service by ID"""
-        services = self.services.get(category, [])
-        for service in services:
-            if service['id'] == service_id:
-                return service
+        service, service_category = self.catalog.get_supplier(service_id)
+        if service and service_category == category:
+            return service
         return {}
     
     def get_online_services(self, category: str) -> List[Dict[str, Any]]:
@@ -53,10 +46,9 @@ class ServiceLoader:
     
     def get_service_by_name(self, category: str, name: str) -> Dict[str, Any]:
         """Get service by name"""
-        services = self.services.get(category, [])
-        for service in services:
-            if service['name'].lower() == name.lower():
-                return service
+        service, service_category = self.catalog.get_supplier_by_name(name)
+        if service and service_category == category:
+            return service
         return {}
 
 # Global instance
@@ -1,7 +1,9 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.database import engine, Base
-from app.routers import auth, users, services, applications, demo_government_simple as demo_government, services_api, whatsapp, documents, services_data, portal_redirect, torrent_power, torrent_automation, proxy
+from app.routers import auth, users, services, applications, demo_government_simple as demo_government, services_api, whatsapp, documents, services_data, portal_redirect, torrent_power, torrent_automation, proxy, operations
 from app.config import get_settings
 
 settings = get_settings()
@@ -9,10 +11,52 @@ settings = get_settings()
 # Create database tables (only creates if they don't exist)
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background resources shared by the RPA services"""
+    from app.services.driver_pool import get_rpa_browser, shutdown_driver_pools
+    from app.services.chrome_binaries import resolve_chrome_binaries
+    from app.services.rpa_queue import get_rpa_queue, migrate_rpa_submissions
+    from app.services.user_data_service import user_data_service
+    from app.services.session_vault import get_session_vault
+    from app.services.browser_sessions import shutdown_browser_sessions
+    from app.services.prenavigation import shutdown_prenavigation
+    
+    migrate_rpa_submissions()
+    rpa_queue = get_rpa_queue()
+    loop = asyncio.get_running_loop()
+    
+    # With RPA_EXECUTION_MODE=workers the worker fleet owns browsers and job recovery
+    if rpa_queue.inline:
+        # Find ChromeDriver/Chrome once, then pre-warm headless Chrome, without delaying startup
+        def warm_up():
+            resolve_chrome_binaries()
+            if settings.RPA_DRIVER_POOL_PREWARM > 0:
+                get_rpa_browser().prewarm(settings.RPA_DRIVER_POOL_PREWARM)
+        loop.run_in_executor(None, warm_up)
+        
+        # Resume RPA jobs interrupted by a restart
+        rpa_queue.recover()
+    
+    # Delete stored user data the moment it expires
+    expiry_task = asyncio.create_task(user_data_service.expiry_scheduler.run())
+    # ... and saved portal logins likewise
+    session_expiry_task = asyncio.create_task(get_session_vault().expiry_scheduler.run())
+    
+    yield
+    
+    expiry_task.cancel()
+    session_expiry_task.cancel()
+    rpa_queue.shutdown()
+    await loop.run_in_executor(None, shutdown_prenavigation)
+    await loop.run_in_executor(None, shutdown_browser_sessions)
+    await loop.run_in_executor(None, shutdown_driver_pools)
+
 app = FastAPI(
     title=settings.APP_NAME,
     description="Unified Portal for Gas, Electricity, Water & Property Services with Chrome Extension Automation",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware - More permissive for localhost development
@@ -28,8 +72,9 @@ app.add_middleware(
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(services.router)
-app.include_router(services_api.router)
+# services_data before services_api: the latter's /{category} routes would catch /data, /supplier/{id}, ...
 app.include_router(services_data.router)
+app.include_router(services_api.router)
 app.include_router(portal_redirect.router)
 app.include_router(applications.router)
 app.include_router(documents.router)
@@ -38,6 +83,7 @@ app.include_router(whatsapp.router)
 app.include_router(torrent_power.router)
 app.include_router(torrent_automation.router)
 app.include_router(proxy.router)
+app.include_router(operations.router)
 
 @app.get("/")
 def root():
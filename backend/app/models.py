@@ -188,7 +188,7 @@ class RPASubmission(Base):
     __tablename__ = "rpa_submissions"
     
     id = Column(Integer, primary_key=True, index=True)
-    application_id = Column(Integer, ForeignKey("applications.id"), nullable=False)
+    application_id = Column(Integer, ForeignKey("applications.id"), nullable=True)  # Null for anonymous portal automation
     target_website = Column(String(255))  # torrent-power, adani-gas, etc.
     target_url = Column(String(500))
     status = Column(Enum(RPASubmissionStatus), default=RPASubmissionStatus.QUEUED)
@@ -198,6 +198,9 @@ class RPASubmission(Base):
     error_message = Column(Text)
     retry_count = Column(Integer, default=0)
     max_retries = Column(Integer, default=3)
+    available_at = Column(DateTime(timezone=True), index=True)  # Deferred/backed-off jobs wait until this time
+    lease_owner = Column(String(100))  # host:pid of the worker process holding the job
+    lease_expires_at = Column(DateTime(timezone=True))  # Extended by the worker's heartbeat
     started_at = Column(DateTime(timezone=True))
     completed_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,12 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
+import json
+import asyncio
+from app.config import get_settings
 from app.database import get_db
 from app.models import User, Application, ApplicationStatus, ServiceType
 from app.schemas import ApplicationCreate, ApplicationResponse
 from app.auth import get_current_user
 from app.services.direct_automation_service import direct_automation_service
+from app.services.bulk_submission import (
+    parse_applications, validate_rows, batch_owner, stream_batches, stream_jobs,
+)
+from app.services.rpa_queue import get_rpa_queue
+
+settings = get_settings()
 
 router = APIRouter(prefix="/api/applications", tags=["Applications"])
 
@@ -35,6 +45,73 @@ def get_applications(
 ):
     return db.query(Application).filter(Application.user_id == current_user.id).all()
 
+@router.post("/bulk")
+async def submit_bulk_applications(
+    request: Request,
+    all_or_nothing: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Submit many applications at once from a CSV (header row) or NDJSON body.
+    Each row names its ``supplier`` (e.g. torrent-power, pgvcl); the other
+    columns are the form data.
+
+    Rows are validated in one pass and grouped by supplier; each group runs
+    in one reused portal session. The response is NDJSON: an ``accepted``
+    line with any invalid rows, one ``result`` line per row as it finishes
+    (with its job id) and a closing ``done`` line. With ``all_or_nothing``
+    any invalid row rejects the whole upload.
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    rpa_queue = get_rpa_queue()
+    # Inline mode runs the groups here; with a worker fleet the rows go to the workers
+    owner = batch_owner() if rpa_queue.inline else None
+    
+    def accept():
+        """Parse, validate and queue the upload (CPU and one DB commit, kept off the event loop)"""
+        rows = parse_applications(body, content_type)
+        if not rows:
+            raise HTTPException(status_code=400, detail="No applications in the upload")
+        if len(rows) > settings.RPA_BULK_MAX_ROWS:
+            raise HTTPException(status_code=413, detail=f"At most {settings.RPA_BULK_MAX_ROWS} applications per upload")
+        
+        groups = validate_rows(rows)
+        invalid = [{"row": row.row, "supplier": row.supplier, "errors": row.errors} for row in rows if row.errors]
+        if invalid and all_or_nothing:
+            raise HTTPException(status_code=422, detail={"invalid": invalid})
+        
+        queued = [(supplier, row) for supplier, group in groups.items() for row in group]
+        job_ids = rpa_queue.enqueue_many(db, [(supplier, row.data) for supplier, row in queued], lease_owner=owner)
+        row_numbers = {}
+        job_groups = {}
+        for job_id, (supplier, row) in zip(job_ids, queued):
+            row_numbers[job_id] = row.row
+            job_groups.setdefault(supplier, []).append(job_id)
+        return rows, invalid, row_numbers, job_groups
+    
+    rows, invalid, row_numbers, job_groups = await asyncio.get_running_loop().run_in_executor(None, accept)
+    
+    async def stream():
+        yield json.dumps({
+            "type": "accepted",
+            "rows": len(rows),
+            "queued": len(row_numbers),
+            "groups": {supplier: len(job_ids) for supplier, job_ids in job_groups.items()},
+            "invalid": invalid,
+        }) + "\n"
+        
+        counts = {"success": 0, "retry": 0, "failed": 0}
+        results = stream_batches(owner, job_groups, row_numbers) if owner else stream_jobs(list(row_numbers), row_numbers)
+        async for item in results:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+            yield json.dumps(item, default=str) + "\n"
+        
+        yield json.dumps({"type": "done", "invalid": len(invalid), **counts}) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @router.get("/{application_id}", response_model=ApplicationResponse)
 def get_application(
     application_id: int,
@@ -0,0 +1,131 @@
+"""
+Operations API
+Runtime metrics for the background services behind the portal
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models import RPASubmission
+from app.services.browser_sessions import get_browser_sessions
+from app.services.chrome_binaries import chrome_binaries_info
+from app.services.driver_pool import get_rpa_browser
+from app.services.memory_governor import get_memory_governor
+from app.services.network_profiles import page_load_stats
+from app.services.prenavigation import get_prenavigation
+from app.services.portal_scheduler import get_portal_scheduler
+from app.services.rpa_tracing import aggregate_traces
+from app.services.screenshot_writer import get_screenshot_writer
+from app.services.user_data_service import user_data_service
+
+router = APIRouter(prefix="/api/ops", tags=["Operations"])
+
+
+@router.get("/user-data/expiry")
+async def get_user_data_expiry_metrics():
+    """Expiry scheduler metrics for stored automation data (evicted count, backlog)"""
+    return user_data_service.expiry_scheduler.metrics()
+
+
+@router.get("/browsers")
+async def get_browser_stats():
+    """Usage of the headless and visible RPA browser backends"""
+    return {
+        "headless": get_rpa_browser(headless=True).stats(),
+        "visible": get_rpa_browser(headless=False).stats(),
+        "binaries": chrome_binaries_info(),
+    }
+
+
+@router.get("/memory")
+async def get_memory_stats():
+    """Container memory and /dev/shm usage, memory pressure and drivers recycled by the memory governor"""
+    return get_memory_governor().stats()
+
+
+@router.get("/browser-sessions")
+async def list_browser_sessions():
+    """Browsers left open for the user to review, with their idle time"""
+    registry = get_browser_sessions()
+    return {"sessions": registry.list(), **registry.stats()}
+
+
+@router.post("/browser-sessions/{session_id}/keepalive")
+async def keep_browser_session_alive(session_id: str):
+    """Reset a review browser's idle timer"""
+    if not get_browser_sessions().touch(session_id):
+        raise HTTPException(status_code=404, detail=f"No open browser session {session_id}")
+    return {"success": True, "session_id": session_id}
+
+
+@router.delete("/browser-sessions/{session_id}")
+def close_browser_session(session_id: str):
+    """Close a review browser and return it to the pool"""
+    if not get_browser_sessions().close(session_id):
+        raise HTTPException(status_code=404, detail=f"No open browser session {session_id}")
+    return {"success": True, "session_id": session_id}
+
+
+@router.get("/prenavigation")
+async def get_prenavigation_stats():
+    """Speculatively pre-navigated browsers and how many were claimed, expired or declined"""
+    registry = get_prenavigation()
+    return {"reservations": registry.list(), **registry.stats()}
+
+
+@router.get("/page-loads")
+async def get_page_load_stats():
+    """Portal page-load times per network profile (blocked vs. full baseline)"""
+    return page_load_stats.summary()
+
+
+@router.get("/screenshots")
+async def get_screenshot_stats():
+    """Background screenshot writer counters (written, deduplicated, dropped, pruned)"""
+    return get_screenshot_writer().stats()
+
+
+@router.get("/portals")
+async def get_portal_limits():
+    """Per-portal in-flight sessions, rate-limit tokens and circuit breaker state"""
+    return get_portal_scheduler().stats()
+
+
+@router.get("/traces")
+def get_rpa_trace_histograms(
+    portal: Optional[str] = None,
+    since: Optional[datetime] = Query(None, description="Only runs started at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only runs started before this time"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db)
+):
+    """
+    Per-portal latency histograms of each RPA step (driver checkout, navigate,
+    waits, fields, screenshots) over the most recent traced submissions.
+    Compare two time windows to check that an optimization paid off.
+    """
+    query = db.query(RPASubmission).filter(RPASubmission.started_at.isnot(None))
+    if portal:
+        query = query.filter(RPASubmission.target_website == portal)
+    if since:
+        query = query.filter(RPASubmission.started_at >= since)
+    if until:
+        query = query.filter(RPASubmission.started_at < until)
+
+    jobs = query.order_by(RPASubmission.id.desc()).limit(limit).all()
+    traces = [job.response_data["trace"] for job in jobs if (job.response_data or {}).get("trace")]
+    return {"runs": len(traces), "portals": aggregate_traces(traces)}
+
+
+@router.get("/traces/{job_id}")
+def get_rpa_trace(job_id: int, db: Session = Depends(get_db)):
+    """Span waterfall of one RPA submission's last attempt"""
+    job = db.query(RPASubmission).filter(RPASubmission.id == job_id).first()
+    trace = (job.response_data or {}).get("trace") if job else None
+    if not trace:
+        raise HTTPException(status_code=404, detail=f"No trace recorded for RPA job {job_id}")
+    return {"job_id": job.id, "status": job.status.value, **trace}
@@ -3,9 +3,26 @@ Services API Router
 Provides endpoints for all services data
 """
 from fastapi import APIRouter, HTTPException
-from app.data import get_service_loader
+from starlette.convertors import Convertor, register_url_convertor
+from app.data import get_service_loader, get_catalog
 from typing import List, Dict, Any
 
+CATEGORIES = ["gas", "electricity", "water", "property"]
+
+
+class CategoryConvertor(Convertor):
+    """Matches only real categories, so /data, /supplier/{id}, ... fall through to services_data"""
+    regex = "|".join(CATEGORIES)
+
+    def convert(self, value: str) -> str:
+        return value
+
+    def to_string(self, value: str) -> str:
+        return value
+
+
+register_url_convertor("category", CategoryConvertor())
+
 router = APIRouter(prefix="/api/services", tags=["Services"])
 loader = get_service_loader()
 
@@ -13,15 +30,27 @@ loader = get_service_loader()
 def get_categories():
     """Get all service categories"""
     return {
-        "categories": ["gas", "electricity", "water", "property"]
+        "categories": CATEGORIES
+    }
+
+# Declared before the /{category} routes, which would otherwise take "search" as a category
+@router.get("/search/{query}")
+def search_services(query: str):
+    """Search services across all categories"""
+    results = {}
+    
+    # Ranked order is kept within each category
+    for service in get_catalog().search(query, limit=100)["results"]:
+        results.setdefault(service["category"], []).append(service)
+    
+    return {
+        "query": query,
+        "results": results
     }
 
-@router.get("/{category}")
+@router.get("/{category:category}")
 def get_services_by_category(category: str):
     """Get all services in a category"""
-    if category not in ["gas", "electricity", "water", "property"]:
-        raise HTTPException(status_code=400, detail="Invalid category")
-    
     services = loader.get_services_by_category(category)
     return {
         "category": category,
@@ -29,12 +58,9 @@ def get_services_by_category(category: str):
         "services": services
     }
 
-@router.get("/{category}/online")
+@router.get("/{category:category}/online")
 def get_online_services(category: str):
     """Get only online available services"""
-    if category not in ["gas", "electricity", "water", "property"]:
-        raise HTTPException(status_code=400, detail="Invalid category")
-    
     services = loader.get_online_services(category)
     return {
         "category": category,
@@ -43,12 +69,9 @@ def get_online_services(category: str):
         "services": services
     }
 
-@router.get("/{category}/rpa")
+@router.get("/{category:category}/rpa")
 def get_rpa_services(category: str):
     """Get only RPA enabled services"""
-    if category not in ["gas", "electricity", "water", "property"]:
-        raise HTTPException(status_code=400, detail="Invalid category")
-    
     services = loader.get_rpa_enabled_services(category)
     return {
         "category": category,
@@ -57,48 +80,25 @@ def get_rpa_services(category: str):
         "services": services
     }
 
-@router.get("/{category}/{service_id}")
-def get_service_details(category: str, service_id: str):
-    """Get specific service details"""
-    if category not in ["gas", "electricity", "water", "property"]:
-        raise HTTPException(status_code=400, detail="Invalid category")
-    
-    service = loader.get_service_by_id(category, service_id)
-    if not service:
-        raise HTTPException(status_code=404, detail="Service not found")
-    
-    return {
-        "category": category,
-        "service": service
-    }
-
-@router.get("/{category}/names")
+@router.get("/{category:category}/names")
 def get_service_names(category: str):
     """Get list of service names"""
-    if category not in ["gas", "electricity", "water", "property"]:
-        raise HTTPException(status_code=400, detail="Invalid category")
-    
     names = loader.get_service_names(category)
     return {
         "category": category,
         "names": names
     }
 
-@router.get("/search/{query}")
-def search_services(query: str):
-    """Search services across all categories"""
-    results = {}
-    query_lower = query.lower()
-    
-    for category in ["gas", "electricity", "water", "property"]:
-        services = loader.get_services_by_category(category)
-        matching = [s for s in services if query_lower in s['name'].lower()]
-        if matching:
-            results[category] = matching
+@router.get("/{category:category}/{service_id}")
+def get_service_details(category: str, service_id: str):
+    """Get specific service details"""
+    service = loader.get_service_by_id(category, service_id)
+    if not service:
+        raise HTTPException(status_code=404, detail="Service not found")
     
     return {
-        "query": query,
-        "results": results
+        "category": category,
+        "service": service
     }
 
 @router.get("/")
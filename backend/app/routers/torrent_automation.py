@@ -5,16 +5,22 @@ Uses Selenium WebDriver for real browser automation
 
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from pydantic import BaseModel
+from sqlalchemy.orm import Session
 from typing import Dict, Any, Optional
 import asyncio
 import time
 from datetime import datetime
 
 from app.auth import get_current_user
-from app.models import User
+from app.database import get_db
+from app.models import User, RPASubmission, RPASubmissionStatus
+from app.services.rpa_queue import get_rpa_queue, record_run
+from app.services.prenavigation import get_prenavigation
 
 router = APIRouter(prefix="/api/torrent-automation", tags=["Torrent Power RPA Automation"])
 
+TORRENT_NAME_CHANGE_URL = "https://connect.torrentpower.com/tplcp/application/namechangerequest"
+
 
 class TorrentAutomationRequest(BaseModel):
     """Request model for Torrent Power RPA automation"""
@@ -24,6 +30,7 @@ class TorrentAutomationRequest(BaseModel):
     mobile: str
     email: str
     confirm_email: Optional[str] = None
+    reservation_id: Optional[str] = None  # From /prenavigate when the form was opened
 
 
 class TorrentAutomationResponse(BaseModel):
@@ -43,16 +50,40 @@ class TorrentAutomationResponse(BaseModel):
     portal_url: str = "https://connect.torrentpower.com/tplcp/application/namechangerequest"
     error: Optional[str] = None
     automation_details: Optional[list] = None
+    job_id: Optional[int] = None
+    job_status: Optional[str] = None
+    status_url: Optional[str] = None
+    browser_session_id: Optional[str] = None  # Browser left open for review, see /api/ops/browser-sessions
+
+
+class TorrentAutomationJobStatus(BaseModel):
+    """Polling view of a queued RPA job"""
+    job_id: int
+    status: str
+    success: bool
+    finished: bool
+    message: str
+    retry_count: int = 0
+    max_retries: int = 0
+    fields_filled: Optional[int] = None
+    total_fields: Optional[int] = None
+    automation_details: Optional[list] = None
+    confirmation_number: Optional[str] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
 
 
 @router.post("/start-automation", response_model=TorrentAutomationResponse)
 async def start_torrent_power_rpa_automation(
-    request: TorrentAutomationRequest
+    request: TorrentAutomationRequest,
+    db: Session = Depends(get_db)
     # current_user: User = Depends(get_current_user)  # Temporarily disabled for testing
 ):
     """
-    Start the RPA-based Torrent Power automation workflow
-    Uses Selenium WebDriver for real browser automation
+    Queue the RPA-based Torrent Power automation workflow
+    Returns a job id immediately; poll /jobs/{job_id} for the result
     """
     
     try:
@@ -96,75 +127,43 @@ async def start_torrent_power_rpa_automation(
                 detail="Email address is required for Torrent Power automation"
             )
         
-        print("✅ All validations passed, starting RPA automation...")
+        print("✅ All validations passed, queueing RPA automation...")
         
-        # Use simple RPA-based automation for testing
-        print("🤖 Starting simple RPA-based automation...")
+        # Prepare the data for RPA
+        rpa_data = {
+            "city": request.city or 'Ahmedabad',
+            "service_number": request.service_number,
+            "t_number": request.t_number,
+            "mobile": request.mobile,
+            "email": request.email
+        }
+        if request.reservation_id:
+            # The job attaches to the browser already parked on the portal form
+            rpa_data["reservation_id"] = request.reservation_id
         
-        try:
-            from app.services.simple_rpa_service import SimpleTorrentRPA
-            
-            # Prepare the data for RPA
-            rpa_data = {
-                "city": request.city or 'Ahmedabad',
-                "service_number": request.service_number,
-                "t_number": request.t_number,
-                "mobile": request.mobile,
-                "email": request.email
-            }
-            
-            print(f"📋 Simple RPA Data: {rpa_data}")
-            
-            # Initialize and run Simple RPA
-            rpa = SimpleTorrentRPA()
-            result = rpa.run_automation(rpa_data)
-            
-            print(f"📊 Simple RPA Result: {result}")
-            
-            if result.get("success"):
-                return TorrentAutomationResponse(
-                    success=True,
-                    message=f"🤖 Simple RPA test successful! Chrome driver is working.",
-                    details="Simple RPA automation completed successfully",
-                    timestamp=datetime.now().isoformat(),
-                    fields_filled=result.get("total_filled", 0),
-                    total_fields=2,
-                    next_steps=[
-                        "✅ Chrome driver is working",
-                        "✅ Selenium automation is functional",
-                        "🔧 Ready for full Torrent Power automation",
-                        "📝 Browser automation confirmed working"
-                    ],
-                    automation_details=result.get("filled_fields", [])
-                )
-            else:
-                return TorrentAutomationResponse(
-                    success=False,
-                    message="Simple RPA test failed.",
-                    details=result.get("error", "Unknown simple RPA error"),
-                    timestamp=datetime.now().isoformat(),
-                    error=result.get("error", "Simple RPA test failed"),
-                    automation_details=[]
-                )
-                
-        except ImportError as e:
-            print(f"❌ RPA import error: {e}")
-            return TorrentAutomationResponse(
-                success=False,
-                message="RPA service not available. Selenium WebDriver required.",
-                details="Please install Selenium and ChromeDriver for RPA automation.",
-                timestamp=datetime.now().isoformat(),
-                error="RPA service not available. Selenium WebDriver required."
-            )
-        except Exception as e:
-            print(f"❌ RPA automation error: {e}")
-            return TorrentAutomationResponse(
-                success=False,
-                message="RPA automation service unavailable.",
-                details=str(e),
-                timestamp=datetime.now().isoformat(),
-                error=f"RPA automation failed: {str(e)}"
-            )
+        # Queue the job - the browser session runs on an RPA worker, not the event loop
+        job = get_rpa_queue().enqueue(
+            db,
+            target_website="torrent-power",
+            target_url=TORRENT_NAME_CHANGE_URL,
+            submission_data=rpa_data
+        )
+        
+        print(f"📥 RPA job {job.id} queued")
+        
+        return TorrentAutomationResponse(
+            success=True,
+            message="🤖 Torrent Power automation queued. Poll the job status for results.",
+            details=f"RPA job {job.id} is waiting for a browser worker",
+            timestamp=datetime.now().isoformat(),
+            job_id=job.id,
+            job_status=job.status.value,
+            status_url=f"/api/torrent-automation/jobs/{job.id}",
+            next_steps=[
+                "⏳ Automation job queued",
+                "🔄 Poll the status URL until the job completes"
+            ]
+        )
         
     except HTTPException:
         raise
@@ -182,6 +181,71 @@ async def start_torrent_power_rpa_automation(
         )
 
 
+@router.post("/prenavigate")
+async def prenavigate_torrent_power():
+    """
+    Called when the user opens the name change form: loads the Torrent Power
+    portal form in a reserved browser so the submission does not wait for
+    Chrome and the page load. Pass the returned reservation_id with
+    /start-automation; unused reservations are released after
+    RPA_PRENAV_TTL_SECONDS.
+    """
+    if not get_rpa_queue().inline:
+        # Jobs run in worker processes, which cannot use this process's browsers
+        return {"success": False, "error": "Pre-navigation needs RPA_EXECUTION_MODE=inline"}
+
+    from app.services.simple_rpa_service import HEADLESS
+    return get_prenavigation().reserve("torrent-power", headless=HEADLESS)
+
+
+@router.delete("/prenavigate/{reservation_id}")
+async def release_prenavigation(reservation_id: str):
+    """Release a reservation early (the user left the form)"""
+    if not get_prenavigation().release(reservation_id):
+        raise HTTPException(status_code=404, detail=f"No reservation {reservation_id}")
+    return {"success": True, "reservation_id": reservation_id}
+
+
+@router.get("/jobs/{job_id}", response_model=TorrentAutomationJobStatus)
+async def get_automation_job_status(job_id: int, db: Session = Depends(get_db)):
+    """
+    Get the status of a queued Torrent Power RPA job
+    """
+    
+    job = db.query(RPASubmission).filter(RPASubmission.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail=f"RPA job {job_id} not found")
+    
+    result = job.response_data or {}
+    finished = job.status in (RPASubmissionStatus.SUCCESS, RPASubmissionStatus.FAILED)
+    
+    messages = {
+        RPASubmissionStatus.QUEUED: "Waiting for a browser worker",
+        RPASubmissionStatus.PROCESSING: "Automation in progress",
+        RPASubmissionStatus.RETRY: "Previous attempt failed, retry scheduled",
+        RPASubmissionStatus.SUCCESS: "Automation completed",
+        RPASubmissionStatus.FAILED: "Automation failed",
+    }
+    
+    return TorrentAutomationJobStatus(
+        job_id=job.id,
+        status=job.status.value,
+        success=job.status == RPASubmissionStatus.SUCCESS,
+        finished=finished,
+        message=messages[job.status],
+        retry_count=job.retry_count or 0,
+        max_retries=job.max_retries or 0,
+        fields_filled=result.get("total_filled"),
+        total_fields=result.get("total_fields"),
+        automation_details=result.get("filled_fields"),
+        confirmation_number=job.confirmation_number,
+        error=job.error_message,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        completed_at=job.completed_at
+    )
+
+
 @router.get("/test-connection")
 async def test_rpa_automation_connection():
     """
@@ -273,13 +337,16 @@ async def get_supported_fields():
 
 
 @router.post("/start-visible-automation", response_model=TorrentAutomationResponse)
-async def start_visible_torrent_power_rpa_automation(
+def start_visible_torrent_power_rpa_automation(
     request: TorrentAutomationRequest
     # current_user: User = Depends(get_current_user)  # Temporarily disabled for testing
 ):
     """
     Start the RPA-based Torrent Power automation with VISIBLE browser for debugging
     Shows the automation process in real-time with visual feedback
+    
+    A plain ``def`` on purpose: FastAPI runs it in the threadpool, so the
+    browser session and its trace writes do not block the event loop.
     """
     
     try:
@@ -327,9 +394,9 @@ async def start_visible_torrent_power_rpa_automation(
             
             print(f"📋 Visible RPA Data: {rpa_data}")
             
-            # Initialize and run VISIBLE RPA
+            # Initialize and run VISIBLE RPA (traced and recorded like queued jobs)
             rpa = TorrentPowerRPA()
-            result = rpa.run_visible_automation(rpa_data)
+            result = record_run("torrent-power", rpa_data, lambda: rpa.run_visible_automation(rpa_data))
             
             print(f"📊 Visible RPA Result: {result}")
             
@@ -348,10 +415,11 @@ async def start_visible_torrent_power_rpa_automation(
                         "📝 Form fields filled and highlighted in green",
                         "🔍 Review the filled data for accuracy",
                         "📤 Click Submit to complete your application",
-                        "🕐 Browser will stay open for 10 minutes for debugging"
+                        "🕐 Browser stays open until you close it or leave it idle for 10 minutes"
                     ],
                     automation_details=result.get("filled_fields", []),
-                    screenshots=result.get("screenshots", [])
+                    screenshots=result.get("screenshots", []),
+                    browser_session_id=result.get("browser_session_id")
                 )
             else:
                 return TorrentAutomationResponse(
@@ -399,7 +467,7 @@ async def start_visible_torrent_power_rpa_automation(
 
 
 @router.post("/test-rpa")
-async def test_rpa_with_sample_data():
+async def test_rpa_with_sample_data(db: Session = Depends(get_db)):
     """
     Test RPA automation with sample data
     """
@@ -412,4 +480,4 @@ async def test_rpa_with_sample_data():
         email="test@example.com"
     )
     
-    return await start_torrent_power_rpa_automation(sample_data)
\ No newline at end of file
+    return await start_torrent_power_rpa_automation(sample_data, db)
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""
+RPA Worker Fleet
+Runs browser automation outside the API process: ``python -m app.rpa_worker``
+
+A supervisor starts N worker processes (one per CPU core by default) and
+restarts any that die. Each worker owns a few browser slots and pulls jobs
+from the rpa_submissions table under a lease it renews with a heartbeat, so
+workers on any number of machines can share one database. Set
+RPA_EXECUTION_MODE=workers on the API so it only enqueues.
+"""
+
+import os
+import sys
+import time
+import signal
+import logging
+import argparse
+import threading
+import multiprocessing
+from typing import Dict, Set
+
+from app.config import get_settings
+
+logger = logging.getLogger("app.rpa_worker")
+settings = get_settings()
+
+MAX_RESTART_DELAY = 60
+
+
+def _slot_loop(queue, owner: str, running: Set[int], running_lock: threading.Lock,
+               stop: threading.Event):
+    while not stop.is_set():
+        try:
+            job_id = queue.claim(owner)
+        except Exception as e:
+            logger.error(f"❌ Claiming RPA job failed: {e}")
+            job_id = None
+
+        if job_id is None:
+            stop.wait(settings.RPA_WORKER_POLL_SECONDS)
+            continue
+
+        with running_lock:
+            running.add(job_id)
+        try:
+            queue.run_job(job_id)
+        finally:
+            with running_lock:
+                running.discard(job_id)
+
+
+def worker_main(index: int, slots: int):
+    """Entry point of one worker process"""
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s [worker-{index}] %(name)s: %(message)s")
+
+    from app.database import engine, Base
+    from app.services.driver_pool import get_rpa_browser, shutdown_driver_pools
+    from app.services.browser_sessions import shutdown_browser_sessions
+    from app.services.chrome_binaries import resolve_chrome_binaries
+    from app.services.rpa_queue import RPAJobQueue, worker_id
+
+    Base.metadata.create_all(bind=engine)
+    owner = worker_id()
+    queue = RPAJobQueue(
+        workers=0,
+        retry_backoff=settings.RPA_RETRY_BACKOFF_SECONDS,
+        inline=False,
+        lease_seconds=settings.RPA_LEASE_SECONDS,
+    )
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    # Resolved before the slots start so no job pays for driver discovery
+    resolve_chrome_binaries()
+    if settings.RPA_DRIVER_POOL_PREWARM > 0:
+        threading.Thread(target=get_rpa_browser().prewarm, args=(min(slots, settings.RPA_DRIVER_POOL_PREWARM),),
+                         daemon=True).start()
+
+    running: Set[int] = set()
+    running_lock = threading.Lock()
+    threads = [
+        threading.Thread(target=_slot_loop, args=(queue, owner, running, running_lock, stop),
+                         name=f"rpa-slot-{slot}", daemon=True)
+        for slot in range(slots)
+    ]
+    for thread in threads:
+        thread.start()
+    logger.info(f"🤖 RPA worker {owner} started with {slots} slot(s)")
+
+    # Heartbeat the leases of running jobs and re-queue jobs abandoned by dead workers
+    last_reclaim = 0.0
+    while not stop.wait(settings.RPA_HEARTBEAT_SECONDS):
+        with running_lock:
+            job_ids = list(running)
+        try:
+            queue.heartbeat(owner, job_ids)
+            if time.monotonic() - last_reclaim >= settings.RPA_LEASE_SECONDS:
+                last_reclaim = time.monotonic()
+                queue.reclaim_expired()
+        except Exception as e:
+            logger.error(f"❌ RPA worker heartbeat failed: {e}")
+
+    logger.info(f"🛑 RPA worker {owner} stopping, finishing {len(running)} running job(s)")
+    for thread in threads:
+        thread.join()
+    shutdown_browser_sessions()
+    shutdown_driver_pools()
+
+
+class Supervisor:
+    """Keeps ``processes`` worker processes alive, restarting crashed ones with backoff"""
+
+    def __init__(self, processes: int, slots: int):
+        self.processes = processes
+        self.slots = slots
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: Dict[int, multiprocessing.Process] = {}
+        self._crashes: Dict[int, int] = {}
+        self._started_at: Dict[int, float] = {}
+        self._restart_at: Dict[int, float] = {}
+        self._stopping = False
+
+    def _start(self, index: int):
+        process = self._context.Process(target=worker_main, args=(index, self.slots), name=f"rpa-worker-{index}")
+        process.start()
+        self._workers[index] = process
+        self._started_at[index] = time.monotonic()
+        logger.info(f"🚀 Started RPA worker {index} (pid {process.pid})")
+
+    def _check(self):
+        now = time.monotonic()
+        for index in range(self.processes):
+            process = self._workers.get(index)
+            if process is not None and process.is_alive():
+                continue
+
+            if process is not None:
+                self._workers.pop(index)
+                # A worker that stayed up for a while counts as healthy again
+                if now - self._started_at[index] > MAX_RESTART_DELAY:
+                    self._crashes[index] = 0
+                self._crashes[index] = self._crashes.get(index, 0) + 1
+                delay = min(MAX_RESTART_DELAY, 2 ** (self._crashes[index] - 1))
+                self._restart_at[index] = now + delay
+                logger.error(f"💥 RPA worker {index} exited with code {process.exitcode}, "
+                             f"restarting in {delay}s")
+
+            if now >= self._restart_at.get(index, 0):
+                self._start(index)
+
+    def _stop(self, *_):
+        self._stopping = True
+
+    def run(self):
+        from app.database import engine, Base
+        from app.services.rpa_queue import migrate_rpa_submissions
+
+        Base.metadata.create_all(bind=engine)
+        migrate_rpa_submissions()
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        logger.info(f"🧑‍✈️ RPA supervisor starting {self.processes} worker(s) x {self.slots} slot(s)")
+
+        while not self._stopping:
+            self._check()
+            time.sleep(1)
+
+        logger.info("🛑 Stopping RPA workers...")
+        for process in self._workers.values():
+            process.terminate()
+        for process in self._workers.values():
+            process.join(timeout=settings.RPA_LEASE_SECONDS)
+            if process.is_alive():
+                process.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the RPA worker fleet")
+    parser.add_argument("--processes", type=int, default=settings.RPA_WORKER_PROCESSES,
+                        help="worker processes (0 = one per CPU core)")
+    parser.add_argument("--slots", type=int, default=settings.RPA_WORKER_SLOTS,
+                        help="concurrent jobs per worker process")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [supervisor] %(name)s: %(message)s")
+    processes = args.processes or os.cpu_count() or 1
+    Supervisor(processes, max(1, args.slots)).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
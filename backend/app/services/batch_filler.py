@@ -0,0 +1,184 @@
+"""
+Batch Form Filler
+Fills a whole form in a single execute_script round trip
+"""
+
+import time
+import logging
+from typing import Dict, Any, List, Optional
+
+from app.services.selector_cache import PAGE_FINGERPRINT_FN, get_selector_cache
+from app.services.rpa_tracing import span, add_span
+
+logger = logging.getLogger(__name__)
+
+# arguments[0]: list of field specs, arguments[1]: options
+# Each spec: {key, value, selectors: [css], labels: [text], text_input_index, cached}
+# ``cached`` is tried first, but only when opts.fingerprint matches the page
+BATCH_FILL_SCRIPT = """
+const fields = arguments[0];
+const opts = arguments[1] || {};
+const started = performance.now();
+const fingerprint = (""" + PAGE_FINGERPRINT_FN + """)();
+const useCache = !!opts.fingerprint && opts.fingerprint === fingerprint;
+
+const query = (selector) => {
+    try { return document.querySelector(selector); } catch (e) { return null; }
+};
+
+const byLabel = (text) => {
+    for (const label of document.querySelectorAll('label')) {
+        if (label.textContent.toLowerCase().includes(text)) {
+            const el = label.control || (label.htmlFor && document.getElementById(label.htmlFor));
+            if (el) return el;
+        }
+    }
+    return null;
+};
+
+const resolveToken = (token) => {
+    if (token.startsWith('label:')) return byLabel(token.slice(6).toLowerCase());
+    if (token.startsWith('text-input:')) {
+        return document.querySelectorAll("input[type='text']")[Number(token.slice(11))] || null;
+    }
+    return query(token);
+};
+
+const resolve = (field) => {
+    if (useCache && field.cached) {
+        const el = resolveToken(field.cached);
+        if (el) return [el, field.cached];
+    }
+    for (const selector of field.selectors || []) {
+        const el = query(selector);
+        if (el) return [el, selector];
+    }
+    for (const text of field.labels || []) {
+        const el = byLabel(text.toLowerCase());
+        if (el) return [el, 'label:' + text];
+    }
+    if (field.text_input_index !== undefined && field.text_input_index !== null) {
+        const el = document.querySelectorAll("input[type='text']")[field.text_input_index];
+        if (el) return [el, 'text-input:' + field.text_input_index];
+    }
+    return [null, null];
+};
+
+const setNativeValue = (el, value) => {
+    const proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+    const setter = Object.getOwnPropertyDescriptor(proto, 'value').set;
+    setter.call(el, value);
+};
+
+const fire = (el, type) => el.dispatchEvent(new Event(type, {bubbles: true}));
+
+const fillField = (field, entry) => {
+    const value = field.value === null || field.value === undefined ? '' : String(field.value);
+    if (!value) return;
+
+    const [el, selector] = resolve(field);
+    entry.selector = selector;
+    if (!el) { entry.status = 'not_found'; return; }
+
+    try {
+        el.focus();
+        if (el.tagName === 'SELECT') {
+            const wanted = value.toLowerCase();
+            const option = Array.from(el.options).find(o =>
+                o.value && (o.text.toLowerCase().includes(wanted) || o.value.toLowerCase().includes(wanted)));
+            if (!option) { entry.status = 'no_match'; return; }
+            el.value = option.value;
+            entry.text = option.text;
+        } else {
+            setNativeValue(el, value);
+        }
+        fire(el, 'input');
+        fire(el, 'change');
+        el.blur();
+
+        entry.value = el.value;
+        entry.status = 'filled';
+        if (opts.highlight) {
+            el.style.backgroundColor = '#d4edda';
+            el.style.border = '2px solid #28a745';
+        }
+    } catch (e) {
+        entry.status = 'error';
+        entry.error = String(e);
+    }
+};
+
+const report = fields.map((field) => {
+    const entry = {key: field.key, status: 'skipped', selector: null, value: null, text: null};
+    const fieldStarted = performance.now();
+    fillField(field, entry);
+    entry.ms = performance.now() - fieldStarted;
+    return entry;
+});
+
+return {
+    fields: report,
+    filled: report.filter(f => f.status === 'filled').length,
+    fingerprint: fingerprint,
+    cache_hit: useCache,
+    page_ms: performance.now() - started
+};
+"""
+
+
+def batch_fill(driver, fields: List[Dict[str, Any]], highlight: bool = True,
+               portal: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Resolve selectors, set values and fire input/change events for every field
+    in one WebDriver round trip.
+
+    Returns ``{"fields": [...], "filled": n, "page_ms": ..., "roundtrip_ms": ...}``
+    where each field entry has ``key``, ``status`` (filled / not_found /
+    no_match / skipped / error), the ``selector`` that matched and the
+    resulting ``value``.
+
+    With ``portal`` set, selectors learned on a previous run of the same page
+    version are tried first and the ones that matched this time are recorded.
+    """
+    options = {"highlight": highlight}
+    cache = get_selector_cache() if portal else None
+    if cache:
+        entry = cache.get(portal)
+        if entry:
+            options["fingerprint"] = entry["fingerprint"]
+            fields = [dict(field, cached=entry["selectors"].get(field["key"])) for field in fields]
+
+    with span("fill.batch", fields=len(fields)) as trace:
+        started = time.monotonic()
+        report = driver.execute_script(BATCH_FILL_SCRIPT, fields, options)
+        report["roundtrip_ms"] = round((time.monotonic() - started) * 1000, 1)
+        trace["cache_hit"] = report["cache_hit"]
+        for field_report in report["fields"]:
+            add_span("fill.field", field_report.get("ms", 0), field=field_report["key"], status=field_report["status"])
+
+    if cache:
+        if entry and not report["cache_hit"]:
+            logger.info(f"♻️ {portal} page changed, re-learning selectors")
+            cache.invalidate(portal)
+        cache.record(portal, report["fingerprint"], {
+            field["key"]: field["selector"] for field in report["fields"] if field["status"] == "filled"
+        })
+
+    logger.info(f"⚡ Batch filled {report['filled']}/{len(fields)} fields in {report['roundtrip_ms']}ms")
+    return report
+
+
+def field_messages(report: Dict[str, Any], labels: Dict[str, str]) -> List[str]:
+    """Render a batch report as the ✅/❌ messages the RPA endpoints return"""
+    messages = []
+    for entry in report["fields"]:
+        label = labels.get(entry["key"], entry["key"])
+        if entry["status"] == "filled":
+            messages.append(f"✅ {label}: {entry.get('text') or entry.get('value')}")
+        elif entry["status"] == "not_found":
+            messages.append(f"❌ {label} field not found")
+        elif entry["status"] == "no_match":
+            messages.append(f"❌ {label} option not found")
+        elif entry["status"] == "error":
+            messages.append(f"❌ {label} error")
+    return messages
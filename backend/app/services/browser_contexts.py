@@ -0,0 +1,254 @@
+"""
+Shared Chrome Browser Contexts
+One long-lived Chrome serving many concurrent RPA jobs, each in its own CDP browser context
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+from app.config import get_settings
+from app.services.driver_pool import (
+    ChromeDriverPool, DriverPoolExhausted, MemoryPressure, build_chrome_options, create_chrome_driver,
+)
+from app.services.memory_governor import get_memory_governor
+from app.services.rpa_tracing import span
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+HIDE_WEBDRIVER_SCRIPT = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+
+
+class BrowserContextPool:
+    """
+    Leases isolated browser contexts inside a single host Chrome.
+
+    Each checkout creates a CDP browser context (its own cookies, storage and
+    cache) with one tab, and attaches a lightweight ChromeDriver session to that
+    tab via the host's debugger address. Jobs therefore get an ordinary
+    ``webdriver.Chrome`` and run concurrently, while only one Chrome process is
+    paid for. Checkin disposes the context, which closes its tab and wipes its
+    state.
+
+    The host is recycled by the memory governor once its last context is
+    disposed, and checkouts wait for headroom while memory is short.
+
+    Exposes the same checkout/checkin/lease/prewarm/shutdown/stats interface as
+    ChromeDriverPool, so services do not care which backend they get.
+    """
+
+    def __init__(self, max_contexts: int, headless: bool = True, checkout_timeout: float = 60):
+        self.size = max_contexts
+        self.headless = headless
+        self.checkout_timeout = checkout_timeout
+
+        self._host: Optional[webdriver.Chrome] = None
+        self._host_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_contexts)
+        self._leases: Dict[int, Tuple[str, str]] = {}
+        self._attaching = 0  # Contexts created but not yet in _leases
+        self._closed = False
+
+        self.host_launches = 0
+        self.created_count = 0
+
+    def _ensure_host(self) -> webdriver.Chrome:
+        """Return the host Chrome, relaunching it if it has died (caller holds _host_lock)"""
+        if self._host is not None and ChromeDriverPool.is_healthy(self._host):
+            return self._host
+
+        if self._host is not None:
+            logger.warning("⚠️ Host Chrome is unhealthy, relaunching (open contexts are lost)")
+            try:
+                self._host.quit()
+            except Exception:
+                pass
+            self._leases.clear()
+
+        started = time.monotonic()
+        self._host = create_chrome_driver(build_chrome_options(headless=self.headless))
+        self.host_launches += 1
+        logger.info(f"✅ Host Chrome for browser contexts launched in {time.monotonic() - started:.2f}s "
+                    f"(headless={self.headless})")
+        return self._host
+
+    def _attach(self, debugger_address: str, target_id: str) -> webdriver.Chrome:
+        """Attach a ChromeDriver session to one tab of the host Chrome"""
+        options = Options()
+        options.debugger_address = debugger_address
+        driver = create_chrome_driver(options)
+        try:
+            driver.switch_to.window(target_id)
+            driver.implicitly_wait(10)
+            driver.set_page_load_timeout(30)
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": HIDE_WEBDRIVER_SCRIPT})
+        except Exception:
+            # Nobody else holds this ChromeDriver yet; don't leave its process behind
+            try:
+                driver.quit()
+            except Exception as e:
+                logger.warning(f"⚠️ Error quitting half-attached context driver: {e}")
+            raise
+        return driver
+
+    def prewarm(self, count: Optional[int] = None):
+        """Start the host Chrome; contexts themselves are cheap to create on demand"""
+        try:
+            with self._host_lock:
+                self._ensure_host()
+        except Exception as e:
+            logger.error(f"❌ Host Chrome pre-warm failed: {e}")
+
+    def checkout(self, timeout: Optional[float] = None) -> webdriver.Chrome:
+        """Create an isolated context and return a driver bound to its tab"""
+        if self._closed:
+            raise DriverPoolExhausted("Browser context pool is shut down")
+
+        timeout = self.checkout_timeout if timeout is None else timeout
+        with span("driver.checkout", backend="contexts"):
+            if not self._slots.acquire(timeout=timeout):
+                raise DriverPoolExhausted(f"No browser context available after {timeout}s")
+
+            governor = get_memory_governor()
+            pressure = governor.wait_for_headroom(min(governor.checkout_wait, timeout),
+                                                  relieve=lambda: self._recycle_host(force=True))
+            if pressure:
+                self._slots.release()
+                raise MemoryPressure(f"Not enough memory for a browser context: {pressure}")
+            return self._create_context()
+
+    def _create_context(self) -> webdriver.Chrome:
+        """Open a context and tab on the host and attach a driver (caller holds a slot)"""
+        context_id = None
+        try:
+            started = time.monotonic()
+            with self._host_lock:
+                host = self._ensure_host()
+                context_id = host.execute_cdp_cmd("Target.createBrowserContext", {})["browserContextId"]
+                target_id = host.execute_cdp_cmd("Target.createTarget", {
+                    "url": "about:blank",
+                    "browserContextId": context_id,
+                })["targetId"]
+                debugger_address = host.capabilities["goog:chromeOptions"]["debuggerAddress"]
+                self._attaching += 1
+
+            try:
+                driver = self._attach(debugger_address, target_id)
+                self._leases[id(driver)] = (context_id, target_id)
+            finally:
+                with self._host_lock:
+                    self._attaching -= 1
+            self.created_count += 1
+            logger.info(f"🧩 Browser context {context_id[:8]} leased in {time.monotonic() - started:.2f}s")
+            return driver
+        except Exception:
+            if context_id:
+                self._dispose(context_id)
+            self._slots.release()
+            raise
+
+    def _dispose(self, context_id: str):
+        try:
+            with self._host_lock:
+                if self._host is not None:
+                    self._host.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": context_id})
+        except Exception as e:
+            logger.warning(f"⚠️ Disposing browser context failed: {e}")
+
+    def checkin(self, driver: Optional[webdriver.Chrome], discard: bool = False):
+        """Detach the job's driver and dispose its context (always fresh, so ``discard`` is implied)"""
+        if driver is None:
+            return
+
+        try:
+            lease = self._leases.pop(id(driver), None)
+            try:
+                # With a debugger address, quit() ends the ChromeDriver session but leaves Chrome running
+                driver.quit()
+            except Exception as e:
+                logger.warning(f"⚠️ Error detaching context driver: {e}")
+            if lease:
+                self._dispose(lease[0])
+            self._recycle_host()
+        finally:
+            self._slots.release()
+
+    def _recycle_host(self, force: bool = False):
+        """
+        Quit the host Chrome when no context is open and the governor says it
+        grew too large or memory is short (``force``: whenever it is idle);
+        the next checkout relaunches it
+        """
+        with self._host_lock:
+            if self._host is None or self._leases or self._attaching:
+                return
+            reason = "idle under memory pressure" if force else get_memory_governor().recycle_reason(self._host)
+            if not reason:
+                return
+            logger.info(f"♻️ Recycling host Chrome: {reason}")
+            try:
+                self._host.quit()
+            except Exception as e:
+                logger.warning(f"⚠️ Error quitting host Chrome: {e}")
+            self._host = None
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None):
+        """Context manager around checkout/checkin"""
+        driver = self.checkout(timeout)
+        try:
+            yield driver
+        finally:
+            self.checkin(driver)
+
+    def shutdown(self):
+        """Quit the host Chrome, closing every context"""
+        self._closed = True
+        with self._host_lock:
+            if self._host is not None:
+                try:
+                    self._host.quit()
+                except Exception as e:
+                    logger.warning(f"⚠️ Error quitting host Chrome: {e}")
+                self._host = None
+
+    def stats(self) -> Dict[str, Any]:
+        in_use = len(self._leases)
+        return {
+            "backend": "contexts",
+            "headless": self.headless,
+            "size": self.size,
+            "in_use": in_use,
+            "idle": self.size - in_use,
+            "host_alive": self._host is not None,
+            "host_launches": self.host_launches,
+            "created": self.created_count,
+        }
+
+
+_context_pools: Dict[bool, BrowserContextPool] = {}
+_context_pools_lock = threading.Lock()
+
+
+def get_context_pool(headless: bool = True) -> BrowserContextPool:
+    """Get or create the shared browser context pool for the given browser mode"""
+    with _context_pools_lock:
+        if headless not in _context_pools:
+            _context_pools[headless] = BrowserContextPool(
+                max_contexts=settings.RPA_MAX_BROWSER_CONTEXTS,
+                headless=headless,
+                checkout_timeout=settings.RPA_DRIVER_CHECKOUT_TIMEOUT,
+            )
+        return _context_pools[headless]
+
+
+def shutdown_context_pools():
+    with _context_pools_lock:
+        for pool in _context_pools.values():
+            pool.shutdown()
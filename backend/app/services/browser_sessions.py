@@ -0,0 +1,217 @@
+"""
+Browser Session Registry
+Keeps filled-in browsers open for the user to review without holding a request thread
+"""
+
+import time
+import uuid
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Records the time of the user's last click or keypress in the page
+ACTIVITY_LISTENER_SCRIPT = """
+if (!window.__rpaActivity) {
+  window.__rpaActivity = true;
+  window.__rpaLastInput = Date.now();
+  const mark = () => { window.__rpaLastInput = Date.now(); };
+  ['click', 'keydown', 'input', 'scroll'].forEach(e => document.addEventListener(e, mark, true));
+}
+"""
+ACTIVITY_PROBE_SCRIPT = "return [location.href, window.__rpaLastInput || 0];"
+
+
+@dataclass
+class BrowserSession:
+    """A driver handed over to the user after automation finished"""
+    session_id: str
+    driver: Any
+    headless: bool
+    portal: str
+    label: str
+    idle_timeout: float
+    created_at: float = field(default_factory=time.time)
+    last_active: float = field(default_factory=time.time)
+    last_probe: Any = None
+
+    def info(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "session_id": self.session_id,
+            "portal": self.portal,
+            "label": self.label,
+            "headless": self.headless,
+            "age_seconds": round(now - self.created_at),
+            "idle_seconds": round(now - self.last_active),
+            "idle_timeout": self.idle_timeout,
+        }
+
+
+class BrowserSessionRegistry:
+    """
+    Live review sessions by id. ``detach()`` takes ownership of a pooled
+    driver so the request returns at once; the session ends when the user
+    closes it through the API, goes idle for its timeout, exceeds
+    RPA_REVIEW_SESSION_MAX_SECONDS or closes the browser window.
+
+    A reaper thread checks every RPA_REVIEW_SESSION_REAP_SECONDS. Clicks and
+    typing in the page (or navigating, e.g. submitting the form) count as
+    activity. Each process owns its own sessions, so a worker process reaps
+    the browsers it detached.
+    """
+
+    def __init__(self, reap_interval: float, max_age: float):
+        self.reap_interval = reap_interval
+        self.max_age = max_age
+        self._sessions: Dict[str, BrowserSession] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.closed_count = 0
+        self.reaped_count = 0
+
+    def detach(self, driver, headless: bool, portal: str, label: str = "",
+               idle_timeout: Optional[float] = None) -> str:
+        """Register a driver for review; the caller must no longer check it in"""
+        session = BrowserSession(
+            session_id=uuid.uuid4().hex[:12],
+            driver=driver,
+            headless=headless,
+            portal=portal,
+            label=label,
+            idle_timeout=idle_timeout or settings.RPA_REVIEW_SESSION_IDLE_SECONDS,
+        )
+        try:
+            driver.execute_script(ACTIVITY_LISTENER_SCRIPT)
+        except Exception as e:
+            logger.debug(f"Activity listener not installed: {e}")
+
+        with self._lock:
+            self._sessions[session.session_id] = session
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap_loop, name="browser-session-reaper", daemon=True)
+                self._reaper.start()
+
+        logger.info(f"🪟 Browser session {session.session_id} open for review ({portal}, "
+                    f"idle timeout {session.idle_timeout:.0f}s)")
+        return session.session_id
+
+    def get(self, session_id: str) -> Optional[BrowserSession]:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def touch(self, session_id: str) -> bool:
+        """Keep a session alive (e.g. the review page is still open in the app)"""
+        session = self.get(session_id)
+        if session is None:
+            return False
+        session.last_active = time.time()
+        return True
+
+    def close(self, session_id: str, reason: str = "closed") -> bool:
+        """End a session and give its driver back to the pool"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+
+        from app.services.driver_pool import get_rpa_browser
+
+        # A session that was abandoned or whose window is gone gets a fresh driver next time
+        discard = reason != "closed"
+        try:
+            get_rpa_browser(headless=session.headless).checkin(session.driver, discard=discard)
+        except Exception as e:
+            logger.error(f"❌ Error releasing browser session {session_id}: {e}")
+
+        if discard:
+            self.reaped_count += 1
+        else:
+            self.closed_count += 1
+        logger.info(f"🧹 Browser session {session_id} ended ({reason})")
+        return True
+
+    def _probe(self, session: BrowserSession) -> bool:
+        """Refresh ``last_active`` from the page; False when the browser is gone"""
+        try:
+            probe = session.driver.execute_script(ACTIVITY_PROBE_SCRIPT)
+        except Exception:
+            return False
+        if session.last_probe is not None and probe != session.last_probe:
+            session.last_active = time.time()
+        session.last_probe = probe
+        return True
+
+    def reap(self) -> int:
+        """Close idle, expired and dead sessions; returns how many were closed"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+
+        now = time.time()
+        reaped = 0
+        for session in sessions:
+            if not self._probe(session):
+                reason = "browser gone"
+            elif now - session.created_at > self.max_age:
+                reason = "max age"
+            elif now - session.last_active > session.idle_timeout:
+                reason = "idle"
+            else:
+                continue
+            if self.close(session.session_id, reason=reason):
+                reaped += 1
+        return reaped
+
+    def _reap_loop(self):
+        while not self._stop.wait(self.reap_interval):
+            try:
+                self.reap()
+            except Exception as e:
+                logger.error(f"❌ Browser session reaper failed: {e}")
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return [session.info() for session in sessions]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            open_sessions = len(self._sessions)
+        return {"open": open_sessions, "closed": self.closed_count, "reaped": self.reaped_count}
+
+    def shutdown(self):
+        """Close every session (app shutdown)"""
+        self._stop.set()
+        with self._lock:
+            session_ids = list(self._sessions)
+        for session_id in session_ids:
+            self.close(session_id, reason="shutdown")
+
+
+_registry: Optional[BrowserSessionRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_browser_sessions() -> BrowserSessionRegistry:
+    """Get or create the process-wide browser session registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = BrowserSessionRegistry(
+                reap_interval=settings.RPA_REVIEW_SESSION_REAP_SECONDS,
+                max_age=settings.RPA_REVIEW_SESSION_MAX_SECONDS,
+            )
+        return _registry
+
+
+def shutdown_browser_sessions():
+    with _registry_lock:
+        registry = _registry
+    if registry is not None:
+        registry.shutdown()
@@ -0,0 +1,293 @@
+"""
+Bulk Submission
+Parses a CSV/NDJSON batch of applications, validates it in one pass and runs each supplier's rows in one session
+"""
+
+import io
+import re
+import csv
+import json
+import uuid
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Any, AsyncIterator, List, Optional, Set, Tuple
+
+from selenium.common.exceptions import WebDriverException
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import RPASubmission, RPASubmissionStatus
+from app.services.rpa_queue import BROWSER_RECIPES, ENGINES, get_rpa_queue, has_engine, http_recipe_for
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SUPPLIER_COLUMNS = ("supplier", "supplier_id", "target_website")
+# Same checks as /api/torrent-automation/start-automation
+REQUIRED_FIELDS = {"torrent-power": ("service_number", "t_number", "mobile", "email")}
+MOBILE_PATTERN = re.compile(r"^\+?\d[\d\s-]{8,}\d$")
+# A row is reported once its job leaves these states (RETRY rows are re-run by the queue)
+PENDING_STATES = (RPASubmissionStatus.QUEUED, RPASubmissionStatus.PROCESSING)
+
+
+@dataclass
+class BulkRow:
+    row: int  # 1-based line/record number in the upload
+    supplier: str
+    data: Dict[str, Any]
+    errors: List[str] = field(default_factory=list)
+
+
+def parse_applications(body: bytes, content_type: str = "") -> List[BulkRow]:
+    """
+    Read CSV (header row, one application per line) or NDJSON (one JSON
+    object per line). Every row names its supplier in a ``supplier`` column;
+    the other columns are the submission data.
+    """
+    text = body.decode("utf-8-sig")
+    content_type = content_type.lower()
+    if "csv" in content_type:
+        is_json = False
+    elif "json" in content_type:
+        is_json = True
+    else:
+        is_json = text.lstrip().startswith("{")
+
+    records: List[Tuple[int, Any]] = []
+    if is_json:
+        for number, line in enumerate(text.splitlines(), start=1):
+            if line.strip():
+                try:
+                    records.append((number, json.loads(line)))
+                except ValueError as e:
+                    records.append((number, f"Invalid JSON: {e}"))
+    else:
+        reader = csv.DictReader(io.StringIO(text))
+        records = [(number, record) for number, record in enumerate(reader, start=2)]
+
+    rows = []
+    for number, record in records:
+        if not isinstance(record, dict):
+            rows.append(BulkRow(number, "", {}, [record if isinstance(record, str) else "Row is not an object"]))
+            continue
+        data = {
+            str(key).strip(): value.strip() if isinstance(value, str) else value
+            for key, value in record.items()
+            if key is not None and value not in (None, "")
+        }
+        supplier = next((str(data.pop(column)) for column in SUPPLIER_COLUMNS if column in data), "")
+        for column in SUPPLIER_COLUMNS:
+            data.pop(column, None)
+        rows.append(BulkRow(number, supplier.lower(), data))
+    return rows
+
+
+def _required_fields(supplier: str) -> List[Tuple[str, List[str]]]:
+    """``(field, accepted source keys)`` the supplier's submission cannot do without"""
+    if supplier in REQUIRED_FIELDS:
+        return [(key, [key]) for key in REQUIRED_FIELDS[supplier]]
+
+    recipe_id = http_recipe_for(supplier)
+    if not recipe_id:
+        return []
+    from app.services.recipe_engine import get_recipe_engine
+    plan = get_recipe_engine().recipe(recipe_id).http or {}
+    defaults = plan.get("defaults", {})
+    return [(name, plan["fields"].get(name, [name])) for name in plan.get("required", []) if name not in defaults]
+
+
+def validate_rows(rows: List[BulkRow]) -> Dict[str, List[BulkRow]]:
+    """Check every row in one pass (errors land on the row); returns the valid rows grouped by supplier"""
+    required: Dict[str, List[Tuple[str, List[str]]]] = {}
+    groups: Dict[str, List[BulkRow]] = {}
+    for row in rows:
+        if row.errors:
+            continue
+        if not row.supplier:
+            row.errors.append("Missing supplier")
+            continue
+        if row.supplier not in required:
+            required[row.supplier] = _required_fields(row.supplier) if has_engine(row.supplier) else None
+        if required[row.supplier] is None:
+            row.errors.append(f"No automated submission for supplier '{row.supplier}'")
+            continue
+
+        for name, sources in required[row.supplier]:
+            if not any(row.data.get(key) for key in sources):
+                row.errors.append(f"Missing {' or '.join(sources)}")
+        mobile = row.data.get("mobile")
+        if mobile and not MOBILE_PATTERN.match(str(mobile)):
+            row.errors.append("Invalid mobile number")
+        email = row.data.get("email")
+        if email and "@" not in str(email):
+            row.errors.append("Invalid email address")
+
+        if not row.errors:
+            groups.setdefault(row.supplier, []).append(row)
+    return groups
+
+
+class SupplierSession:
+    """
+    One portal session reused for every row of a supplier group: a shared
+    HTTP client (connection and cookies) for HTTP-replay suppliers, and one
+    checked-out browser for browser suppliers, opened on first use.
+    """
+
+    def __init__(self, supplier: str):
+        self.supplier = supplier
+        self.http_recipe = http_recipe_for(supplier)
+        self.browser_recipe = BROWSER_RECIPES.get(supplier)
+        self._client = None
+        self._driver = None
+
+    def run(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        result = None
+        if self.http_recipe:
+            from app.services.http_submitter import submit_http, http_client
+            if self._client is None:
+                self._client = http_client()
+            result = submit_http(self.http_recipe, data, self.supplier, client=self._client)
+            if result["success"] or not (result.get("fallback") and settings.RPA_HTTP_FALLBACK_TO_BROWSER):
+                return result
+
+        if self.browser_recipe:
+            return self._run_browser(data)
+        if self.supplier in ENGINES:
+            # A browser engine without a recipe cannot share a session; run it on its own
+            return ENGINES[self.supplier](data)
+        return result
+
+    def _run_browser(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        from app.services.driver_pool import get_rpa_browser
+        from app.services.recipe_engine import get_recipe_engine
+
+        if self._driver is None:
+            self._driver = get_rpa_browser().checkout()
+        engine = get_recipe_engine()
+        try:
+            opened = engine.open(self._driver, self.browser_recipe, headless=True, portal=self.supplier)
+            if not opened["success"]:
+                return {"success": False, "error": opened.get("error", "Page load failed"),
+                        "page_load": opened["page_load"], "screenshots": opened["screenshots"]}
+            result = engine.fill(self._driver, self.browser_recipe, data, portal=self.supplier)
+        except WebDriverException:
+            # The browser died; the next row starts a fresh one
+            get_rpa_browser().checkin(self._driver, discard=True)
+            self._driver = None
+            raise
+        result["page_load"] = opened["page_load"]
+        result["screenshots"] = opened["screenshots"] + result["screenshots"]
+        return result
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        if self._driver is not None:
+            from app.services.driver_pool import get_rpa_browser
+            get_rpa_browser().checkin(self._driver)
+            self._driver = None
+
+
+def row_result(job: RPASubmission, row: int) -> Dict[str, Any]:
+    """The streamed per-row outcome"""
+    result = job.response_data or {}
+    return {
+        "type": "result",
+        "row": row,
+        "supplier": job.target_website,
+        "job_id": job.id,
+        "status": job.status.value,
+        "success": job.status == RPASubmissionStatus.SUCCESS,
+        "confirmation_number": job.confirmation_number,
+        "fields_filled": result["total_filled"] if "total_filled" in result else len(result.get("fields_submitted", [])),
+        "error": job.error_message if job.status != RPASubmissionStatus.SUCCESS else None,
+    }
+
+
+def batch_owner() -> str:
+    from app.services.rpa_queue import worker_id
+    return f"bulk:{worker_id()}:{uuid.uuid4().hex[:8]}"
+
+
+async def stream_batches(owner: str, job_groups: Dict[str, List[int]],
+                         row_numbers: Dict[int, int]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run every supplier group in its own session on the bulk executor and
+    yield each row's outcome as soon as it has one.
+    """
+    loop = asyncio.get_running_loop()
+    results: asyncio.Queue = asyncio.Queue()
+
+    def run_group(supplier: str, job_ids: List[int]):
+        session = SupplierSession(supplier)
+        report = lambda job: loop.call_soon_threadsafe(results.put_nowait, row_result(job, row_numbers[job.id]))
+        try:
+            get_rpa_queue().run_batch(owner, job_ids, session.run, report)
+        finally:
+            session.close()
+
+    groups_done = asyncio.gather(*[
+        loop.run_in_executor(get_bulk_executor(), run_group, supplier, job_ids)
+        for supplier, job_ids in job_groups.items()
+    ], return_exceptions=True)
+
+    reported: Set[int] = set()
+    while len(reported) < len(row_numbers):
+        getter = asyncio.ensure_future(results.get())
+        await asyncio.wait({getter, groups_done}, return_when=asyncio.FIRST_COMPLETED)
+        if not getter.done():
+            getter.cancel()
+            if results.empty():
+                break
+            continue
+        item = getter.result()
+        reported.add(item["job_id"])
+        yield item
+
+    # Rows a group gave up on were handed to the regular queue; follow them there
+    leftover = [job_id for job_id in row_numbers if job_id not in reported]
+    if leftover:
+        async for item in stream_jobs(leftover, row_numbers):
+            yield item
+
+
+async def stream_jobs(job_ids: List[int], row_numbers: Dict[int, int]) -> AsyncIterator[Dict[str, Any]]:
+    """Yield rows as the job queue (or the worker fleet) finishes them, by polling the table"""
+    loop = asyncio.get_running_loop()
+    remaining = set(job_ids)
+
+    def poll() -> List[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            jobs = db.query(RPASubmission).filter(
+                RPASubmission.id.in_(remaining), RPASubmission.status.notin_(PENDING_STATES)
+            ).all()
+            return [row_result(job, row_numbers[job.id]) for job in jobs]
+        finally:
+            db.close()
+
+    while remaining:
+        for item in await loop.run_in_executor(None, poll):
+            remaining.discard(item["job_id"])
+            yield item
+        if remaining:
+            await asyncio.sleep(settings.RPA_WORKER_POLL_SECONDS)
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_bulk_executor() -> ThreadPoolExecutor:
+    """Threads that run supplier groups (one group, one session per thread)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.RPA_BULK_PARALLEL_GROUPS,
+                                           thread_name_prefix="rpa-bulk")
+        return _executor
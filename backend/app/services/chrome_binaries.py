@@ -0,0 +1,199 @@
+"""
+Chrome Binary Resolution
+Finds ChromeDriver and Chrome once per process and remembers them on disk between runs
+"""
+
+import os
+import re
+import json
+import stat
+import shutil
+import logging
+import threading
+import subprocess
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, List, Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+DRIVER_NAME = "chromedriver.exe" if os.name == "nt" else "chromedriver"
+CHROME_CANDIDATES = [
+    "/usr/bin/google-chrome", "/usr/bin/google-chrome-stable",
+    "/usr/bin/chromium-browser", "/usr/bin/chromium",
+]
+DRIVER_CANDIDATES = ["/usr/bin/chromedriver", "/usr/local/bin/chromedriver"]
+
+
+@dataclass
+class ChromeBinaries:
+    """Resolved paths and versions; ``None`` paths leave the choice to Selenium"""
+    driver_path: Optional[str]
+    driver_version: Optional[str]
+    chrome_path: Optional[str]
+    chrome_version: Optional[str]
+    source: str  # setting, system, webdriver-manager or selenium-manager
+    overrides: List[str]  # RPA_CHROMEDRIVER_PATH and RPA_CHROME_BINARY when resolved
+    fingerprint: Dict[str, List[int]]  # path -> [mtime_ns, size] at resolution time
+
+
+def _version(path: str) -> Optional[str]:
+    try:
+        output = subprocess.run([path, "--version"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r"\d+(\.\d+)+", output)
+    return match.group(0) if match else None
+
+
+def _major(version: Optional[str]) -> Optional[str]:
+    return version.split(".")[0] if version else None
+
+
+def _fingerprint(paths: List[Optional[str]]) -> Dict[str, List[int]]:
+    fingerprint = {}
+    for path in paths:
+        if path and os.path.exists(path):
+            info = os.stat(path)
+            fingerprint[path] = [info.st_mtime_ns, info.st_size]
+    return fingerprint
+
+
+def _overrides() -> List[str]:
+    return [settings.RPA_CHROMEDRIVER_PATH, settings.RPA_CHROME_BINARY]
+
+
+def _still_valid(binaries: ChromeBinaries) -> bool:
+    """One stat per binary: unchanged files mean the cached versions still hold"""
+    if binaries.overrides != _overrides():
+        return False
+    try:
+        return _fingerprint(list(binaries.fingerprint)) == binaries.fingerprint
+    except OSError:
+        return False
+
+
+def _webdriver_manager_driver() -> Optional[str]:
+    """Install ChromeDriver with webdriver-manager and fix its THIRD_PARTY_NOTICES path bug"""
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    installed_path = ChromeDriverManager().install()
+    if os.path.basename(installed_path) == DRIVER_NAME:
+        return installed_path
+
+    driver_dir = os.path.dirname(installed_path)
+    for candidate in [
+        os.path.join(driver_dir, DRIVER_NAME),
+        os.path.join(driver_dir, "chromedriver-linux64", DRIVER_NAME),
+        os.path.join(driver_dir, "chromedriver-win32", DRIVER_NAME),
+        os.path.join(os.path.dirname(driver_dir), DRIVER_NAME),
+    ]:
+        if os.path.isfile(candidate):
+            return candidate
+
+    for root, dirs, files in os.walk(os.path.dirname(driver_dir)):
+        if DRIVER_NAME in files:
+            return os.path.join(root, DRIVER_NAME)
+
+    return None
+
+
+def _discover(skip_system_driver: bool = False) -> ChromeBinaries:
+    """The slow path: look everywhere, possibly downloading a driver"""
+    chrome_path = settings.RPA_CHROME_BINARY or next(
+        (path for path in CHROME_CANDIDATES if os.path.exists(path)), None
+    )
+    chrome_version = _version(chrome_path) if chrome_path else None
+
+    source = "selenium-manager"
+    driver_path = None
+    if settings.RPA_CHROMEDRIVER_PATH:
+        driver_path, source = settings.RPA_CHROMEDRIVER_PATH, "setting"
+    elif not skip_system_driver:
+        system_driver = next((path for path in DRIVER_CANDIDATES if os.path.exists(path)), None) \
+            or shutil.which(DRIVER_NAME)
+        if system_driver:
+            driver_path, source = system_driver, "system"
+
+    if driver_path is None:
+        try:
+            driver_path = _webdriver_manager_driver()
+            if driver_path:
+                source = "webdriver-manager"
+                if os.name != "nt":
+                    os.chmod(driver_path, stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
+        except Exception as e:
+            logger.warning(f"⚠️ webdriver-manager could not provide ChromeDriver: {e}")
+
+    driver_version = _version(driver_path) if driver_path else None
+    if chrome_version and driver_version and _major(chrome_version) != _major(driver_version):
+        logger.warning(f"⚠️ ChromeDriver {driver_version} does not match Chrome {chrome_version}")
+
+    return ChromeBinaries(
+        driver_path=driver_path,
+        driver_version=driver_version,
+        chrome_path=chrome_path,
+        chrome_version=chrome_version,
+        source=source,
+        overrides=_overrides(),
+        fingerprint=_fingerprint([driver_path, chrome_path]),
+    )
+
+
+def _load_cache(path: str) -> Optional[ChromeBinaries]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return ChromeBinaries(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _save_cache(path: str, binaries: ChromeBinaries):
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(asdict(binaries), f, indent=2)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.warning(f"⚠️ Could not cache Chrome binary locations: {e}")
+
+
+_resolved: Optional[ChromeBinaries] = None
+_resolve_lock = threading.Lock()
+
+
+def resolve_chrome_binaries(force: bool = False, skip_system_driver: bool = False) -> ChromeBinaries:
+    """
+    ChromeDriver and Chrome for this process. The first call reads the disk
+    cache (RPA_CHROME_BINARY_CACHE) and trusts it if the files are unchanged,
+    otherwise discovers and re-caches; later calls are free. ``force``
+    re-discovers, e.g. after Chrome was upgraded under a running process.
+    """
+    global _resolved
+    with _resolve_lock:
+        if _resolved is not None and not force:
+            return _resolved
+
+        cache_path = settings.RPA_CHROME_BINARY_CACHE
+        cached = None if force else _load_cache(cache_path)
+        if cached is not None and _still_valid(cached):
+            _resolved = cached
+        else:
+            _resolved = _discover(skip_system_driver=skip_system_driver)
+            _save_cache(cache_path, _resolved)
+            logger.info(f"🔎 Resolved ChromeDriver {_resolved.driver_version} ({_resolved.source}) "
+                        f"and Chrome {_resolved.chrome_version}")
+        return _resolved
+
+
+def chrome_binaries_info() -> Dict[str, Any]:
+    """What this process (or, before its first launch, the disk cache) resolved - never discovers"""
+    binaries = _resolved or _load_cache(settings.RPA_CHROME_BINARY_CACHE)
+    if binaries is None:
+        return {"resolved": False}
+    info = asdict(binaries)
+    info.pop("fingerprint")
+    return info
@@ -0,0 +1,367 @@
+"""
+Chrome WebDriver Pool
+Keeps pre-launched Chrome drivers warm and shares them between the RPA services
+"""
+
+import time
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Set
+from urllib.parse import urlsplit
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+from app.config import get_settings
+from app.services.chrome_binaries import resolve_chrome_binaries
+from app.services.memory_governor import get_memory_governor
+from app.services.rpa_tracing import span
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+
+class DriverPoolExhausted(Exception):
+    """Raised when no driver becomes available within the checkout timeout"""
+
+
+class MemoryPressure(DriverPoolExhausted):
+    """Raised when the container stayed short of memory for the whole checkout wait"""
+
+
+def build_chrome_options(headless: bool = True, window_size: str = "1920,1080") -> Options:
+    """Build the Chrome options shared by every pooled driver"""
+    options = Options()
+
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--disable-software-rasterizer")
+    else:
+        options.add_argument("--start-maximized")
+
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-background-timer-throttling")
+    options.add_argument("--disable-backgrounding-occluded-windows")
+    options.add_argument("--disable-renderer-backgrounding")
+    options.add_argument("--disable-features=TranslateUI")
+    options.add_argument("--disable-ipc-flooding-protection")
+    options.add_argument(f"--window-size={window_size}")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-plugins")
+    options.add_argument("--disable-notifications")
+    options.add_argument("--disable-popup-blocking")
+    options.add_argument("--disable-translate")
+    options.add_argument("--disable-logging")
+    options.add_argument("--no-first-run")
+    options.add_argument("--no-default-browser-check")
+    options.add_argument("--ignore-certificate-errors")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option("useAutomationExtension", False)
+    options.add_argument(f"--user-agent={USER_AGENT}")
+
+    chrome_path = resolve_chrome_binaries().chrome_path
+    if chrome_path:
+        options.binary_location = chrome_path
+
+    return options
+
+
+def create_chrome_driver(options: Options) -> webdriver.Chrome:
+    """Launch Chrome with the ChromeDriver resolved at startup"""
+    binaries = resolve_chrome_binaries()
+    if binaries.driver_path:
+        try:
+            return webdriver.Chrome(service=Service(binaries.driver_path), options=options)
+        except Exception as e:
+            logger.warning(f"⚠️ ChromeDriver {binaries.driver_path} failed: {e}")
+
+        # Chrome or the driver changed under us (e.g. a Chrome auto-update); look again once
+        retry = resolve_chrome_binaries(force=True, skip_system_driver=binaries.source == "system")
+        if retry.driver_path and retry.driver_path != binaries.driver_path:
+            try:
+                return webdriver.Chrome(service=Service(retry.driver_path), options=options)
+            except Exception as e:
+                logger.warning(f"⚠️ ChromeDriver {retry.driver_path} failed: {e}")
+
+    # Last resort: let Selenium Manager find a driver
+    return webdriver.Chrome(options=options)
+
+
+class ChromeDriverPool:
+    """
+    Bounded pool of warm Chrome drivers.
+
+    Drivers are checked out for one job and checked back in afterwards. A driver
+    that fails its health check, has served ``max_uses`` jobs or is returned as
+    broken is quit and replaced lazily, so Chrome start-up is paid once per
+    driver instead of once per submission. The memory governor also recycles
+    drivers that grew too large, and holds checkouts while memory is short.
+    """
+
+    def __init__(self, size: int, max_uses: int, headless: bool = True,
+                 checkout_timeout: float = 60):
+        self.size = size
+        self.max_uses = max_uses
+        self.headless = headless
+        self.checkout_timeout = checkout_timeout
+
+        self._idle: "queue.LifoQueue[webdriver.Chrome]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._uses: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.created_count = 0
+        self.recycled_count = 0
+
+    def _launch(self) -> webdriver.Chrome:
+        started = time.monotonic()
+        driver = create_chrome_driver(build_chrome_options(headless=self.headless))
+        driver.implicitly_wait(10)
+        driver.set_page_load_timeout(30)
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+            "source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+        })
+
+        with self._lock:
+            self._uses[id(driver)] = 0
+            self.created_count += 1
+
+        logger.info(f"✅ Pooled Chrome driver launched in {time.monotonic() - started:.2f}s (headless={self.headless})")
+        return driver
+
+    def _quit(self, driver: webdriver.Chrome):
+        with self._lock:
+            self._uses.pop(id(driver), None)
+            self.recycled_count += 1
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"⚠️ Error quitting pooled driver: {e}")
+
+    @staticmethod
+    def is_healthy(driver: webdriver.Chrome) -> bool:
+        """Cheap liveness probe - a crashed Chrome or dead ChromeDriver fails this"""
+        try:
+            return driver.execute_script("return 1") == 1 and bool(driver.window_handles)
+        except Exception:
+            return False
+
+    def prewarm(self, count: Optional[int] = None):
+        """Launch up to ``count`` idle drivers ahead of the first job"""
+        count = min(self.size, self.size if count is None else count)
+        launched = 0
+        for _ in range(count):
+            with self._lock:
+                if len(self._uses) >= self.size:
+                    break
+            try:
+                self._idle.put(self._launch())
+                launched += 1
+            except Exception as e:
+                logger.error(f"❌ Driver pre-warm failed: {e}")
+                break
+        logger.info(f"🔥 Driver pool pre-warmed with {launched} driver(s)")
+
+    def checkout(self, timeout: Optional[float] = None) -> webdriver.Chrome:
+        """Take a healthy driver from the pool, launching one if none are idle"""
+        if self._closed:
+            raise DriverPoolExhausted("Driver pool is shut down")
+
+        timeout = self.checkout_timeout if timeout is None else timeout
+        with span("driver.checkout", backend="pool") as trace:
+            if not self._slots.acquire(timeout=timeout):
+                raise DriverPoolExhausted(f"No Chrome driver available after {timeout}s")
+
+            try:
+                governor = get_memory_governor()
+                pressure = governor.wait_for_headroom(min(governor.checkout_wait, timeout), relieve=self._shed_idle)
+                if pressure:
+                    raise MemoryPressure(f"Not enough memory for a Chrome driver: {pressure}")
+
+                while True:
+                    try:
+                        driver = self._idle.get_nowait()
+                    except queue.Empty:
+                        trace["launched"] = True
+                        return self._launch()
+
+                    if self.is_healthy(driver):
+                        return driver
+
+                    logger.warning("⚠️ Discarding unhealthy pooled driver")
+                    self._quit(driver)
+            except Exception:
+                self._slots.release()
+                raise
+
+    def checkin(self, driver: Optional[webdriver.Chrome], discard: bool = False):
+        """Return a driver to the pool, recycling it when worn out or broken"""
+        if driver is None:
+            return
+
+        try:
+            with self._lock:
+                uses = self._uses.get(id(driver), 0) + 1
+                self._uses[id(driver)] = uses
+
+            if discard or self._closed or uses >= self.max_uses:
+                self._quit(driver)
+                return
+
+            reason = get_memory_governor().recycle_reason(driver)
+            if reason:
+                logger.info(f"♻️ Recycling pooled driver: {reason}")
+                self._quit(driver)
+            elif not self._reset(driver):
+                self._quit(driver)
+            else:
+                self._idle.put(driver)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _visited_origins(driver: webdriver.Chrome) -> Set[str]:
+        """Origins the current tab navigated to during the job (its history, not just the page it ended on)"""
+        try:
+            history = driver.execute_cdp_cmd("Page.getNavigationHistory", {})
+            urls = [entry.get("url", "") for entry in history.get("entries", [])]
+        except Exception:
+            urls = []
+        urls.append(driver.current_url)
+
+        origins = set()
+        for url in urls:
+            parsed = urlsplit(url)
+            if parsed.scheme in ("http", "https") and parsed.netloc:
+                origins.add(f"{parsed.scheme}://{parsed.netloc}")
+        return origins
+
+    def _reset(self, driver: webdriver.Chrome) -> bool:
+        """
+        Drop per-job state so the next job starts from a clean page. Cookies
+        are cleared browser-wide (SSO and login redirects set them on other
+        hosts) and storage for every origin any tab visited or that holds a
+        cookie, so one applicant's portal session never reaches the next job.
+        """
+        try:
+            handles = driver.window_handles
+            origins = set()
+            for handle in reversed(handles):
+                driver.switch_to.window(handle)
+                origins |= self._visited_origins(driver)
+                if handle != handles[0]:
+                    driver.close()
+            driver.switch_to.window(handles[0])
+
+            for cookie in driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", []):
+                host = cookie.get("domain", "").lstrip(".")
+                if host:
+                    origins.update((f"https://{host}", f"http://{host}"))
+
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": []})
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            for origin in origins:
+                driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+            driver.get("about:blank")
+            driver.execute_cdp_cmd("Page.resetNavigationHistory", {})
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Pooled driver reset failed: {e}")
+            return False
+
+    def _shed_idle(self):
+        """Quit every idle driver to give memory back (relaunched on demand)"""
+        shed = 0
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+                shed += 1
+            except queue.Empty:
+                break
+        if shed:
+            logger.info(f"🧠 Quit {shed} idle driver(s) under memory pressure")
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None):
+        """Context manager around checkout/checkin; a raised error recycles the driver"""
+        driver = self.checkout(timeout)
+        try:
+            yield driver
+        except Exception:
+            self.checkin(driver, discard=not self.is_healthy(driver))
+            raise
+        else:
+            self.checkin(driver)
+
+    def shutdown(self):
+        """Quit every idle driver; checked-out drivers are quit when returned"""
+        self._closed = True
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            live = len(self._uses)
+        idle = self._idle.qsize()
+        return {
+            "backend": "pool",
+            "headless": self.headless,
+            "size": self.size,
+            "live": live,
+            "idle": idle,
+            "in_use": live - idle,
+            "max_uses": self.max_uses,
+            "created": self.created_count,
+            "recycled": self.recycled_count,
+        }
+
+
+# One pool per browser mode: headless for background jobs, visible for login-assisted flows
+_pools: Dict[bool, ChromeDriverPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_driver_pool(headless: bool = True) -> ChromeDriverPool:
+    """Get or create the shared driver pool for the given browser mode"""
+    with _pools_lock:
+        if headless not in _pools:
+            _pools[headless] = ChromeDriverPool(
+                size=settings.RPA_DRIVER_POOL_SIZE if headless else settings.RPA_VISIBLE_DRIVER_POOL_SIZE,
+                max_uses=settings.RPA_DRIVER_MAX_USES,
+                headless=headless,
+                checkout_timeout=settings.RPA_DRIVER_CHECKOUT_TIMEOUT,
+            )
+        return _pools[headless]
+
+
+def get_rpa_browser(headless: bool = True):
+    """
+    Driver source for RPA jobs, chosen by RPA_BROWSER_BACKEND: the warm driver
+    pool, or browser contexts in one shared Chrome. Both expose checkout/checkin.
+    """
+    if settings.RPA_BROWSER_BACKEND == "contexts":
+        from app.services.browser_contexts import get_context_pool
+        return get_context_pool(headless=headless)
+    return get_driver_pool(headless=headless)
+
+
+def shutdown_driver_pools():
+    """Quit all pooled drivers and shared Chromes (called on application shutdown)"""
+    from app.services.browser_contexts import shutdown_context_pools
+
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown()
+    shutdown_context_pools()
@@ -0,0 +1,122 @@
+"""
+Expiry Scheduler
+Min-heap of record deadlines that evicts each record at its expires_at
+"""
+
+import time
+import heapq
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryScheduler:
+    """
+    Tracks ``key -> deadline`` in a min-heap so the next expiry is always at the
+    top: scheduling and eviction are O(log n) and no full scan is ever needed.
+
+    Re-scheduling a key just pushes a new heap entry; the superseded entry is
+    skipped when it surfaces (lazy deletion). ``run()`` is the asyncio loop that
+    sleeps until the earliest deadline and hands due keys to ``evict``.
+    """
+
+    def __init__(self, evict: Callable[[List[str]], int], max_sleep: float = 300,
+                 retry_delay: float = 30):
+        self.evict = evict
+        self.max_sleep = max_sleep
+        self.retry_delay = retry_delay
+
+        self._heap: List[Tuple[float, str]] = []
+        self._deadlines: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+        self.evicted_count = 0
+        self.last_run: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    def schedule(self, key: str, expires_at: datetime):
+        """Register (or move) a key's deadline; safe to call from any thread"""
+        deadline = expires_at.timestamp()
+        with self._lock:
+            self._deadlines[key] = deadline
+            heapq.heappush(self._heap, (deadline, key))
+            earliest = self._heap[0][0] == deadline
+
+        # A new earliest deadline must cut the current sleep short
+        if earliest and self._loop and self._wakeup:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def cancel(self, key: str):
+        """Forget a key (e.g. deleted explicitly); its heap entry is dropped lazily"""
+        with self._lock:
+            self._deadlines.pop(key, None)
+
+    def _pop_due(self, now: float) -> List[str]:
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, key = heapq.heappop(self._heap)
+                if self._deadlines.get(key) == deadline:
+                    del self._deadlines[key]
+                    due.append(key)
+        return due
+
+    def _next_delay(self, now: float) -> float:
+        with self._lock:
+            # Discard superseded entries so the top of the heap is a live deadline
+            while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return self.max_sleep
+            return min(self.max_sleep, max(0.0, self._heap[0][0] - now))
+
+    async def run(self):
+        """Evict due keys forever; cancel the task to stop"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        logger.info(f"⏲️ Expiry scheduler started with {len(self._deadlines)} pending record(s)")
+
+        while True:
+            due = self._pop_due(time.time())
+            if due:
+                try:
+                    evicted = await asyncio.to_thread(self.evict, due)
+                    self.evicted_count += evicted
+                    self.last_error = None
+                    logger.info(f"🧹 Evicted {evicted} expired record(s)")
+                except Exception as e:
+                    self.last_error = str(e)
+                    logger.error(f"❌ Expiry eviction failed, retrying in {self.retry_delay:.0f}s: {e}")
+                    retry_at = datetime.fromtimestamp(time.time() + self.retry_delay)
+                    for key in due:
+                        self.schedule(key, retry_at)
+                self.last_run = datetime.now().isoformat()
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._next_delay(time.time()))
+            except asyncio.TimeoutError:
+                pass
+
+    def metrics(self) -> Dict[str, Any]:
+        now = time.time()
+        self._next_delay(now)  # drops superseded entries from the top of the heap
+        with self._lock:
+            backlog = len(self._deadlines)
+            heap_size = len(self._heap)
+            next_deadline = self._heap[0][0] if self._heap else None
+        return {
+            "evicted": self.evicted_count,
+            "backlog": backlog,
+            "heap_size": heap_size,
+            "next_expiry_in_seconds": round(next_deadline - now, 1) if next_deadline else None,
+            "running": self._loop is not None,
+            "last_run": self.last_run,
+            "last_error": self.last_error,
+        }
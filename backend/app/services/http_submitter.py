@@ -0,0 +1,226 @@
+"""
+HTTP Form Submitter
+Browserless submission for portals whose forms are a plain HTML POST
+"""
+
+import re
+import time
+import logging
+from contextlib import nullcontext
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+from app.config import get_settings
+from app.services.recipe_engine import get_recipe_engine
+from app.services.rpa_tracing import span
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+CSRF_META_NAMES = ("csrf-token", "csrf_token", "_csrf", "xsrf-token")
+# Fields a plain POST cannot satisfy - these forms go to the browser engine
+BROWSER_ONLY_MARKERS = ("captcha", "recaptcha", "otp")
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+class NeedsBrowser(Exception):
+    """The form cannot be submitted without a real browser"""
+
+
+class FormParser(HTMLParser):
+    """Collects every form with its inputs, selects and textareas, plus CSRF meta tags"""
+
+    def __init__(self):
+        super().__init__()
+        self.forms: List[Dict[str, Any]] = []
+        self.meta: Dict[str, str] = {}
+        self._form: Optional[Dict[str, Any]] = None
+        self._select: Optional[Dict[str, Any]] = None
+        self._option: Optional[Dict[str, Any]] = None
+        self._textarea: Optional[Dict[str, Any]] = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {key: value or "" for key, value in attrs}
+        if tag == "meta" and attrs.get("name", "").lower() in CSRF_META_NAMES:
+            self.meta[attrs["name"].lower()] = attrs.get("content", "")
+        elif tag == "form":
+            self._form = {
+                "id": attrs.get("id", ""),
+                "action": attrs.get("action", ""),
+                "method": attrs.get("method", "get").lower(),
+                "fields": [],
+            }
+            self.forms.append(self._form)
+        elif self._form is None:
+            return
+        elif tag == "input" and attrs.get("name"):
+            input_type = attrs.get("type", "text").lower()
+            if input_type in ("checkbox", "radio") and "checked" not in attrs:
+                value = None
+            else:
+                value = attrs.get("value", "")
+            self._form["fields"].append({
+                "name": attrs["name"], "type": input_type, "value": value, "required": "required" in attrs,
+            })
+        elif tag == "select" and attrs.get("name"):
+            self._select = {"name": attrs["name"], "type": "select", "value": None, "options": [],
+                            "required": "required" in attrs}
+            self._form["fields"].append(self._select)
+        elif tag == "option" and self._select is not None:
+            self._option = {"value": attrs.get("value"), "text": "", "selected": "selected" in attrs}
+            self._select["options"].append(self._option)
+        elif tag == "textarea" and attrs.get("name"):
+            self._textarea = {"name": attrs["name"], "type": "textarea", "value": "", "required": "required" in attrs}
+            self._form["fields"].append(self._textarea)
+
+    def handle_data(self, data):
+        if self._option is not None:
+            self._option["text"] += data
+        elif self._textarea is not None:
+            self._textarea["value"] += data
+
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self._form = None
+        elif tag == "select" and self._select is not None:
+            options = self._select["options"]
+            for option in options:
+                if option["value"] is None:
+                    option["value"] = option["text"].strip()
+            chosen = next((o for o in options if o["selected"]), options[0] if options else None)
+            self._select["value"] = chosen["value"] if chosen else ""
+            self._select = None
+        elif tag == "option":
+            self._option = None
+        elif tag == "textarea":
+            self._textarea = None
+
+
+def http_client() -> httpx.Client:
+    return httpx.Client(timeout=settings.RPA_HTTP_TIMEOUT, follow_redirects=True,
+                        headers={"User-Agent": USER_AGENT})
+
+
+def _match_option(field: Dict[str, Any], wanted: str) -> Optional[str]:
+    """Same rule as the batch filler: first non-empty option whose text or value contains the wanted value"""
+    wanted = wanted.lower()
+    for option in field["options"]:
+        if option["value"] and (wanted in option["text"].lower() or wanted in option["value"].lower()):
+            return option["value"]
+    return None
+
+
+def build_payload(form: Dict[str, Any], plan: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Start from what the browser would send untouched (hidden fields, CSRF
+    tokens, preselected options) and overlay the mapped submission values.
+    """
+    names = {field["name"].lower() for field in form["fields"]}
+    if any(marker in name for name in names for marker in BROWSER_ONLY_MARKERS):
+        raise NeedsBrowser("form has a captcha/OTP field")
+    if any(field["type"] == "file" for field in form["fields"]):
+        raise NeedsBrowser("form needs a file upload")
+
+    payload = {field["name"]: field["value"] for field in form["fields"]
+               if field["value"] is not None and field["type"] not in ("submit", "button", "image", "reset")}
+
+    defaults = plan.get("defaults", {})
+    by_name = {field["name"]: field for field in form["fields"]}
+    for name, sources in plan["fields"].items():
+        value = next((data[key] for key in sources if data.get(key)), None) or defaults.get(name)
+        field = by_name.get(name)
+        if value is None or field is None:
+            continue
+        if field["type"] == "select":
+            option = _match_option(field, str(value))
+            if option is None:
+                raise ValueError(f"No '{name}' option matches '{value}'")
+            value = option
+        payload[name] = str(value)
+
+    missing = [field["name"] for field in form["fields"] if field["required"] and not payload.get(field["name"])]
+    if missing:
+        raise ValueError(f"Missing required field(s): {', '.join(missing)}")
+    return payload
+
+
+def submit_http(recipe_id: str, data: Dict[str, Any], supplier_id: str,
+                client: Optional[httpx.Client] = None) -> Dict[str, Any]:
+    """
+    Fetch the recipe's form, post the mapped values with the form's hidden
+    fields and CSRF token, and read the confirmation number from the reply.
+
+    ``fallback`` in the result is True when the form turned out to need a
+    browser, so the caller can hand the job to the browser engine. Pass a
+    ``client`` (see http_client()) to reuse one connection and portal session
+    across submissions.
+    """
+    plan = get_recipe_engine().recipe(recipe_id).http
+    if not plan:
+        return {"success": False, "fallback": True, "engine": "http", "error": f"{recipe_id} has no HTTP plan"}
+
+    demo = "{demo_base_url}" in plan["form_url"]
+    if demo and settings.RPA_MODE != "DEMO":
+        # A demo confirmation number must never be recorded against a real application
+        return {"success": False, "fallback": False, "engine": "http",
+                "error": f"{recipe_id} targets the demo portal and RPA_MODE is {settings.RPA_MODE}"}
+
+    form_url = plan["form_url"].format(demo_base_url=settings.DEMO_BASE_URL, supplier_id=supplier_id)
+    started = time.monotonic()
+    try:
+        # One client per submission unless the caller shares one: the session
+        # cookie from the GET must go with the POST
+        with (nullcontext(client) if client is not None else http_client()) as client:
+            with span("http.get_form"):
+                page = client.get(form_url)
+                page.raise_for_status()
+
+            parser = FormParser()
+            parser.feed(page.text)
+            form_id = plan.get("form_id")
+            form = next((f for f in parser.forms if not form_id or f["id"] == form_id), None)
+            if form is None:
+                raise NeedsBrowser("no static form in the page (rendered by JavaScript?)")
+
+            payload = build_payload(form, plan, data)
+            headers = {"Referer": str(page.url)}
+            csrf = next(iter(parser.meta.values()), None)
+            if csrf:
+                headers["X-CSRF-Token"] = csrf
+
+            action = urljoin(str(page.url), form["action"] or str(page.url))
+            with span("http.submit", method=form["method"]):
+                if form["method"] == "post":
+                    response = client.post(action, data=payload, headers=headers)
+                else:
+                    response = client.get(action, params=payload, headers=headers)
+    except NeedsBrowser as e:
+        logger.info(f"🌐 {supplier_id} needs the browser engine: {e}")
+        return {"success": False, "fallback": True, "engine": "http", "error": str(e)}
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error(f"❌ HTTP submission to {supplier_id} failed: {e}")
+        return {"success": False, "fallback": False, "engine": "http", "error": str(e)}
+
+    http_ms = round((time.monotonic() - started) * 1000, 1)
+    match = re.search(plan.get("confirmation_pattern", r"[A-Z]{2,}\d{6,}"), response.text)
+    result = {
+        "success": response.is_success and match is not None,
+        "fallback": False,
+        "engine": "http",
+        "demo": demo,
+        "status_code": response.status_code,
+        "confirmation_number": match.group(0) if match else None,
+        "fields_submitted": sorted(payload),
+        "http_ms": http_ms,
+    }
+    if not result["success"]:
+        result["error"] = f"No confirmation number in response (HTTP {response.status_code})"
+
+    logger.info(f"⚡ {supplier_id} submitted over HTTP in {http_ms}ms: {result['confirmation_number']}")
+    return result
@@ -8,16 +8,39 @@ import time
 import logging
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
+from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
-from typing import Dict, Any, Optional
-import os
-from datetime import datetime
+from selenium.common.exceptions import TimeoutException
+from typing import Callable, Dict, Any, Optional, Tuple
+
+from app.services.browser_sessions import get_browser_sessions
+from app.services.driver_pool import get_rpa_browser
+from app.services.network_profiles import navigate
+from app.services.screenshot_writer import capture_screenshot
+from app.services.recipe_engine import get_recipe_engine
+from app.services.rpa_queue import record_run
+from app.services.session_vault import get_session_vault
+from app.config import get_settings
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Elements that only show once the user is signed in
+GUVNL_LOGGED_IN = (
+    (By.CLASS_NAME, "dashboard"),
+    (By.ID, "menu"),
+    (By.PARTIAL_LINK_TEXT, "Name Change"),
+    (By.PARTIAL_LINK_TEXT, "Services"),
+)
+ADANI_GAS_LOGGED_IN = (
+    (By.CLASS_NAME, "customer-dashboard"),
+    (By.PARTIAL_LINK_TEXT, "Name Transfer"),
+    (By.PARTIAL_LINK_TEXT, "Services"),
+)
+
+
+def _signed_in(locators: Tuple) -> Any:
+    return EC.any_of(*[EC.presence_of_element_located(locator) for locator in locators])
 
 class LoginAssistedService:
     """Service for websites that require login - User handles auth, Selenium handles form filling"""
@@ -25,22 +48,17 @@ class LoginAssistedService:
     def __init__(self):
         self.driver = None
         self.wait = None
-        os.makedirs("screenshots", exist_ok=True)
+        self.headless = False
     
     def setup_driver(self, headless: bool = False) -> webdriver.Chrome:
-        """Setup Chrome WebDriver"""
-        chrome_options = Options()
-        
+        """Check out a Chrome WebDriver from the shared pool"""
         # Never use headless for login-required sites (user needs to see)
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1200,800')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
+        # Hand back any browser left open by the previous assisted session first
+        self.close_driver()
         
         try:
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            self.headless = headless
+            self.driver = get_rpa_browser(headless=headless).checkout()
             self.wait = WebDriverWait(self.driver, 30)
             return self.driver
         except Exception as e:
@@ -48,60 +66,117 @@ class LoginAssistedService:
             raise e
     
     def close_driver(self):
-        """Close the WebDriver"""
+        """Return the WebDriver to the pool"""
         if self.driver:
-            self.driver.quit()
+            get_session_vault().discard_seed(self.driver)
+            get_rpa_browser(headless=self.headless).checkin(self.driver)
             self.driver = None
             self.wait = None
 
+    @staticmethod
+    def _run(portal: str, data: Dict[str, Any], flow: Callable[["LoginAssistedService"], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Run an assisted flow on its own instance, so concurrent requests on the
+        shared service never overwrite each other's browser, and make sure the
+        browser is handed on when the flow ends
+        """
+        job = LoginAssistedService()
+        result = None
+        try:
+            result = record_run(portal, data, lambda: flow(job))
+        finally:
+            job.hand_over(result, portal)
+        return result
+
+    def hand_over(self, result: Optional[Dict[str, Any]], portal: str):
+        """
+        Leave a filled form open for the user to review and submit (the session
+        registry closes it when they are done or go idle); anything else goes
+        straight back to the pool
+        """
+        if self.driver is None:
+            return
+        if not (result and result.get("success")):
+            self.close_driver()
+            return
+
+        # The restored storage is on the page already; don't seed it into the next job
+        get_session_vault().discard_seed(self.driver)
+        result["browser_session_id"] = get_browser_sessions().detach(
+            self.driver, self.headless, portal, label="login-assisted review"
+        )
+        self.driver = None
+        self.wait = None
+
+    def resume_session(self, user_id: Optional[int], portal: str, logged_in: Tuple) -> Optional[Dict[str, Any]]:
+        """
+        Restore the user's saved login for ``portal`` into the fresh browser and
+        open the page they were on. Returns the page load when the portal
+        still shows them signed in, otherwise None (the user logs in again).
+
+        ``user_id`` must be the authenticated account running the job, never
+        something taken from the submitted data - whoever can name the key
+        gets the signed-in session.
+        """
+        if not user_id:
+            return None
+        user = str(user_id)
+        
+        vault = get_session_vault()
+        url = vault.restore(self.driver, user, portal)
+        if not url:
+            return None
+        
+        page_load = navigate(self.driver, url, portal, headless=self.headless)
+        try:
+            WebDriverWait(self.driver, settings.RPA_SESSION_RESTORE_TIMEOUT).until(_signed_in(logged_in))
+        except TimeoutException:
+            logger.info(f"🔐 Saved {portal} session was rejected by the portal, asking for a fresh login")
+            vault.forget(user, portal)
+            vault.discard_seed(self.driver)
+            self.driver.delete_all_cookies()
+            return None
+        
+        logger.info(f"🔐 Reused saved {portal} login - skipping login, CAPTCHA and OTP")
+        return page_load
+
+    def save_session(self, user_id: Optional[int], portal: str):
+        """Keep the login the user just completed for their next job on ``portal`` (authenticated users only)"""
+        if user_id:
+            get_session_vault().capture(self.driver, str(user_id), portal)
+
     # ELECTRICITY SERVICES - LOGIN REQUIRED
     
-    def assist_guvnl_login_and_fill(self, data: Dict[str, Any], service_type: str) -> Dict[str, Any]:
+    def assist_guvnl_login_and_fill(self, data: Dict[str, Any], service_type: str,
+                                    user_id: Optional[int] = None) -> Dict[str, Any]:
         """
         GUVNL Portal (PGVCL, UGVCL, MGVCL, DGVCL) - Login required
         User handles: Login, CAPTCHA, OTP
         Selenium handles: Navigation to name change page and form filling
+        ``user_id`` (the authenticated user) enables saving and reusing the portal login
         """
+        return self._run(service_type.lower(), data,
+                         lambda job: job._guvnl_login_and_fill(data, service_type, user_id))
+
+    def _guvnl_login_and_fill(self, data: Dict[str, Any], service_type: str,
+                              user_id: Optional[int]) -> Dict[str, Any]:
         try:
             logger.info(f"Starting GUVNL {service_type} login assistance for consumer: {data.get('consumer_number')}")
             
             self.setup_driver(headless=False)
             
-            # Navigate to GUVNL login page
-            login_url = "https://portal.guvnl.in/login.php"
-            self.driver.get(login_url)
-            
-            # Wait for login page
-            self.wait.until(EC.presence_of_element_located((By.ID, "username")))
-            
-            # Show instructions to user
-            instruction_script = """
-            alert(`🔐 LOGIN ASSISTANCE - GUVNL Portal
-            
-Please complete the following steps manually:
-1. Enter your Consumer Number in Username field
-2. Enter your Password (usually mobile number or bill number)
-3. Solve the CAPTCHA
-4. Click Login button
-5. Complete OTP verification if required
-6. Once logged in, click OK in this dialog
-
-The system will then automatically navigate to name change page and fill your form.`);
-            """
-            self.driver.execute_script(instruction_script)
-            
-            # Wait for user to complete login (check for dashboard elements)
-            logger.info("Waiting for user to complete login...")
+            # A saved login skips the login page entirely
+            page_load = self.resume_session(user_id, "guvnl", GUVNL_LOGGED_IN)
+            session_reused = page_load is not None
+            if not session_reused:
+                page_load = self.open_guvnl_login()
             
-            # Wait for successful login (look for dashboard or menu elements)
             try:
-                # Wait for login success indicators
-                self.wait.until(EC.any_of(
-                    EC.presence_of_element_located((By.CLASS_NAME, "dashboard")),
-                    EC.presence_of_element_located((By.ID, "menu")),
-                    EC.presence_of_element_located((By.PARTIAL_LINK_TEXT, "Name Change")),
-                    EC.presence_of_element_located((By.PARTIAL_LINK_TEXT, "Services"))
-                ))
+                if not session_reused:
+                    # Wait for user to complete login (check for dashboard elements)
+                    logger.info("Waiting for user to complete login...")
+                    self.wait.until(_signed_in(GUVNL_LOGGED_IN))
+                    self.save_session(user_id, "guvnl")
                 
                 logger.info("Login successful! Navigating to name change page...")
                 
@@ -114,25 +189,22 @@ The system will then automatically navigate to name change page and fill your fo
                     # Alternative navigation
                     services_menu = self.driver.find_element(By.PARTIAL_LINK_TEXT, "Services")
                     services_menu.click()
-                    time.sleep(2)
-                    name_change_link = self.driver.find_element(By.PARTIAL_LINK_TEXT, "Name Change")
+                    name_change_link = self.wait.until(EC.element_to_be_clickable((By.PARTIAL_LINK_TEXT, "Name Change")))
                     name_change_link.click()
                 
-                # Wait for name change form
-                time.sleep(3)
-                
-                # Fill the form automatically
+                # Fill the form automatically once it has settled
                 filled_fields = self.fill_guvnl_name_change_form(data)
                 
-                screenshot_path = f"screenshots/guvnl_{service_type}_{int(time.time())}.png"
-                self.driver.save_screenshot(screenshot_path)
+                screenshot_path = capture_screenshot(self.driver, f"guvnl_{service_type}")
                 
                 return {
                     "success": True,
+                    "page_load": page_load,
                     "message": f"GUVNL {service_type} form filled successfully. Please review and submit manually.",
                     "screenshot_path": screenshot_path,
                     "filled_fields": filled_fields,
                     "website": f"GUVNL - {service_type}",
+                    "session_reused": session_reused,
                     "next_step": "Review the filled form and click Submit button"
                 }
                 
@@ -152,142 +224,71 @@ The system will then automatically navigate to name change page and fill your fo
                 "error": str(e),
                 "message": f"GUVNL {service_type} assistance failed"
             }
-        finally:
-            # Keep browser open for manual verification
-            pass
+    
+    def open_guvnl_login(self) -> Dict[str, Any]:
+        """Open the GUVNL login page and tell the user what to do there"""
+        # Navigate to GUVNL login page and wait for the login form
+        opened = get_recipe_engine().open(self.driver, "guvnl", headless=self.headless)
+        if not opened["success"]:
+            raise TimeoutError("GUVNL login page did not load")
+        
+        # Show instructions to user
+        instruction_script = """
+            alert(`🔐 LOGIN ASSISTANCE - GUVNL Portal
+            
+Please complete the following steps manually:
+1. Enter your Consumer Number in Username field
+2. Enter your Password (usually mobile number or bill number)
+3. Solve the CAPTCHA
+4. Click Login button
+5. Complete OTP verification if required
+6. Once logged in, click OK in this dialog
+
+The system will then automatically navigate to name change page and fill your form.`);
+            """
+        self.driver.execute_script(instruction_script)
+        return opened["page_load"]
     
     def fill_guvnl_name_change_form(self, data: Dict[str, Any]) -> int:
         """Fill GUVNL name change form fields"""
-        filled_count = 0
-        
         try:
-            # Consumer Number
-            if data.get('consumer_number'):
-                try:
-                    consumer_field = self.driver.find_element(By.NAME, "consumer_no")
-                    consumer_field.clear()
-                    consumer_field.send_keys(data['consumer_number'])
-                    filled_count += 1
-                    time.sleep(0.5)
-                except:
-                    pass
-            
-            # Old Name
-            if data.get('old_name'):
-                try:
-                    old_name_field = self.driver.find_element(By.NAME, "old_name")
-                    old_name_field.clear()
-                    old_name_field.send_keys(data['old_name'])
-                    filled_count += 1
-                    time.sleep(0.5)
-                except:
-                    pass
-            
-            # New Name
-            if data.get('new_name'):
-                try:
-                    new_name_field = self.driver.find_element(By.NAME, "new_name")
-                    new_name_field.clear()
-                    new_name_field.send_keys(data['new_name'])
-                    filled_count += 1
-                    time.sleep(0.5)
-                except:
-                    pass
-            
-            # Mobile Number
-            if data.get('mobile'):
-                try:
-                    mobile_field = self.driver.find_element(By.NAME, "mobile")
-                    mobile_field.clear()
-                    mobile_field.send_keys(data['mobile'])
-                    filled_count += 1
-                    time.sleep(0.5)
-                except:
-                    pass
-            
-            # Email
-            if data.get('email'):
-                try:
-                    email_field = self.driver.find_element(By.NAME, "email")
-                    email_field.clear()
-                    email_field.send_keys(data['email'])
-                    filled_count += 1
-                    time.sleep(0.5)
-                except:
-                    pass
-            
-            # Address
-            if data.get('address'):
-                try:
-                    address_field = self.driver.find_element(By.NAME, "address")
-                    address_field.clear()
-                    address_field.send_keys(data['address'])
-                    filled_count += 1
-                    time.sleep(0.5)
-                except:
-                    pass
-            
-            # Aadhar Number
-            if data.get('aadhar_number'):
-                try:
-                    aadhar_field = self.driver.find_element(By.NAME, "aadhar")
-                    aadhar_field.clear()
-                    aadhar_field.send_keys(data['aadhar_number'])
-                    filled_count += 1
-                    time.sleep(0.5)
-                except:
-                    pass
+            filled_count = get_recipe_engine().fill(self.driver, "guvnl", data)["total_filled"]
             
             logger.info(f"Filled {filled_count} fields in GUVNL form")
             return filled_count
             
         except Exception as e:
             logger.error(f"Error filling GUVNL form: {e}")
-            return filled_count
+            return 0
     
     # GAS SERVICES - LOGIN REQUIRED
     
-    def assist_adani_gas_login_and_fill(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def assist_adani_gas_login_and_fill(self, data: Dict[str, Any], user_id: Optional[int] = None) -> Dict[str, Any]:
         """
         Adani Gas - Login required (Customer Portal + OTP)
         User handles: Login, OTP
         Selenium handles: Form filling after login
+        ``user_id`` (the authenticated user) enables saving and reusing the portal login
         """
+        return self._run("adani-gas", data, lambda job: job._adani_gas_login_and_fill(data, user_id))
+
+    def _adani_gas_login_and_fill(self, data: Dict[str, Any], user_id: Optional[int]) -> Dict[str, Any]:
         try:
             logger.info(f"Starting Adani Gas login assistance for consumer: {data.get('consumer_number')}")
             
             self.setup_driver(headless=False)
             
-            # Navigate to Adani Gas customer portal
-            login_url = "https://www.adanigas.com/myaccount"
-            self.driver.get(login_url)
-            
-            # Wait for login page
-            self.wait.until(EC.presence_of_element_located((By.ID, "login-form")))
-            
-            # Show instructions
-            instruction_script = """
-            alert(`🔐 LOGIN ASSISTANCE - Adani Gas Portal
-            
-Please complete the following steps manually:
-1. Enter your Consumer Number
-2. Enter your Mobile Number
-3. Click "Send OTP" button
-4. Enter the OTP received on your mobile
-5. Click Login button
-6. Once logged in, click OK in this dialog
-
-The system will then navigate to name change section and fill your form.`);
-            """
-            self.driver.execute_script(instruction_script)
+            # A saved login skips the login page entirely
+            page_load = self.resume_session(user_id, "adani-gas", ADANI_GAS_LOGGED_IN)
+            session_reused = page_load is not None
+            if not session_reused:
+                page_load = self.open_adani_gas_login()
             
             # Wait for successful login
             try:
-                self.wait.until(EC.any_of(
-                    EC.presence_of_element_located((By.CLASS_NAME, "customer-dashboard")),
-                    EC.presence_of_element_located((By.PARTIAL_LINK_TEXT, "Name Transfer")),
-                    EC.presence_of_element_located((By.PARTIAL_LINK_TEXT, "Services"))
-                ))
+                if not session_reused:
+                    self.wait.until(_signed_in(ADANI_GAS_LOGGED_IN))
+                    self.save_session(user_id, "adani-gas")
                 
                 logger.info("Adani Gas login successful! Navigating to name change...")
                 
@@ -295,20 +296,19 @@ The system will then navigate to name change section and fill your form.`);
                 name_change_link = self.driver.find_element(By.PARTIAL_LINK_TEXT, "Name Transfer")
                 name_change_link.click()
                 
-                time.sleep(3)
-                
-                # Fill form
+                # Fill form once it has settled
                 filled_fields = self.fill_adani_gas_form(data)
                 
-                screenshot_path = f"screenshots/adani_gas_{int(time.time())}.png"
-                self.driver.save_screenshot(screenshot_path)
+                screenshot_path = capture_screenshot(self.driver, "adani_gas")
                 
                 return {
                     "success": True,
+                    "page_load": page_load,
                     "message": "Adani Gas form filled successfully. Please review and submit.",
                     "screenshot_path": screenshot_path,
                     "filled_fields": filled_fields,
-                    "website": "Adani Gas"
+                    "website": "Adani Gas",
+                    "session_reused": session_reused
                 }
                 
             except Exception as login_error:
@@ -321,17 +321,38 @@ The system will then navigate to name change section and fill your form.`);
         except Exception as e:
             logger.error(f"Adani Gas assistance failed: {str(e)}")
             return {"success": False, "error": str(e)}
-        finally:
-            pass
+    
+    def open_adani_gas_login(self) -> Dict[str, Any]:
+        """Open the Adani Gas customer portal and tell the user how to log in"""
+        # Navigate to Adani Gas customer portal and wait for the login form
+        opened = get_recipe_engine().open(self.driver, "adani-gas", headless=self.headless)
+        if not opened["success"]:
+            raise TimeoutError("Adani Gas login page did not load")
+        
+        # Show instructions
+        instruction_script = """
+            alert(`🔐 LOGIN ASSISTANCE - Adani Gas Portal
+            
+Please complete the following steps manually:
+1. Enter your Consumer Number
+2. Enter your Mobile Number
+3. Click "Send OTP" button
+4. Enter the OTP received on your mobile
+5. Click Login button
+6. Once logged in, click OK in this dialog
+
+The system will then navigate to name change section and fill your form.`);
+            """
+        self.driver.execute_script(instruction_script)
+        return opened["page_load"]
     
     def fill_adani_gas_form(self, data: Dict[str, Any]) -> int:
         """Fill Adani Gas name change form"""
-        filled_count = 0
-        
-        # Similar form filling logic for Adani Gas
-        # Implementation details based on actual form structure
-        
-        return filled_count
+        try:
+            return get_recipe_engine().fill(self.driver, "adani-gas", data)["total_filled"]
+        except Exception as e:
+            logger.error(f"Error filling Adani Gas form: {e}")
+            return 0
     
     # WATER SERVICES - LOGIN REQUIRED
     
@@ -339,6 +360,9 @@ The system will then navigate to name change section and fill your form.`);
         """
         Municipal Water Services (AMC, SMC, VMC, RMC) - Login/Ward verification required
         """
+        return self._run(f"{city.lower()}-water", data, lambda job: job._municipal_water_login(data, city))
+
+    def _municipal_water_login(self, data: Dict[str, Any], city: str) -> Dict[str, Any]:
         try:
             logger.info(f"Starting {city} Municipal water login assistance")
             
@@ -353,7 +377,7 @@ The system will then navigate to name change section and fill your form.`);
             }
             
             url = city_urls.get(city, city_urls["AMC"])
-            self.driver.get(url)
+            page_load = navigate(self.driver, url, f"{city.lower()}-water", headless=self.headless)
             
             # Show city-specific instructions
             instruction_script = f"""
@@ -375,13 +399,13 @@ The system will then fill your form automatically.`);
             time.sleep(10)  # Give user time to navigate
             
             # Try to fill form if available
-            filled_fields = self.fill_municipal_water_form(data)
+            filled_fields = self.fill_municipal_water_form(data, city)
             
-            screenshot_path = f"screenshots/{city.lower()}_water_{int(time.time())}.png"
-            self.driver.save_screenshot(screenshot_path)
+            screenshot_path = capture_screenshot(self.driver, f"{city.lower()}_water")
             
             return {
                 "success": True,
+                "page_load": page_load,
                 "message": f"{city} Municipal water form assistance completed",
                 "screenshot_path": screenshot_path,
                 "filled_fields": filled_fields,
@@ -391,36 +415,17 @@ The system will then fill your form automatically.`);
         except Exception as e:
             logger.error(f"{city} Municipal assistance failed: {str(e)}")
             return {"success": False, "error": str(e)}
-        finally:
-            pass
     
-    def fill_municipal_water_form(self, data: Dict[str, Any]) -> int:
+    def fill_municipal_water_form(self, data: Dict[str, Any], city: str = "AMC") -> int:
         """Fill municipal water form fields"""
-        filled_count = 0
-        
-        # Generic form filling for municipal water services
-        field_mappings = [
-            ("connection_id", ["connection_id", "consumer_id", "connection_no"]),
-            ("old_name", ["current_name", "old_name", "existing_name"]),
-            ("new_name", ["new_name", "updated_name"]),
-            ("mobile", ["mobile", "phone", "contact"]),
-            ("address", ["address", "location"])
-        ]
-        
-        for data_key, field_names in field_mappings:
-            if data.get(data_key):
-                for field_name in field_names:
-                    try:
-                        field = self.driver.find_element(By.NAME, field_name)
-                        field.clear()
-                        field.send_keys(data[data_key])
-                        filled_count += 1
-                        time.sleep(0.5)
-                        break
-                    except:
-                        continue
-        
-        return filled_count
+        # One generic recipe for every city; selectors are learned per city portal
+        try:
+            return get_recipe_engine().fill(
+                self.driver, "municipal-water", data, portal=f"{city.lower()}-water"
+            )["total_filled"]
+        except Exception as e:
+            logger.error(f"Error filling municipal water form: {e}")
+            return 0
 
 # Global service instance
 login_assisted_service = LoginAssistedService()
\ No newline at end of file
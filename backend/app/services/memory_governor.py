@@ -0,0 +1,167 @@
+"""
+Chrome Memory Governor
+Recycles bloated drivers between jobs and holds new checkouts while the container is short of memory
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+from app.config import get_settings
+from app.services.process_memory import process_tree_rss, shm_usage, system_memory
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+MB = 2 ** 20
+
+
+def driver_pid(driver) -> Optional[int]:
+    """PID of the ChromeDriver process behind ``driver`` (Chrome and its renderers are its children)"""
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+class MemoryGovernor:
+    """
+    Watches the memory that Chrome actually costs:
+
+    - each driver's process tree (ChromeDriver, Chrome, renderers and GPU
+      process), checked when the driver comes back from a job - a tree over
+      ``driver_max_mb`` is recycled instead of returned to the pool;
+    - container memory (cgroup usage against its limit, or the host's) and
+      ``/dev/shm`` usage, sampled at most every ``sample_interval`` seconds.
+
+    Above ``pressure_percent`` or ``shm_max_percent`` the pools recycle
+    drivers on checkin, drop idle ones and make checkouts wait up to
+    ``checkout_wait`` seconds for headroom before refusing them, so a job is
+    deferred rather than the container being OOM-killed mid-fill.
+    """
+
+    def __init__(self, driver_max_mb: float, pressure_percent: float, shm_max_percent: float,
+                 checkout_wait: float, sample_interval: float):
+        self.driver_max_bytes = int(driver_max_mb * MB)
+        self.pressure_percent = pressure_percent
+        self.shm_max_percent = shm_max_percent
+        self.checkout_wait = checkout_wait
+        self.sample_interval = sample_interval
+
+        self._sample: Dict[str, Any] = {}
+        self._sampled_at = 0.0
+        self._lock = threading.Lock()
+
+        self.recycled_oversize = 0
+        self.recycled_pressure = 0
+        self.checkouts_held = 0
+        self.checkouts_refused = 0
+        self.largest_driver_bytes = 0
+
+    def sample(self, force: bool = False) -> Dict[str, Any]:
+        """Container memory and /dev/shm usage, cached for ``sample_interval`` seconds"""
+        with self._lock:
+            if not force and self._sample and time.monotonic() - self._sampled_at < self.sample_interval:
+                return self._sample
+
+            memory_used, memory_total = system_memory()
+            shm_used, shm_total = shm_usage()
+            self._sample = {
+                "memory_used_mb": round(memory_used / MB, 1),
+                "memory_total_mb": round(memory_total / MB, 1),
+                "memory_percent": round(memory_used / memory_total * 100, 1) if memory_total else None,
+                "shm_used_mb": round(shm_used / MB, 1),
+                "shm_total_mb": round(shm_total / MB, 1),
+                "shm_percent": round(shm_used / shm_total * 100, 1) if shm_total else None,
+            }
+            self._sampled_at = time.monotonic()
+            return self._sample
+
+    def pressure(self, force: bool = False) -> Optional[str]:
+        """Why memory is short right now, or None"""
+        sample = self.sample(force=force)
+        if self.pressure_percent and (sample["memory_percent"] or 0) >= self.pressure_percent:
+            return f"memory at {sample['memory_percent']}% of {sample['memory_total_mb']:.0f} MB"
+        if self.shm_max_percent and (sample["shm_percent"] or 0) >= self.shm_max_percent:
+            return f"/dev/shm at {sample['shm_percent']}% of {sample['shm_total_mb']:.0f} MB"
+        return None
+
+    def driver_rss(self, driver) -> int:
+        """Resident bytes of the driver's whole process tree (0 when unknown)"""
+        pid = driver_pid(driver)
+        rss = process_tree_rss(pid) if pid else 0
+        if rss > self.largest_driver_bytes:
+            self.largest_driver_bytes = rss
+        return rss
+
+    def recycle_reason(self, driver) -> Optional[str]:
+        """Why a driver coming back from a job should be quit rather than reused, or None"""
+        if self.driver_max_bytes:
+            rss = self.driver_rss(driver)
+            if rss > self.driver_max_bytes:
+                self.recycled_oversize += 1
+                return f"driver tree at {rss / MB:.0f} MB"
+        reason = self.pressure()
+        if reason:
+            self.recycled_pressure += 1
+        return reason
+
+    def wait_for_headroom(self, timeout: Optional[float] = None, relieve=None) -> Optional[str]:
+        """
+        Block until memory pressure clears or ``timeout`` (default
+        ``checkout_wait``) runs out. ``relieve`` is called once up front to
+        free what it can (e.g. quit idle drivers). Returns the pressure
+        reason if it never cleared, else None.
+        """
+        reason = self.pressure()
+        if reason is None:
+            return None
+
+        self.checkouts_held += 1
+        logger.warning(f"🧠 Holding browser checkout: {reason}")
+        if relieve is not None:
+            relieve()
+
+        deadline = time.monotonic() + (self.checkout_wait if timeout is None else timeout)
+        while reason and time.monotonic() < deadline:
+            time.sleep(min(self.sample_interval, max(0.1, deadline - time.monotonic())))
+            reason = self.pressure(force=True)
+
+        if reason:
+            self.checkouts_refused += 1
+            logger.error(f"❌ Browser checkout refused: {reason}")
+        return reason
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.sample(),
+            "pressure": self.pressure(),
+            "driver_max_mb": round(self.driver_max_bytes / MB),
+            "pressure_percent": self.pressure_percent,
+            "shm_max_percent": self.shm_max_percent,
+            "largest_driver_mb": round(self.largest_driver_bytes / MB, 1),
+            "recycled_oversize": self.recycled_oversize,
+            "recycled_pressure": self.recycled_pressure,
+            "checkouts_held": self.checkouts_held,
+            "checkouts_refused": self.checkouts_refused,
+        }
+
+
+_governor: Optional[MemoryGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_memory_governor() -> MemoryGovernor:
+    """Get or create the process-wide memory governor"""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = MemoryGovernor(
+                driver_max_mb=settings.RPA_MEMORY_DRIVER_MAX_MB,
+                pressure_percent=settings.RPA_MEMORY_PRESSURE_PERCENT,
+                shm_max_percent=settings.RPA_MEMORY_SHM_MAX_PERCENT,
+                checkout_wait=settings.RPA_MEMORY_CHECKOUT_WAIT,
+                sample_interval=settings.RPA_MEMORY_SAMPLE_SECONDS,
+            )
+        return _governor
@@ -0,0 +1,157 @@
+"""
+Network Profiles
+Per-portal resource blocking through CDP, with page-load timing per profile
+"""
+
+import time
+import random
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.config import get_settings
+from app.services.rpa_tracing import span
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+IMAGE_PATTERNS = ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*", "*.bmp*"]
+FONT_PATTERNS = ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*", "*fonts.googleapis.com*", "*fonts.gstatic.com*"]
+MEDIA_PATTERNS = ["*.mp4*", "*.webm*", "*.mp3*", "*.ogg*", "*youtube.com/embed*"]
+TRACKER_PATTERNS = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*adservice.google.*", "*facebook.net*", "*connect.facebook.*",
+    "*hotjar.com*", "*clarity.ms*", "*newrelic.com*", "*nr-data.net*",
+]
+
+# Profile name -> URL patterns passed to Network.setBlockedURLs
+PROFILES: Dict[str, List[str]] = {
+    "full": [],
+    # Someone is watching the browser (captchas, login) - keep images
+    "interactive": FONT_PATTERNS + MEDIA_PATTERNS + TRACKER_PATTERNS,
+    # Headless runs only need the HTML, scripts and stylesheets that build the form
+    "form-only": IMAGE_PATTERNS + FONT_PATTERNS + MEDIA_PATTERNS + TRACKER_PATTERNS,
+}
+
+# Per-portal overrides. ``block`` adds patterns; ``allow`` exempts patterns
+# from the profile (CDP URL blocking has no exceptions, so allowing removes
+# the matching block entry).
+PORTAL_NETWORK_RULES: Dict[str, Dict[str, Any]] = {
+    "torrent-power": {
+        "block": ["*torrentpower.com/*/banner*", "*torrentpower.com/*/slider*"],
+    },
+    "guvnl": {
+        # Login page captcha is served as an image
+        "profile": "interactive",
+    },
+}
+
+NAVIGATION_TIMING_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+if (!nav) return null;
+return {
+    dom_content_loaded_ms: Math.round(nav.domContentLoadedEventEnd),
+    load_ms: Math.round(nav.loadEventEnd),
+    resources: resources.length,
+    transfer_bytes: nav.transferSize + resources.reduce((sum, r) => sum + (r.transferSize || 0), 0)
+};
+"""
+
+
+def blocked_patterns(portal: Optional[str], profile: str) -> List[str]:
+    rule = PORTAL_NETWORK_RULES.get(portal or "", {})
+    if profile == "full":
+        return []
+    allowed = set(rule.get("allow", []))
+    return [p for p in PROFILES[profile] + rule.get("block", []) if p not in allowed]
+
+
+def choose_profile(portal: Optional[str], headless: bool = True) -> str:
+    """Portal/default profile, occasionally "full" so the unblocked baseline stays current"""
+    if random.random() < settings.RPA_NETWORK_BASELINE_RATE:
+        return "full"
+    if not headless:
+        return "interactive"
+    rule = PORTAL_NETWORK_RULES.get(portal or "", {})
+    profile = rule.get("profile", settings.RPA_NETWORK_PROFILE)
+    return profile if profile in PROFILES else "form-only"
+
+
+def apply_network_profile(driver, portal: Optional[str], profile: str):
+    """Install the profile's blocklist on the driver's current target"""
+    patterns = blocked_patterns(portal, profile)
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+
+
+class PageLoadStats:
+    """Recent page-load wall times per (portal, profile)"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[Tuple[str, str], deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, portal: str, profile: str, wall_ms: float):
+        with self._lock:
+            self._samples.setdefault((portal, profile), deque(maxlen=self.window)).append(wall_ms)
+
+    @staticmethod
+    def _summarize(samples: List[float]) -> Dict[str, Any]:
+        ordered = sorted(samples)
+        return {
+            "count": len(ordered),
+            "mean_ms": round(sum(ordered) / len(ordered), 1),
+            "p50_ms": round(ordered[len(ordered) // 2], 1),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+        }
+
+    def summary(self, portal: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """``{portal: {profile: stats}}``, or ``{profile: stats}`` for one portal"""
+        with self._lock:
+            items = [(key, list(samples)) for key, samples in self._samples.items() if samples]
+        result: Dict[str, Dict[str, Any]] = {}
+        for (sample_portal, profile), samples in items:
+            if portal is None:
+                result.setdefault(sample_portal, {})[profile] = self._summarize(samples)
+            elif sample_portal == portal:
+                result[profile] = self._summarize(samples)
+        return result
+
+
+page_load_stats = PageLoadStats()
+
+
+def navigate(driver, url: str, portal: str, headless: bool = True) -> Dict[str, Any]:
+    """
+    Load ``url`` under the portal's network profile and return its timing, along
+    with the running per-profile comparison for the portal.
+    """
+    profile = choose_profile(portal, headless)
+    try:
+        apply_network_profile(driver, portal, profile)
+    except Exception as e:
+        logger.warning(f"⚠️ Network profile '{profile}' not applied: {e}")
+        profile = "full"
+
+    started = time.monotonic()
+    with span("navigate", profile=profile):
+        driver.get(url)
+    wall_ms = round((time.monotonic() - started) * 1000, 1)
+    page_load_stats.record(portal, profile, wall_ms)
+
+    try:
+        navigation = driver.execute_script(NAVIGATION_TIMING_SCRIPT) or {}
+    except Exception:
+        navigation = {}
+
+    logger.info(f"⏱️ {portal} loaded in {wall_ms}ms with '{profile}' profile")
+    return {
+        "portal": portal,
+        "profile": profile,
+        "wall_ms": wall_ms,
+        **navigation,
+        "comparison": page_load_stats.summary(portal),
+    }
@@ -0,0 +1,223 @@
+"""
+Portal Scheduler
+Per-portal concurrency limits, token-bucket rate limiting and circuit breakers for RPA jobs
+"""
+
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+
+from app.config import get_settings
+from app.data.catalog import get_catalog
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# How long a job waits before asking again when all of a portal's sessions are busy
+IN_FLIGHT_RETRY_SECONDS = 5.0
+
+
+@dataclass
+class Admission:
+    """Outcome of asking a portal for a session slot"""
+    admitted: bool
+    reason: str = "ok"  # ok, in_flight_limit, rate_limited, circuit_open
+    retry_after: float = 0.0
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate_per_minute`` refill, ``burst`` capacity"""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> float:
+        """Take a token; returns 0 on success, otherwise seconds until one is available"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else IN_FLIGHT_RETRY_SECONDS
+
+    def refund(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+
+class CircuitBreaker:
+    """
+    closed -> open after ``failure_threshold`` consecutive failures; after
+    ``reset_seconds`` one probe job is let through (half-open) and its result
+    closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+    def open_for(self) -> float:
+        """Seconds the breaker stays open (0 when closed or ready to probe)"""
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def allow(self) -> float:
+        """0 if a job may run now, otherwise seconds until the breaker half-opens"""
+        if self.state == "closed":
+            return 0.0
+        remaining = self.opened_at + self.reset_seconds - time.monotonic()
+        if remaining > 0:
+            return remaining
+        if self.probing:
+            return IN_FLIGHT_RETRY_SECONDS
+        self.state = "half_open"
+        self.probing = True
+        return 0.0
+
+    def record(self, success: bool):
+        if success:
+            self.state = "closed"
+            self.failures = 0
+            self.probing = False
+            return
+
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.probing = False
+
+
+class PortalGate:
+    """Admission control for one portal (supplier id)"""
+
+    def __init__(self, portal: str, max_in_flight: int, rate_per_minute: float, burst: int):
+        self.portal = portal
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self.breaker = CircuitBreaker(settings.RPA_BREAKER_FAILURE_THRESHOLD, settings.RPA_BREAKER_RESET_SECONDS)
+        self.admitted = 0
+        self.deferred = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "tokens": round(self.bucket.tokens, 2),
+            "rate_per_minute": round(self.bucket.rate * 60, 2),
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "admitted": self.admitted,
+            "deferred": self.deferred,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+        }
+
+
+class PortalScheduler:
+    """
+    One gate per portal, keyed by the supplier id used in services_data.json.
+    Limits default to the RPA_PORTAL_* settings and can be overridden per
+    supplier with an ``rpa_limits`` object in the catalog.
+    """
+
+    def __init__(self):
+        self._gates: Dict[str, PortalGate] = {}
+        self._lock = threading.Lock()
+
+    def _gate(self, portal: str) -> PortalGate:
+        gate = self._gates.get(portal)
+        if gate is None:
+            supplier, _ = get_catalog().get_supplier(portal)
+            limits = (supplier or {}).get("rpa_limits", {})
+            gate = PortalGate(
+                portal,
+                max_in_flight=limits.get("max_in_flight", settings.RPA_PORTAL_MAX_IN_FLIGHT),
+                rate_per_minute=limits.get("rate_per_minute", settings.RPA_PORTAL_RATE_PER_MINUTE),
+                burst=limits.get("burst", settings.RPA_PORTAL_BURST),
+            )
+            self._gates[portal] = gate
+        return gate
+
+    def max_in_flight(self, portal: str) -> int:
+        """Concurrent sessions allowed against ``portal``"""
+        with self._lock:
+            return self._gate(portal).max_in_flight
+
+    def admit(self, portal: str) -> Admission:
+        """Try to take a session slot for a job against ``portal``"""
+        with self._lock:
+            gate = self._gate(portal)
+
+            if gate.in_flight >= gate.max_in_flight:
+                gate.deferred += 1
+                return Admission(False, "in_flight_limit", IN_FLIGHT_RETRY_SECONDS)
+
+            wait = gate.breaker.open_for()
+            if wait > 0:
+                gate.deferred += 1
+                return Admission(False, "circuit_open", wait)
+
+            wait = gate.bucket.try_take()
+            if wait > 0:
+                gate.deferred += 1
+                return Admission(False, "rate_limited", wait)
+
+            # Half-open admits a single probe job
+            wait = gate.breaker.allow()
+            if wait > 0:
+                gate.bucket.refund()
+                gate.deferred += 1
+                return Admission(False, "circuit_open", wait)
+
+            gate.in_flight += 1
+            gate.admitted += 1
+            return Admission(True)
+
+    def release(self, portal: str, success: bool):
+        """Return a slot and feed the job's outcome to the portal's breaker"""
+        with self._lock:
+            gate = self._gate(portal)
+            gate.in_flight = max(0, gate.in_flight - 1)
+            previous = gate.breaker.state
+            gate.breaker.record(success)
+            if success:
+                gate.succeeded += 1
+            else:
+                gate.failed += 1
+
+        if previous != gate.breaker.state:
+            logger.warning(f"⚡ Circuit breaker for {portal}: {previous} -> {gate.breaker.state}")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {portal: gate.stats() for portal, gate in self._gates.items()}
+
+
+_scheduler: Optional[PortalScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_portal_scheduler() -> PortalScheduler:
+    """Get or create the process-wide portal scheduler"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PortalScheduler()
+        return _scheduler
@@ -0,0 +1,282 @@
+"""
+Speculative Portal Pre-navigation
+Loads a supplier's form in a reserved browser while the user is still filling in our form
+"""
+
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+
+from app.config import get_settings
+from app.services.memory_governor import get_memory_governor
+from app.services.portal_scheduler import get_portal_scheduler
+from app.services.rpa_queue import BROWSER_RECIPES
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# A speculative load should never queue behind real jobs for a browser
+CHECKOUT_TIMEOUT = 5
+
+
+@dataclass
+class Reservation:
+    """A browser being (or already) parked on a supplier's form"""
+    reservation_id: str
+    supplier: str
+    recipe_id: str
+    headless: bool
+    expires_at: float
+    created_at: float = field(default_factory=time.time)
+    driver: Any = None
+    page_load: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    ready: threading.Event = field(default_factory=threading.Event)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "reservation_id": self.reservation_id,
+            "supplier": self.supplier,
+            "status": ("failed" if self.error else "ready") if self.ready.is_set() else "loading",
+            "error": self.error,
+            "expires_in": max(0, round(self.expires_at - time.time())),
+        }
+
+
+class PrenavigationRegistry:
+    """
+    ``reserve()`` checks a browser out and runs the supplier recipe's open
+    stage (navigate and wait for the form) in the background, so the portal
+    page is already loaded when the submission arrives and ``claim()``s it.
+
+    Reservations are speculative: they are declined when RPA_PRENAV_MAX
+    are open, the portal scheduler would not admit a session or memory is
+    short, and a reservation nobody claims within RPA_PRENAV_TTL_SECONDS is
+    released by a reaper thread. Each process owns its reservations, so a
+    job only attaches when it runs in the process that reserved (inline
+    execution mode).
+    """
+
+    def __init__(self, ttl: float, max_reservations: int):
+        self.ttl = ttl
+        self.max_reservations = max_reservations
+        self._reservations: Dict[str, Reservation] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_reservations), thread_name_prefix="rpa-prenav")
+        self._reaper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self.reserved_count = 0
+        self.claimed_count = 0
+        self.expired_count = 0
+        self.declined_count = 0
+
+    def reserve(self, supplier: str, headless: bool = True) -> Dict[str, Any]:
+        """Start pre-navigating for ``supplier``; returns the reservation or why there is none"""
+        recipe_id = BROWSER_RECIPES.get(supplier)
+        if not recipe_id:
+            return {"success": False, "error": f"No browser automation for supplier '{supplier}'"}
+
+        reservation = Reservation(
+            reservation_id=uuid.uuid4().hex[:12],
+            supplier=supplier,
+            recipe_id=recipe_id,
+            headless=headless,
+            expires_at=time.time() + self.ttl,
+        )
+        with self._lock:
+            full = len(self._reservations) >= self.max_reservations
+            if not full:
+                self._reservations[reservation.reservation_id] = reservation
+
+        reason = "Pre-navigation capacity reached" if full else self._decline_reason(supplier)
+        if reason:
+            with self._lock:
+                self._reservations.pop(reservation.reservation_id, None)
+                self.declined_count += 1
+            logger.info(f"⏭️ Pre-navigation for {supplier} skipped ({reason})")
+            return {"success": False, "error": reason}
+
+        with self._lock:
+            self.reserved_count += 1
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap_loop, name="prenav-reaper", daemon=True)
+                self._reaper.start()
+
+        self._executor.submit(self._load, reservation)
+        logger.info(f"🔮 Pre-navigating {supplier} (reservation {reservation.reservation_id}, ttl {self.ttl:.0f}s)")
+        return {"success": True, **reservation.info()}
+
+    @staticmethod
+    def _decline_reason(supplier: str) -> Optional[str]:
+        """Why not to spend a browser on a guess right now (takes a portal slot when it returns None)"""
+        pressure = get_memory_governor().pressure()
+        if pressure:
+            return pressure
+        admission = get_portal_scheduler().admit(supplier)
+        if not admission.admitted:
+            return f"Portal not admitting sessions ({admission.reason})"
+        return None
+
+    def _load(self, reservation: Reservation):
+        from app.services.driver_pool import get_rpa_browser
+        from app.services.recipe_engine import get_recipe_engine
+
+        success = False
+        try:
+            reservation.driver = get_rpa_browser(headless=reservation.headless).checkout(timeout=CHECKOUT_TIMEOUT)
+            opened = get_recipe_engine().open(reservation.driver, reservation.recipe_id,
+                                              headless=reservation.headless, portal=reservation.supplier)
+            reservation.page_load = opened["page_load"]
+            success = opened["success"]
+            if not success:
+                reservation.error = opened.get("error", "Page load failed")
+        except Exception as e:
+            reservation.error = str(e)
+        finally:
+            # The speculative load was one portal session; the submission is admitted on its own
+            get_portal_scheduler().release(reservation.supplier, success=success)
+            # Whoever removes the reservation after this point owns its browser
+            with self._lock:
+                reservation.ready.set()
+                abandoned = reservation.reservation_id not in self._reservations
+
+        if success:
+            logger.info(f"✅ Pre-navigated {reservation.supplier} (reservation {reservation.reservation_id})")
+        else:
+            logger.warning(f"⚠️ Pre-navigation {reservation.reservation_id} failed: {reservation.error}")
+        # Released while loading (or failed): nobody else will give the browser back
+        if abandoned or not success:
+            self._checkin(reservation, discard=not success)
+
+    def claim(self, reservation_id: Optional[str], supplier: str, timeout: float = 30) -> Optional[Reservation]:
+        """
+        Take over a reservation's browser, waiting up to ``timeout`` for a page
+        that is still loading (it is further along than a fresh checkout).
+        Returns None when there is nothing usable to attach to; the caller then
+        opens the portal itself.
+        """
+        if not reservation_id:
+            return None
+        with self._lock:
+            reservation = self._reservations.get(reservation_id)
+        if reservation is None or reservation.supplier != supplier:
+            return None
+
+        if not reservation.ready.wait(timeout):
+            # Still loading: _load sees it is gone and returns the browser itself
+            self.release(reservation_id)
+            return None
+        with self._lock:
+            # Released or reaped while we waited
+            if self._reservations.pop(reservation_id, None) is None:
+                return None
+        if reservation.error or reservation.driver is None:
+            return None
+
+        from app.services.driver_pool import ChromeDriverPool
+        if not ChromeDriverPool.is_healthy(reservation.driver):
+            self._checkin(reservation, discard=True)
+            return None
+
+        self.claimed_count += 1
+        logger.info(f"⚡ Reservation {reservation_id} claimed, {supplier} form already loaded")
+        return reservation
+
+    def release(self, reservation_id: str) -> bool:
+        """Give a reservation's browser back (e.g. the user closed the form)"""
+        with self._lock:
+            reservation = self._reservations.pop(reservation_id, None)
+            # Before the page is ready the loading thread still owns the browser
+            loaded = reservation is not None and reservation.ready.is_set() and not reservation.error
+        if reservation is None:
+            return False
+        if loaded:
+            self._checkin(reservation)
+        return True
+
+    @staticmethod
+    def _checkin(reservation: Reservation, discard: bool = False):
+        if reservation.driver is None:
+            return
+        from app.services.driver_pool import get_rpa_browser
+        try:
+            get_rpa_browser(headless=reservation.headless).checkin(reservation.driver, discard=discard)
+        except Exception as e:
+            logger.error(f"❌ Error releasing pre-navigated browser {reservation.reservation_id}: {e}")
+        reservation.driver = None
+
+    def reap(self) -> int:
+        """Release reservations past their TTL and failed loads; returns how many"""
+        now = time.time()
+        with self._lock:
+            stale = [
+                reservation for reservation in self._reservations.values()
+                if reservation.expires_at <= now or (reservation.ready.is_set() and reservation.error)
+            ]
+        for reservation in stale:
+            if self.release(reservation.reservation_id) and not reservation.error:
+                self.expired_count += 1
+                logger.info(f"🧹 Pre-navigation {reservation.reservation_id} expired unclaimed")
+        return len(stale)
+
+    def _reap_loop(self):
+        while not self._stop.wait(settings.RPA_PRENAV_REAP_SECONDS):
+            try:
+                self.reap()
+            except Exception as e:
+                logger.error(f"❌ Pre-navigation reaper failed: {e}")
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            reservations = list(self._reservations.values())
+        return [reservation.info() for reservation in reservations]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            open_reservations = len(self._reservations)
+        return {
+            "open": open_reservations,
+            "max": self.max_reservations,
+            "ttl_seconds": self.ttl,
+            "reserved": self.reserved_count,
+            "claimed": self.claimed_count,
+            "expired": self.expired_count,
+            "declined": self.declined_count,
+        }
+
+    def shutdown(self):
+        """Release every reservation (app shutdown)"""
+        self._stop.set()
+        with self._lock:
+            reservation_ids = list(self._reservations)
+        for reservation_id in reservation_ids:
+            self.release(reservation_id)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_registry: Optional[PrenavigationRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_prenavigation() -> PrenavigationRegistry:
+    """Get or create the process-wide pre-navigation registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = PrenavigationRegistry(
+                ttl=settings.RPA_PRENAV_TTL_SECONDS,
+                max_reservations=settings.RPA_PRENAV_MAX,
+            )
+        return _registry
+
+
+def shutdown_prenavigation():
+    with _registry_lock:
+        registry = _registry
+    if registry is not None:
+        registry.shutdown()
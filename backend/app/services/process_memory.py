@@ -0,0 +1,121 @@
+"""
+Process Memory
+Resident memory of a process and everything it spawned (e.g. ChromeDriver -> Chrome -> renderers),
+plus container memory and /dev/shm usage, read from /proc, cgroups and statvfs
+"""
+
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+# (usage, limit) files for cgroup v2 and v1
+CGROUP_MEMORY_FILES = [
+    ("/sys/fs/cgroup/memory.current", "/sys/fs/cgroup/memory.max"),
+    ("/sys/fs/cgroup/memory/memory.usage_in_bytes", "/sys/fs/cgroup/memory/memory.limit_in_bytes"),
+]
+
+
+def _children_map() -> Dict[int, List[int]]:
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces and parentheses; fields resume after the last ')'
+        ppid = int(stat[stat.rindex(b")") + 2:].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def process_tree(pid: int) -> List[int]:
+    """``pid`` and all of its descendants"""
+    if not os.path.isdir("/proc"):
+        return [pid]
+    children = _children_map()
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children.get(current, []))
+    return tree
+
+
+def rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def process_tree_rss(pid: int) -> int:
+    """Resident bytes of ``pid`` and its descendants (0 where /proc is unavailable)"""
+    return sum(rss_bytes(member) for member in process_tree(pid))
+
+
+def peak_rss_self() -> int:
+    """Peak resident bytes of this process alone (works without /proc)"""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _read_int(path: str) -> Optional[int]:
+    try:
+        with open(path, "r") as f:
+            value = f.read().strip()
+    except OSError:
+        return None
+    return int(value) if value.isdigit() else None
+
+
+def _meminfo() -> Dict[str, int]:
+    info = {}
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                info[key] = int(value.split()[0]) * 1024
+    except (OSError, ValueError):
+        pass
+    return info
+
+
+def system_memory() -> Tuple[int, int]:
+    """
+    ``(used, total)`` bytes as the OOM killer sees them: the container's
+    cgroup usage and limit when it has one, otherwise the host's memory
+    (``(0, 0)`` where neither can be read)
+    """
+    meminfo = _meminfo()
+    host_total = meminfo.get("MemTotal", 0)
+    for usage_path, limit_path in CGROUP_MEMORY_FILES:
+        limit = _read_int(limit_path)
+        usage = _read_int(usage_path)
+        # cgroup v1 reports "no limit" as a huge number; v2 as "max" (not an int)
+        if limit and usage is not None and (not host_total or limit < host_total):
+            return usage, limit
+    if host_total:
+        return host_total - meminfo.get("MemAvailable", meminfo.get("MemFree", 0)), host_total
+    return 0, 0
+
+
+def shm_usage(path: str = "/dev/shm") -> Tuple[int, int]:
+    """``(used, total)`` bytes of the shared-memory mount Chrome renders through"""
+    try:
+        fs = os.statvfs(path)
+    except (OSError, AttributeError):
+        return 0, 0
+    return (fs.f_blocks - fs.f_bfree) * fs.f_frsize, fs.f_blocks * fs.f_frsize
@@ -0,0 +1,263 @@
+"""
+Portal Recipe Engine
+Runs declarative portal workflows from portal_recipes.json as precompiled, batched plans
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+from app.services.batch_filler import batch_fill, field_messages
+from app.services.network_profiles import navigate
+from app.services.rpa_waits import PageWaits
+from app.services.rpa_tracing import span
+from app.services.screenshot_writer import capture_screenshot
+
+logger = logging.getLogger(__name__)
+
+RECIPES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "portal_recipes.json")
+
+WAIT_CONDITIONS = {
+    "present": EC.presence_of_element_located,
+    "clickable": EC.element_to_be_clickable,
+}
+PAGE_WAITS = ("settled", "network_idle", "dom_quiet")
+FIELD_SPEC_KEYS = ("key", "selectors", "labels", "text_input_index")
+
+
+class RecipeError(ValueError):
+    """A recipe in portal_recipes.json is malformed or unknown"""
+
+
+@dataclass
+class CompiledRecipe:
+    """
+    A recipe reduced to an op list per stage. Consecutive ``fields`` steps are
+    merged into one ``fill`` op, so a stage costs a single batch_fill round
+    trip no matter how the recipe splits its fields.
+    """
+    recipe_id: str
+    name: str
+    portal: str
+    url: Optional[str]
+    highlight: bool
+    stages: Dict[str, List[Tuple[str, Any]]]
+    labels: Dict[str, str]
+    total_fields: int
+    success: Dict[str, Any] = field(default_factory=dict)
+    http: Optional[Dict[str, Any]] = None  # Browserless form POST plan (see http_submitter)
+
+
+def _compile_step(recipe_id: str, step: Dict[str, Any]) -> Tuple[str, Any]:
+    if step.get("navigate"):
+        return ("navigate", step["navigate"] if isinstance(step["navigate"], str) else None)
+    if "wait" in step:
+        condition = step["wait"]
+        if condition in WAIT_CONDITIONS:
+            if "id" in step:
+                locator = (By.ID, step["id"])
+            elif "css" in step:
+                locator = (By.CSS_SELECTOR, step["css"])
+            else:
+                raise RecipeError(f"{recipe_id}: '{condition}' wait needs a css or id")
+            return ("wait_element", (WAIT_CONDITIONS[condition], locator, step.get("timeout", 20)))
+        if condition in PAGE_WAITS:
+            return ("wait_page", (condition, step.get("timeout")))
+        raise RecipeError(f"{recipe_id}: unknown wait '{condition}'")
+    if "pace" in step:
+        return ("pace", float(step["pace"]))
+    if "screenshot" in step:
+        return ("screenshot", step["screenshot"])
+    if "fields" in step:
+        plan = []
+        for spec in step["fields"]:
+            if not spec.get("key"):
+                raise RecipeError(f"{recipe_id}: field without a key")
+            template = {k: spec[k] for k in FIELD_SPEC_KEYS if k in spec}
+            plan.append((template, spec.get("from", spec["key"]), spec.get("default")))
+        return ("fill", plan)
+    raise RecipeError(f"{recipe_id}: unknown step {step}")
+
+
+def compile_recipe(recipe_id: str, recipe: Dict[str, Any]) -> CompiledRecipe:
+    """Validate a recipe and turn its steps into executable ops"""
+    stages: Dict[str, List[Tuple[str, Any]]] = {}
+    for stage in ("open", "fill"):
+        ops: List[Tuple[str, Any]] = []
+        for step in recipe.get(stage, []):
+            op = _compile_step(recipe_id, step)
+            if op[0] == "navigate" and not (op[1] or recipe.get("url")):
+                raise RecipeError(f"{recipe_id}: navigate step without a url")
+            if op[0] == "fill" and ops and ops[-1][0] == "fill":
+                ops[-1] = ("fill", ops[-1][1] + op[1])
+            else:
+                ops.append(op)
+        stages[stage] = ops
+
+    specs = [spec for step in recipe.get("fill", []) for spec in step.get("fields", [])]
+    return CompiledRecipe(
+        recipe_id=recipe_id,
+        name=recipe.get("name", recipe_id),
+        portal=recipe.get("portal", recipe_id),
+        url=recipe.get("url"),
+        highlight=recipe.get("highlight", True),
+        stages=stages,
+        labels={spec["key"]: spec.get("label", spec["key"]) for spec in specs},
+        total_fields=len(specs),
+        success=recipe.get("success", {}),
+        http=recipe.get("http"),
+    )
+
+
+class RecipeEngine:
+    """
+    Loads portal_recipes.json, compiles every recipe once and re-compiles when
+    the file changes, so adding a supplier is a data change.
+
+    Each recipe has an ``open`` stage (navigate and wait for the form) and a
+    ``fill`` stage (waits, batched fields, screenshots) that services run
+    around their own session handling.
+    """
+
+    def __init__(self, path: str = RECIPES_PATH, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._recipes: Dict[str, CompiledRecipe] = {}
+        self._mtime = 0.0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _reload(self):
+        mtime = os.stat(self.path).st_mtime
+        with open(self.path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+
+        compiled = {}
+        for recipe_id, recipe in raw.items():
+            try:
+                compiled[recipe_id] = compile_recipe(recipe_id, recipe)
+            except (RecipeError, KeyError, TypeError) as e:
+                logger.error(f"❌ Skipping invalid portal recipe {recipe_id}: {e}")
+
+        self._recipes = compiled
+        self._mtime = mtime
+        logger.info(f"📜 Compiled {len(compiled)} portal recipe(s)")
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval and self._recipes:
+            return
+        with self._lock:
+            if now - self._checked_at < self.check_interval and self._recipes:
+                return
+            self._checked_at = now
+            try:
+                if os.stat(self.path).st_mtime != self._mtime:
+                    self._reload()
+            except (OSError, ValueError) as e:
+                # Keep the last good recipes
+                logger.error(f"❌ Failed to load portal recipes: {e}")
+
+    def recipe(self, recipe_id: str) -> CompiledRecipe:
+        self._refresh()
+        compiled = self._recipes.get(recipe_id)
+        if compiled is None:
+            raise RecipeError(f"No portal recipe named '{recipe_id}'")
+        return compiled
+
+    def recipe_ids(self) -> List[str]:
+        self._refresh()
+        return sorted(self._recipes)
+
+    def open(self, driver, recipe_id: str, headless: bool = True,
+             portal: Optional[str] = None) -> Dict[str, Any]:
+        """Run the recipe's open stage; returns ``{"success", "page_load", "screenshots"}``"""
+        recipe = self.recipe(recipe_id)
+        state = {"page_load": None, "screenshots": []}
+        try:
+            self._execute(driver, recipe, "open", {}, state, headless, portal or recipe.portal, None)
+        except TimeoutException:
+            logger.error(f"❌ {recipe.name}: page did not become ready")
+            return {"success": False, "error": "Page load timeout", **state}
+        return {"success": True, **state}
+
+    def fill(self, driver, recipe_id: str, data: Dict[str, Any], portal: Optional[str] = None,
+             demo_pacing: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Run the recipe's fill stage and judge it against the recipe's success
+        markers. Returns the dict shape the RPA endpoints already use
+        (``filled_fields``, ``total_filled``, ``total_fields``, ...).
+        """
+        recipe = self.recipe(recipe_id)
+        state = {"page_load": None, "screenshots": [], "reports": []}
+        self._execute(driver, recipe, "fill", data, state, True, portal or recipe.portal, demo_pacing)
+
+        entries = [entry for report in state["reports"] for entry in report["fields"]]
+        filled = {entry["key"] for entry in entries if entry["status"] == "filled"}
+        missing = [key for key in recipe.success.get("required", []) if key not in filled]
+        marker_found = all(
+            driver.find_elements(By.CSS_SELECTOR, css) for css in recipe.success.get("markers", [])
+        )
+        success = len(filled) >= recipe.success.get("min_filled", 1) and not missing and marker_found
+
+        logger.info(f"📊 {recipe.name}: {len(filled)}/{recipe.total_fields} fields filled")
+        return {
+            "success": success,
+            "filled_fields": field_messages({"fields": entries}, recipe.labels),
+            "total_filled": len(filled),
+            "total_fields": recipe.total_fields,
+            "missing_required": missing,
+            "fill_ms": round(sum(report["roundtrip_ms"] for report in state["reports"]), 1),
+            "screenshots": state["screenshots"],
+            "recipe": recipe.recipe_id,
+        }
+
+    def _execute(self, driver, recipe: CompiledRecipe, stage: str, data: Dict[str, Any],
+                 state: Dict[str, Any], headless: bool, portal: str, demo_pacing: Optional[bool]):
+        waits = PageWaits(driver, demo_pacing=demo_pacing)
+        for kind, arg in recipe.stages.get(stage, []):
+            if kind == "navigate":
+                state["page_load"] = navigate(driver, arg or recipe.url, portal, headless=headless)
+            elif kind == "wait_element":
+                condition, locator, timeout = arg
+                with span("wait", stage=stage, target=locator[1]):
+                    WebDriverWait(driver, timeout).until(condition(locator))
+            elif kind == "wait_page":
+                condition, timeout = arg
+                with span("wait", stage=stage, target=condition):
+                    getattr(waits, condition)(timeout=timeout)
+            elif kind == "pace":
+                with span("pace"):
+                    waits.pace(arg)
+            elif kind == "screenshot":
+                path = capture_screenshot(driver, arg)
+                if path:
+                    state["screenshots"].append(path)
+            elif kind == "fill":
+                fields = [
+                    dict(template, value=data.get(source) or default)
+                    for template, source, default in arg
+                ]
+                state.setdefault("reports", []).append(batch_fill(driver, fields, highlight=recipe.highlight, portal=portal))
+
+
+_engine: Optional[RecipeEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_recipe_engine() -> RecipeEngine:
+    """Get or create the process-wide recipe engine"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RecipeEngine()
+        return _engine
@@ -0,0 +1,569 @@
+"""
+RPA Job Queue
+Runs browser automation jobs off the event loop, tracked as RPASubmission rows
+"""
+
+import os
+import time
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from sqlalchemy import func, inspect, or_, text
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal, engine
+from app.data.catalog import get_catalog
+from app.models import RPASubmission, RPASubmissionStatus
+from app.services.memory_governor import get_memory_governor
+from app.services.portal_scheduler import get_portal_scheduler
+from app.services.rpa_tracing import trace_run, span
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def _run_torrent_power(data: Dict[str, Any]) -> Dict[str, Any]:
+    from app.services.simple_rpa_service import SimpleTorrentRPA
+    return SimpleTorrentRPA().run_automation(data)
+
+
+# target_website -> engine callable taking submission_data and returning a result dict
+ENGINES: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "torrent-power": _run_torrent_power,
+}
+# target_website -> portal recipe its browser engine runs (app/data/portal_recipes.json)
+BROWSER_RECIPES: Dict[str, str] = {
+    "torrent-power": "torrent-power",
+}
+
+
+def http_recipe_for(target_website: str) -> Optional[str]:
+    """
+    Recipe id for suppliers flagged in the catalog as submittable without a
+    browser. ``http_recipe`` marks a recipe checked against the real portal;
+    ``demo_http_recipe`` targets the supplier's /demo-govt form and is only
+    used with RPA_MODE=DEMO.
+    """
+    supplier, _ = get_catalog().get_supplier(target_website)
+    key = "demo_http_recipe" if settings.RPA_MODE == "DEMO" else "http_recipe"
+    return (supplier or {}).get(key)
+
+
+def run_engine(target_website: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """HTTP replay for eligible suppliers, falling back to the browser engine when the form needs one"""
+    browser_engine = ENGINES.get(target_website)
+    recipe_id = http_recipe_for(target_website)
+    if recipe_id:
+        from app.services.http_submitter import submit_http
+        result = submit_http(recipe_id, data, target_website)
+        if result["success"] or not (result.get("fallback") and browser_engine
+                                     and settings.RPA_HTTP_FALLBACK_TO_BROWSER):
+            return result
+        logger.info(f"🌐 Falling back to the browser engine for {target_website}: {result.get('error')}")
+    return browser_engine(data)
+
+
+def has_engine(target_website: str) -> bool:
+    return target_website in ENGINES or bool(http_recipe_for(target_website))
+
+
+LEASE_COLUMNS = ("available_at", "lease_owner", "lease_expires_at")
+# A leased row in one of these is claimed or running; finished rows drop their lease
+LEASED_STATUSES = (RPASubmissionStatus.QUEUED, RPASubmissionStatus.RETRY, RPASubmissionStatus.PROCESSING)
+
+
+def _allow_anonymous_jobs():
+    """
+    Drop NOT NULL from application_id on a table created when every job
+    belonged to an application (portal automation now queues without one).
+    SQLite cannot alter a column constraint, so the table is rebuilt there.
+    """
+    columns = {column["name"]: column for column in inspect(engine).get_columns("rpa_submissions")}
+    if columns["application_id"]["nullable"]:
+        return
+
+    if engine.dialect.name != "sqlite":
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE rpa_submissions ALTER COLUMN application_id DROP NOT NULL"))
+        logger.info("🛠️ Made rpa_submissions.application_id nullable")
+        return
+
+    copied = ", ".join(name for name in columns if name in RPASubmission.__table__.c)
+    with engine.begin() as conn:
+        # The old indexes move with the renamed table and would clash with the new ones
+        for (index,) in conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'rpa_submissions' AND sql IS NOT NULL"
+        )).all():
+            conn.execute(text(f'DROP INDEX "{index}"'))
+        conn.execute(text("ALTER TABLE rpa_submissions RENAME TO rpa_submissions_old"))
+        RPASubmission.__table__.create(conn)
+        conn.execute(text(f"INSERT INTO rpa_submissions ({copied}) SELECT {copied} FROM rpa_submissions_old"))
+        conn.execute(text("DROP TABLE rpa_submissions_old"))
+    logger.info("🛠️ Rebuilt rpa_submissions with a nullable application_id")
+
+
+def ensure_lease_columns():
+    """Add the lease columns to an rpa_submissions table created before they existed"""
+    existing = {column["name"] for column in inspect(engine).get_columns("rpa_submissions")}
+    missing = [name for name in LEASE_COLUMNS if name not in existing]
+    if not missing:
+        return
+    with engine.begin() as conn:
+        for name in missing:
+            column_type = RPASubmission.__table__.c[name].type.compile(dialect=engine.dialect)
+            conn.execute(text(f"ALTER TABLE rpa_submissions ADD COLUMN {name} {column_type}"))
+    logger.info(f"🛠️ Added RPA lease columns: {', '.join(missing)}")
+
+
+def migrate_rpa_submissions():
+    """Bring an rpa_submissions table from an older release up to the current model"""
+    _allow_anonymous_jobs()
+    ensure_lease_columns()
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class RPAJobQueue:
+    """
+    Executes queued RPASubmission rows.
+
+    Rows move QUEUED -> PROCESSING -> SUCCESS, or to RETRY (re-run after a
+    backoff while ``retry_count < max_retries``) and finally FAILED.
+
+    Inline mode runs jobs on a thread pool inside this process. Otherwise the
+    table is the queue: ``available_at`` holds deferrals and backoffs, and
+    worker processes (app.rpa_worker) take jobs with ``claim()`` under a lease
+    they keep alive with ``heartbeat()``.
+    """
+
+    def __init__(self, workers: int, retry_backoff: float, inline: bool = True,
+                 lease_seconds: float = 60):
+        self.retry_backoff = retry_backoff
+        self.inline = inline
+        self.lease_seconds = lease_seconds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rpa-worker") if inline else None
+        self._timers: Dict[int, threading.Timer] = {}
+        self._lock = threading.Lock()
+
+    def _new_job(self, target_website: str, submission_data: Dict[str, Any], target_url: Optional[str] = None,
+                 application_id: Optional[int] = None, max_retries: Optional[int] = None,
+                 lease_owner: Optional[str] = None) -> RPASubmission:
+        if not has_engine(target_website):
+            raise ValueError(f"No RPA engine registered for '{target_website}'")
+
+        job = RPASubmission(
+            application_id=application_id,
+            target_website=target_website,
+            target_url=target_url,
+            status=RPASubmissionStatus.QUEUED,
+            submission_data=submission_data,
+            retry_count=0,
+        )
+        if max_retries is not None:
+            job.max_retries = max_retries
+        if lease_owner:
+            job.lease_owner = lease_owner
+            job.lease_expires_at = datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+        return job
+
+    def enqueue(self, db: Session, target_website: str, submission_data: Dict[str, Any],
+                target_url: Optional[str] = None, application_id: Optional[int] = None,
+                max_retries: Optional[int] = None, lease_owner: Optional[str] = None) -> RPASubmission:
+        """
+        Persist a QUEUED submission and hand it to the worker pool. With
+        ``lease_owner`` the row is leased to that caller instead (see
+        ``run_batch()``) and only falls to the workers if its lease expires.
+        """
+        job = self._new_job(target_website, submission_data, target_url=target_url,
+                            application_id=application_id, max_retries=max_retries, lease_owner=lease_owner)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+        if not lease_owner:
+            self.submit(job.id)
+        logger.info(f"📥 RPA job {job.id} queued for {target_website}")
+        return job
+
+    def enqueue_many(self, db: Session, submissions: List[Tuple[str, Dict[str, Any]]],
+                     lease_owner: Optional[str] = None) -> List[int]:
+        """
+        ``enqueue()`` for a list of ``(target_website, submission_data)`` in a
+        single transaction (bulk uploads); returns the job ids in order
+        """
+        jobs = [self._new_job(target_website, data, lease_owner=lease_owner) for target_website, data in submissions]
+        db.add_all(jobs)
+        db.flush()
+        job_ids = [job.id for job in jobs]
+        db.commit()
+
+        if not lease_owner:
+            for job_id in job_ids:
+                self.submit(job_id)
+        logger.info(f"📥 {len(job_ids)} RPA job(s) queued")
+        return job_ids
+
+    def submit(self, job_id: int, delay: float = 0):
+        """Schedule a job for execution, optionally after a delay"""
+        if not self.inline:
+            # Worker processes find the row once available_at has passed
+            return
+
+        if delay <= 0:
+            self._executor.submit(self.run_job, job_id)
+            return
+
+        timer = threading.Timer(delay, self._fire_timer, args=(job_id,))
+        timer.daemon = True
+        with self._lock:
+            self._timers[job_id] = timer
+        timer.start()
+
+    def _fire_timer(self, job_id: int):
+        with self._lock:
+            self._timers.pop(job_id, None)
+        self._executor.submit(self.run_job, job_id)
+
+    def _defer(self, db: Session, job: RPASubmission, delay: float):
+        """Release the job's lease and make it available again after ``delay`` seconds"""
+        job.available_at = datetime.utcnow() + timedelta(seconds=delay)
+        job.lease_owner = None
+        job.lease_expires_at = None
+        db.commit()
+        self.submit(job.id, delay=delay)
+
+    def _claimable(self, now: datetime):
+        return (
+            RPASubmission.status.in_([RPASubmissionStatus.QUEUED, RPASubmissionStatus.RETRY]),
+            or_(RPASubmission.available_at.is_(None), RPASubmission.available_at <= now),
+            or_(RPASubmission.lease_expires_at.is_(None), RPASubmission.lease_expires_at < now),
+        )
+
+    def _leased_per_portal(self, db: Session, now: datetime) -> Dict[str, int]:
+        """Jobs claimed by any worker and not finished, per target_website"""
+        return dict(
+            db.query(RPASubmission.target_website, func.count(RPASubmission.id)).filter(
+                RPASubmission.status.in_(LEASED_STATUSES),
+                RPASubmission.lease_expires_at >= now,
+            ).group_by(RPASubmission.target_website).all()
+        )
+
+    def claim(self, owner: str, candidates: int = 5) -> Optional[int]:
+        """
+        Lease the oldest runnable job for ``owner``. The conditional UPDATE only
+        succeeds for one claimant, so any number of processes and machines can
+        poll the same table.
+
+        Portals already running their ``max_in_flight`` sessions are skipped.
+        The count comes from the leases in the table, not the per-process
+        scheduler, so the limit holds across the whole worker fleet; a claim
+        that turns out to overshoot it (another worker claimed at the same
+        moment) is given back and retried on the next poll.
+        """
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            scheduler = get_portal_scheduler()
+            leased = self._leased_per_portal(db, now)
+            full = [portal for portal, count in leased.items() if count >= scheduler.max_in_flight(portal)]
+
+            query = db.query(RPASubmission.id, RPASubmission.target_website).filter(*self._claimable(now))
+            if full:
+                query = query.filter(RPASubmission.target_website.notin_(full))
+            rows = query.order_by(RPASubmission.id).limit(candidates).all()
+            for job_id, portal in rows:
+                claimed = db.query(RPASubmission).filter(RPASubmission.id == job_id, *self._claimable(now)).update({
+                    RPASubmission.lease_owner: owner,
+                    RPASubmission.lease_expires_at: now + timedelta(seconds=self.lease_seconds),
+                }, synchronize_session=False)
+                db.commit()
+                if not claimed:
+                    continue
+                if self._leased_per_portal(db, now).get(portal, 0) <= scheduler.max_in_flight(portal):
+                    return job_id
+                db.query(RPASubmission).filter(
+                    RPASubmission.id == job_id, RPASubmission.lease_owner == owner,
+                ).update({
+                    RPASubmission.lease_owner: None,
+                    RPASubmission.lease_expires_at: None,
+                }, synchronize_session=False)
+                db.commit()
+                logger.info(f"⏸️ RPA job {job_id} left queued: {portal} is at its in-flight limit")
+            return None
+        finally:
+            db.close()
+
+    def heartbeat(self, owner: str, job_ids: List[int]):
+        """Extend the leases of the jobs ``owner`` is running"""
+        if not job_ids:
+            return
+        db = SessionLocal()
+        try:
+            db.query(RPASubmission).filter(
+                RPASubmission.id.in_(job_ids), RPASubmission.lease_owner == owner,
+            ).update({
+                RPASubmission.lease_expires_at: datetime.utcnow() + timedelta(seconds=self.lease_seconds),
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def reclaim_expired(self) -> int:
+        """Return jobs whose worker stopped heartbeating (crashed or partitioned) to RETRY"""
+        db = SessionLocal()
+        try:
+            reclaimed = db.query(RPASubmission).filter(
+                RPASubmission.status == RPASubmissionStatus.PROCESSING,
+                RPASubmission.lease_expires_at < datetime.utcnow(),
+            ).update({
+                RPASubmission.status: RPASubmissionStatus.RETRY,
+                RPASubmission.lease_owner: None,
+                RPASubmission.lease_expires_at: None,
+            }, synchronize_session=False)
+            db.commit()
+            if reclaimed:
+                logger.warning(f"♻️ Re-queued {reclaimed} RPA job(s) with expired leases")
+            return reclaimed
+        finally:
+            db.close()
+
+    def run_job(self, job_id: int):
+        db = SessionLocal()
+        try:
+            job = db.query(RPASubmission).filter(RPASubmission.id == job_id).first()
+            if not job or job.status not in (RPASubmissionStatus.QUEUED, RPASubmissionStatus.RETRY):
+                return
+
+            if not http_recipe_for(job.target_website):
+                # Browser jobs wait out memory pressure here rather than failing a checkout
+                pressure = get_memory_governor().pressure()
+                if pressure:
+                    logger.info(f"⏸️ RPA job {job.id} deferred {settings.RPA_MEMORY_DEFER_SECONDS}s ({pressure})")
+                    self._defer(db, job, settings.RPA_MEMORY_DEFER_SECONDS)
+                    return
+
+            scheduler = get_portal_scheduler()
+            admission = scheduler.admit(job.target_website)
+            if not admission.admitted:
+                self._hold(db, job, admission)
+                return
+
+            self._attempt(db, job, lambda data: run_engine(job.target_website, data))
+        except Exception as e:
+            logger.error(f"❌ RPA job {job_id} bookkeeping failed: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def _attempt(self, db: Session, job: RPASubmission, engine_fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 **span_attrs):
+        """Run one admitted attempt of ``job`` and record its outcome"""
+        job.status = RPASubmissionStatus.PROCESSING
+        job.started_at = datetime.utcnow()
+        db.commit()
+
+        logger.info(f"🤖 RPA job {job.id} processing ({job.target_website}, attempt {job.retry_count + 1})")
+        with trace_run(job.target_website) as tracer:
+            try:
+                with span("engine", attempt=job.retry_count + 1, **span_attrs):
+                    result = engine_fn(job.submission_data or {})
+            except Exception as e:
+                logger.error(f"❌ RPA job {job.id} engine error: {e}")
+                result = {"success": False, "error": str(e)}
+        result["trace"] = tracer.export()
+        get_portal_scheduler().release(job.target_website, success=bool(result.get("success")))
+
+        self._record_result(db, job, result)
+
+    def run_batch(self, owner: str, job_ids: List[int], engine_fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+                  on_done: Callable[[RPASubmission], None]):
+        """
+        Run jobs leased to ``owner`` (one supplier) back to back through
+        ``engine_fn``, which keeps its portal session open between them.
+        Each job still goes through the portal scheduler and the normal
+        result bookkeeping, so a failed row is retried by the queue like any
+        other job. ``on_done`` is called with every job once it has an outcome.
+        """
+        db = SessionLocal()
+        scheduler = get_portal_scheduler()
+        index = 0
+        try:
+            for index, job_id in enumerate(job_ids):
+                job = db.query(RPASubmission).filter(RPASubmission.id == job_id).first()
+                if not job or job.lease_owner != owner:
+                    # Lease lost (e.g. a long admission wait) - a worker has it now
+                    if job:
+                        on_done(job)
+                    continue
+
+                while True:
+                    admission = scheduler.admit(job.target_website)
+                    if admission.admitted:
+                        self._attempt(db, job, engine_fn, batch=True)
+                        break
+                    if admission.reason == "circuit_open" and settings.RPA_BREAKER_OPEN_ACTION == "fail":
+                        self._hold(db, job, admission)
+                        break
+                    # Keep the rest of the batch leased while the portal makes us wait
+                    self.heartbeat(owner, job_ids[index:])
+                    time.sleep(min(admission.retry_after, settings.RPA_HEARTBEAT_SECONDS))
+
+                self.heartbeat(owner, job_ids[index + 1:])
+                on_done(job)
+        except Exception as e:
+            logger.error(f"❌ RPA batch for {owner} stopped: {e}")
+            db.rollback()
+            # Hand the unfinished rows to the regular queue
+            for job in db.query(RPASubmission).filter(
+                RPASubmission.id.in_(job_ids[index:]), RPASubmission.lease_owner == owner,
+                RPASubmission.status == RPASubmissionStatus.QUEUED,
+            ).all():
+                self._defer(db, job, 0)
+                on_done(job)
+        finally:
+            db.close()
+
+    def _hold(self, db: Session, job: RPASubmission, admission):
+        """Portal is busy, rate limited or failing: defer the job, or fail it fast if configured"""
+        if admission.reason == "circuit_open" and settings.RPA_BREAKER_OPEN_ACTION == "fail":
+            job.status = RPASubmissionStatus.FAILED
+            job.error_message = f"{job.target_website} portal is failing (circuit open), try again later"
+            job.completed_at = datetime.utcnow()
+            job.lease_owner = None
+            job.lease_expires_at = None
+            db.commit()
+            logger.warning(f"⚡ RPA job {job.id} failed fast: {job.target_website} circuit open")
+            return
+
+        logger.info(f"⏸️ RPA job {job.id} deferred {admission.retry_after:.0f}s ({admission.reason})")
+        self._defer(db, job, admission.retry_after)
+
+    def _record_result(self, db: Session, job: RPASubmission, result: Dict[str, Any]):
+        job.response_data = result
+        job.lease_owner = None
+        job.lease_expires_at = None
+
+        if result.get("success"):
+            job.status = RPASubmissionStatus.SUCCESS
+            job.confirmation_number = result.get("confirmation_number")
+            job.error_message = None
+            job.completed_at = datetime.utcnow()
+            db.commit()
+            logger.info(f"✅ RPA job {job.id} succeeded")
+            return
+
+        job.error_message = result.get("error", "Unknown RPA error")
+        job.retry_count = (job.retry_count or 0) + 1
+
+        if job.retry_count < (job.max_retries or 0):
+            job.status = RPASubmissionStatus.RETRY
+            delay = self.retry_backoff * job.retry_count
+            logger.warning(f"🔁 RPA job {job.id} failed, retry {job.retry_count}/{job.max_retries} in {delay:.0f}s")
+            self._defer(db, job, delay)
+        else:
+            job.status = RPASubmissionStatus.FAILED
+            job.completed_at = datetime.utcnow()
+            db.commit()
+            logger.error(f"❌ RPA job {job.id} failed permanently: {job.error_message}")
+
+    def recover(self):
+        """Re-queue jobs left unfinished by a previous process"""
+        db = SessionLocal()
+        try:
+            pending = db.query(RPASubmission).filter(RPASubmission.status.in_([
+                RPASubmissionStatus.QUEUED,
+                RPASubmissionStatus.RETRY,
+                RPASubmissionStatus.PROCESSING,
+            ])).all()
+
+            for job in pending:
+                if job.status == RPASubmissionStatus.PROCESSING:
+                    # The worker running it died with the old process
+                    job.status = RPASubmissionStatus.RETRY
+            db.commit()
+
+            for job in pending:
+                self.submit(job.id)
+
+            if pending:
+                logger.info(f"♻️ Recovered {len(pending)} unfinished RPA job(s)")
+        finally:
+            db.close()
+
+    def shutdown(self):
+        with self._lock:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def record_run(portal: str, submission_data: Dict[str, Any], engine_fn: Callable[[], Dict[str, Any]],
+               target_url: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Trace an RPA run that does not go through the queue (visible and
+    login-assisted flows) and store it as a finished RPASubmission, so its
+    spans show up in /api/ops/traces next to queued jobs. The row is written
+    once the run is over and is never retried.
+    """
+    started_at = datetime.utcnow()
+    with trace_run(portal) as tracer:
+        try:
+            with span("engine", attempt=1, direct=True):
+                result = engine_fn()
+        except Exception as e:
+            logger.error(f"❌ {portal} automation error: {e}")
+            result = {"success": False, "error": str(e)}
+    result["trace"] = tracer.export()
+
+    db = SessionLocal()
+    try:
+        succeeded = bool(result.get("success"))
+        job = RPASubmission(
+            target_website=portal,
+            target_url=target_url,
+            status=RPASubmissionStatus.SUCCESS if succeeded else RPASubmissionStatus.FAILED,
+            submission_data=submission_data,
+            response_data=result,
+            error_message=None if succeeded else result.get("error", "Unknown RPA error"),
+            retry_count=0 if succeeded else 1,
+            max_retries=0,
+            started_at=started_at,
+            completed_at=datetime.utcnow(),
+        )
+        db.add(job)
+        db.commit()
+        result["job_id"] = job.id
+    except Exception as e:
+        # Losing the trace must not lose the user's automation result
+        logger.error(f"❌ Could not record {portal} run: {e}")
+        db.rollback()
+    finally:
+        db.close()
+    return result
+
+
+_queue: Optional[RPAJobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_rpa_queue() -> RPAJobQueue:
+    """Get or create the process-wide RPA job queue"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = RPAJobQueue(
+                workers=settings.RPA_QUEUE_WORKERS,
+                retry_backoff=settings.RPA_RETRY_BACKOFF_SECONDS,
+                inline=settings.RPA_EXECUTION_MODE != "workers",
+                lease_seconds=settings.RPA_LEASE_SECONDS,
+            )
+        return _queue
@@ -0,0 +1,158 @@
+"""
+RPA Tracing
+Timed spans per step and per field for RPA runs, stored with each submission
+"""
+
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in milliseconds (last bucket is open-ended)
+BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+_local = threading.local()
+
+
+class Tracer:
+    """
+    Collects the spans of one RPA run. Spans are flat with a ``depth`` so the
+    stored trace stays small and can be rendered as a waterfall; offsets are
+    relative to the start of the run.
+    """
+
+    def __init__(self, portal: str):
+        self.portal = portal
+        self.started = time.monotonic()
+        self.spans: List[Dict[str, Any]] = []
+        self._depth = 0
+
+    def _offset_ms(self, at: float) -> float:
+        return round((at - self.started) * 1000, 1)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        entry = {"name": name, "start_ms": self._offset_ms(time.monotonic()), "depth": self._depth}
+        entry.update(attrs)
+        self.spans.append(entry)
+        self._depth += 1
+        started = time.monotonic()
+        try:
+            yield entry
+        except Exception as e:
+            entry["error"] = type(e).__name__
+            raise
+        finally:
+            self._depth -= 1
+            entry["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+
+    def add(self, name: str, duration_ms: float, **attrs):
+        """Record a span measured elsewhere (e.g. per-field timings from inside the page)"""
+        entry = {"name": name, "start_ms": self._offset_ms(time.monotonic()), "depth": self._depth,
+                 "duration_ms": round(duration_ms, 1)}
+        entry.update(attrs)
+        self.spans.append(entry)
+
+    def export(self) -> Dict[str, Any]:
+        return {
+            "portal": self.portal,
+            "total_ms": self._offset_ms(time.monotonic()),
+            "spans": self.spans,
+        }
+
+
+def current_tracer() -> Optional[Tracer]:
+    return getattr(_local, "tracer", None)
+
+
+@contextmanager
+def trace_run(portal: str):
+    """Activate a tracer for the RPA run on this thread"""
+    previous = current_tracer()
+    tracer = Tracer(portal)
+    _local.tracer = tracer
+    try:
+        yield tracer
+    finally:
+        _local.tracer = previous
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a step under the active tracer; a no-op outside a traced run"""
+    tracer = current_tracer()
+    if tracer is None:
+        yield {}
+        return
+    with tracer.span(name, **attrs) as entry:
+        yield entry
+
+
+def add_span(name: str, duration_ms: float, **attrs):
+    tracer = current_tracer()
+    if tracer is not None:
+        tracer.add(name, duration_ms, **attrs)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value_ms: float):
+        self.counts[bisect.bisect_left(BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th sample, capped at the largest sample"""
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return min(BUCKETS_MS[index], round(self.max, 1)) if index < len(BUCKETS_MS) else round(self.max, 1)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 1) if self.count else 0,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "max_ms": round(self.max, 1),
+            "buckets": {
+                (f"le_{bound}" if index < len(BUCKETS_MS) else "inf"): count
+                for index, (bound, count) in enumerate(zip(BUCKETS_MS + [None], self.counts))
+            },
+        }
+
+
+def aggregate_traces(traces: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    ``{portal: {span name: histogram summary}}`` over stored traces, with the
+    run total under ``"total"``. Per-field spans are grouped by field name.
+    """
+    histograms: Dict[str, Dict[str, Histogram]] = {}
+    for trace in traces:
+        portal = histograms.setdefault(trace.get("portal", "unknown"), {})
+        portal.setdefault("total", Histogram()).record(trace.get("total_ms", 0))
+        for entry in trace.get("spans", []):
+            if "duration_ms" not in entry:
+                continue
+            name = entry["name"]
+            if entry.get("field"):
+                name = f"{name}:{entry['field']}"
+            portal.setdefault(name, Histogram()).record(entry["duration_ms"])
+
+    return {
+        portal: {name: histogram.summary() for name, histogram in sorted(spans.items())}
+        for portal, spans in histograms.items()
+    }
@@ -0,0 +1,131 @@
+"""
+RPA Wait Helpers
+Event-driven waits for form filling instead of fixed time.sleep pacing
+"""
+
+import time
+import logging
+from typing import Optional
+
+from selenium.webdriver.remote.webelement import WebElement
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Counts in-flight XHR/fetch requests and records the time of the last DOM mutation
+INSTRUMENT_PAGE_SCRIPT = """
+if (!window.__rpaInstrumented) {
+    window.__rpaInstrumented = true;
+    window.__rpaPending = 0;
+    window.__rpaLastMutation = performance.now();
+
+    const done = () => { window.__rpaPending = Math.max(0, window.__rpaPending - 1); };
+
+    const send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        window.__rpaPending++;
+        this.addEventListener('loadend', done);
+        return send.apply(this, arguments);
+    };
+
+    if (window.fetch) {
+        const fetch = window.fetch;
+        window.fetch = function() {
+            window.__rpaPending++;
+            return fetch.apply(this, arguments).finally(done);
+        };
+    }
+
+    new MutationObserver(() => { window.__rpaLastMutation = performance.now(); })
+        .observe(document.documentElement, {subtree: true, childList: true, attributes: true, characterData: true});
+}
+return true;
+"""
+
+PAGE_STATE_SCRIPT = """
+return {
+    ready: document.readyState,
+    pending: window.__rpaPending || 0,
+    resources: performance.getEntriesByType('resource').length,
+    quietMs: performance.now() - (window.__rpaLastMutation || 0)
+};
+"""
+
+
+class PageWaits:
+    """
+    Wait conditions for one driver.
+
+    ``pace()`` is the only place a fixed delay is allowed, and it is a no-op
+    unless demo pacing is switched on (RPA_DEMO_PACING or per instance) so
+    headless production runs go as fast as the portal responds.
+    """
+
+    def __init__(self, driver, timeout: float = 10, demo_pacing: Optional[bool] = None):
+        self.driver = driver
+        self.timeout = timeout
+        self.demo_pacing = settings.RPA_DEMO_PACING if demo_pacing is None else demo_pacing
+
+    def _instrument(self):
+        try:
+            self.driver.execute_script(INSTRUMENT_PAGE_SCRIPT)
+        except WebDriverException as e:
+            logger.debug(f"Page instrumentation skipped: {e}")
+
+    def value_set(self, element: WebElement, value: str, timeout: float = 2) -> bool:
+        """Wait until an input reports the value we typed (masks/handlers may lag)"""
+        expected = str(value)
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.05).until(
+                lambda d: element.get_attribute("value") == expected
+            )
+            return True
+        except TimeoutException:
+            logger.warning(f"⚠️ Field value did not settle to '{expected}' within {timeout}s")
+            return False
+
+    def network_idle(self, idle_ms: int = 500, timeout: Optional[float] = None) -> bool:
+        """Wait for document load, no pending XHR/fetch and no new resources for idle_ms"""
+        self._instrument()
+        state = {"resources": -1, "since": time.monotonic()}
+
+        def idle(driver):
+            page = driver.execute_script(PAGE_STATE_SCRIPT)
+            now = time.monotonic()
+            if page["ready"] != "complete" or page["pending"] > 0 or page["resources"] != state["resources"]:
+                state["resources"] = page["resources"]
+                state["since"] = now
+                return False
+            return (now - state["since"]) * 1000 >= idle_ms
+
+        try:
+            WebDriverWait(self.driver, timeout or self.timeout, poll_frequency=0.1).until(idle)
+            return True
+        except TimeoutException:
+            logger.warning("⚠️ Network did not go idle before timeout")
+            return False
+
+    def dom_quiet(self, quiet_ms: int = 300, timeout: Optional[float] = None) -> bool:
+        """Wait until the DOM has not mutated for quiet_ms (e.g. after a dependent dropdown)"""
+        self._instrument()
+        try:
+            WebDriverWait(self.driver, timeout or self.timeout, poll_frequency=0.05).until(
+                lambda d: d.execute_script(PAGE_STATE_SCRIPT)["quietMs"] >= quiet_ms
+            )
+            return True
+        except TimeoutException:
+            logger.warning("⚠️ DOM kept changing until timeout")
+            return False
+
+    def settled(self, timeout: Optional[float] = None) -> bool:
+        """Network idle followed by a quiet DOM - the page is ready for input"""
+        return self.network_idle(timeout=timeout) and self.dom_quiet(timeout=timeout)
+
+    def pace(self, seconds: float):
+        """Visible demo pacing - only sleeps when demo pacing is enabled"""
+        if self.demo_pacing:
+            time.sleep(seconds)
@@ -0,0 +1,164 @@
+"""
+Screenshot Writer
+Captures RPA screenshots off the job's hot path: compressed, content-addressed and pruned
+"""
+
+import io
+import os
+import time
+import queue
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+from PIL import Image
+
+from app.config import get_settings
+from app.services.rpa_tracing import span
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PRUNE_INTERVAL_SECONDS = 600
+
+
+class ScreenshotWriter:
+    """
+    The job only grabs the PNG bytes from Chrome and hashes them; a background
+    thread encodes to WebP/JPEG and writes the file. Files are named by the
+    hash of the captured frame, so an identical frame is stored once (its
+    mtime is refreshed so retention keeps it). Old files are pruned by age and
+    by a file-count cap.
+    """
+
+    def __init__(self, directory: str, image_format: str = "webp", quality: int = 60,
+                 retention_hours: float = 72, max_files: int = 2000, queue_size: int = 100):
+        self.directory = directory
+        self.image_format = "jpeg" if image_format.lower() in ("jpg", "jpeg") else "webp"
+        self.extension = "jpg" if self.image_format == "jpeg" else "webp"
+        self.quality = quality
+        self.retention_seconds = retention_hours * 3600
+        self.max_files = max_files
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=queue_size)
+        self._last_prune = 0.0
+        self.written = 0
+        self.deduplicated = 0
+        self.dropped = 0
+        self.pruned = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="screenshot-writer", daemon=True)
+        self._thread.start()
+
+    def capture(self, driver, label: str = "") -> Optional[str]:
+        """Queue a screenshot of the driver's current page; returns the path it will be stored at"""
+        try:
+            with span("screenshot", label=label):
+                png = driver.get_screenshot_as_png()
+        except Exception as e:
+            logger.error(f"❌ Screenshot failed ({label}): {e}")
+            return None
+
+        digest = hashlib.sha256(png).hexdigest()[:32]
+        path = os.path.join(self.directory, f"{digest}.{self.extension}")
+        try:
+            self._queue.put_nowait((path, png))
+        except queue.Full:
+            # Never make the job wait on the encoder
+            self.dropped += 1
+            logger.warning(f"⚠️ Screenshot queue full, dropped {label or digest}")
+            return None
+
+        logger.info(f"📸 Screenshot queued: {label} -> {path}")
+        return path
+
+    def _run(self):
+        while True:
+            path, png = self._queue.get()
+            try:
+                self._write(path, png)
+            except Exception as e:
+                logger.error(f"❌ Screenshot encode failed for {path}: {e}")
+
+            if time.monotonic() - self._last_prune >= PRUNE_INTERVAL_SECONDS:
+                self._last_prune = time.monotonic()
+                try:
+                    self.prune()
+                except Exception as e:
+                    logger.error(f"❌ Screenshot pruning failed: {e}")
+
+    def _write(self, path: str, png: bytes):
+        if os.path.exists(path):
+            os.utime(path)
+            self.deduplicated += 1
+            return
+
+        image = Image.open(io.BytesIO(png)).convert("RGB")
+        # Worker processes can encode the same (content-addressed) screenshot at once
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        image.save(tmp_path, format=self.image_format.upper(), quality=self.quality)
+        os.replace(tmp_path, path)
+        self.written += 1
+
+    def prune(self) -> int:
+        """Delete screenshots past retention, then the oldest beyond max_files"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith((".webp", ".jpg", ".png")):
+                entries.append((entry.stat().st_mtime, entry.path))
+        entries.sort()
+
+        cutoff = time.time() - self.retention_seconds
+        excess = max(0, len(entries) - self.max_files)
+        removed = 0
+        for index, (mtime, path) in enumerate(entries):
+            if mtime >= cutoff and index >= excess:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+
+        self.pruned += removed
+        if removed:
+            logger.info(f"🧹 Pruned {removed} old screenshot(s)")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "format": self.image_format,
+            "quality": self.quality,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "deduplicated": self.deduplicated,
+            "dropped": self.dropped,
+            "pruned": self.pruned,
+        }
+
+
+_writer: Optional[ScreenshotWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_screenshot_writer() -> ScreenshotWriter:
+    """Get or create the process-wide screenshot writer"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ScreenshotWriter(
+                directory=settings.RPA_SCREENSHOT_DIR,
+                image_format=settings.RPA_SCREENSHOT_FORMAT,
+                quality=settings.RPA_SCREENSHOT_QUALITY,
+                retention_hours=settings.RPA_SCREENSHOT_RETENTION_HOURS,
+                max_files=settings.RPA_SCREENSHOT_MAX_FILES,
+            )
+        return _writer
+
+
+def capture_screenshot(driver, label: str = "") -> Optional[str]:
+    """Shortcut for ``get_screenshot_writer().capture(...)``"""
+    return get_screenshot_writer().capture(driver, label)
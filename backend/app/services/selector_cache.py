@@ -0,0 +1,130 @@
+"""
+Selector Resolution Cache
+Remembers which selector matched each field per portal, keyed by a DOM fingerprint
+"""
+
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Hash of the page path and the tag/type/name/id/placeholder of every form control.
+# Any markup change that could move a field produces a different fingerprint.
+PAGE_FINGERPRINT_FN = """
+function () {
+    const parts = [location.host + location.pathname];
+    document.querySelectorAll('form, input, select, textarea, button, label').forEach(el => {
+        parts.push([el.tagName, el.type || '', el.name || '', el.id || '',
+                    el.getAttribute('placeholder') || '', el.htmlFor || ''].join(':'));
+    });
+    const text = parts.join('|');
+    let h1 = 0xdeadbeef, h2 = 0x41c6ce57;
+    for (let i = 0; i < text.length; i++) {
+        const ch = text.charCodeAt(i);
+        h1 = Math.imul(h1 ^ ch, 2654435761);
+        h2 = Math.imul(h2 ^ ch, 1597334677);
+    }
+    h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+    h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+    return (h2 >>> 0).toString(16).padStart(8, '0') + (h1 >>> 0).toString(16).padStart(8, '0');
+}
+"""
+
+
+def page_fingerprint(driver) -> str:
+    """Fingerprint the current page's form structure"""
+    return driver.execute_script(f"return ({PAGE_FINGERPRINT_FN})();")
+
+
+class SelectorCache:
+    """
+    Persistent map of portal -> {fingerprint, selectors}.
+
+    Only one fingerprint is kept per portal: when the page markup changes the
+    old selectors are dropped and re-learned on the next successful fill.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable selector cache {self.path}: {e}")
+            return {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Per-process temp file: worker processes share the cache file, and os.replace keeps each write whole
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, portal: str) -> Optional[Dict[str, Any]]:
+        """Cached entry for a portal, whatever its fingerprint"""
+        with self._lock:
+            entry = self._entries.get(portal)
+            return dict(entry) if entry else None
+
+    def lookup(self, portal: str, fingerprint: str) -> Dict[str, str]:
+        """Selectors learned for this exact page version; a stale entry is invalidated"""
+        with self._lock:
+            entry = self._entries.get(portal)
+            if not entry:
+                return {}
+            if entry["fingerprint"] != fingerprint:
+                logger.info(f"♻️ Selector cache for {portal} invalidated (page changed)")
+                del self._entries[portal]
+                self._save()
+                return {}
+            return dict(entry["selectors"])
+
+    def record(self, portal: str, fingerprint: str, selectors: Dict[str, str]):
+        """Store the selectors that worked; a new fingerprint replaces the old entry"""
+        if not selectors:
+            return
+
+        with self._lock:
+            entry = self._entries.get(portal)
+            if not entry or entry["fingerprint"] != fingerprint:
+                entry = {"fingerprint": fingerprint, "selectors": {}}
+
+            if all(entry["selectors"].get(key) == selector for key, selector in selectors.items()):
+                return
+
+            entry["selectors"].update(selectors)
+            entry["updated_at"] = datetime.now().isoformat()
+            self._entries[portal] = entry
+            self._save()
+
+    def invalidate(self, portal: str):
+        with self._lock:
+            if self._entries.pop(portal, None) is not None:
+                self._save()
+
+
+_cache: Optional[SelectorCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_selector_cache() -> SelectorCache:
+    """Get or create the process-wide selector cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SelectorCache(settings.RPA_SELECTOR_CACHE_PATH)
+        return _cache
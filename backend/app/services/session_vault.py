@@ -0,0 +1,263 @@
+"""
+Session Vault
+Encrypted, expiring store of portal login state (cookies and web storage) per user and portal
+"""
+
+import os
+import json
+import base64
+import hashlib
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from app.config import get_settings
+from app.services.expiry_scheduler import ExpiryScheduler
+from app.services.rpa_tracing import span
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS portal_sessions (
+    session_key TEXT PRIMARY KEY,
+    portal TEXT NOT NULL,
+    state BLOB NOT NULL,
+    created_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL,
+    last_used TEXT,
+    restore_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_portal_sessions_expires ON portal_sessions (expires_at);
+"""
+
+# Web storage of the current origin plus where the user was when the state was taken
+CAPTURE_STORAGE_SCRIPT = """
+const dump = (storage) => {
+  const out = {};
+  for (let i = 0; i < storage.length; i++) {
+    const key = storage.key(i);
+    out[key] = storage.getItem(key);
+  }
+  return out;
+};
+return {url: location.href, origin: location.origin,
+        local: dump(window.localStorage), session: dump(window.sessionStorage)};
+"""
+
+# Seeds web storage before the portal's own scripts run, only on the captured origin
+RESTORE_STORAGE_SCRIPT = """
+(() => {
+  if (location.origin !== %(origin)s) return;
+  const local = %(local)s, session = %(session)s;
+  for (const key in local) window.localStorage.setItem(key, local[key]);
+  for (const key in session) window.sessionStorage.setItem(key, session[key]);
+})();
+"""
+
+COOKIE_PARAM_KEYS = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")
+
+
+def _timestamp(value: datetime) -> str:
+    return value.isoformat(timespec="microseconds")
+
+
+def _fernet(secret: str) -> Fernet:
+    # Fernet wants 32 url-safe base64 bytes; derive them from the app secret
+    return Fernet(base64.urlsafe_b64encode(hashlib.sha256(secret.encode()).digest()))
+
+
+class SessionVault:
+    """
+    Keeps the logged-in state of login-assisted portals so the user solves
+    the CAPTCHA/OTP once and later jobs for the same user and portal start
+    already signed in.
+
+    State is Fernet-encrypted with a key derived from SECRET_KEY and rows are
+    keyed by a hash of ``user:portal``, so the database holds neither cookies
+    nor consumer numbers in the clear. Entries expire after
+    RPA_SESSION_VAULT_TTL_HOURS (the portals' own sessions rarely outlive
+    that) and are evicted by an ExpiryScheduler started in the app lifespan.
+    """
+
+    def __init__(self, db_path: str, ttl_hours: float, secret: str):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self.ttl = timedelta(hours=ttl_hours)
+        self._fernet = _fernet(secret)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+        self.expiry_scheduler = ExpiryScheduler(self.evict_expired)
+        for row in self._conn.execute("SELECT session_key, expires_at FROM portal_sessions"):
+            self.expiry_scheduler.schedule(row["session_key"], datetime.fromisoformat(row["expires_at"]))
+
+    @staticmethod
+    def _session_key(user: str, portal: str) -> str:
+        return hashlib.sha256(f"{user}:{portal}".encode()).hexdigest()
+
+    def store(self, user: str, portal: str, state: Dict[str, Any]):
+        """Encrypt and save a captured state, replacing any older one"""
+        session_key = self._session_key(user, portal)
+        now = datetime.now()
+        expires_at = now + self.ttl
+        token = self._fernet.encrypt(json.dumps(state).encode())
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO portal_sessions (session_key, portal, state, created_at, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(session_key) DO UPDATE SET
+                    state = excluded.state,
+                    created_at = excluded.created_at,
+                    expires_at = excluded.expires_at,
+                    restore_count = 0
+                """,
+                (session_key, portal, token, _timestamp(now), _timestamp(expires_at))
+            )
+        self.expiry_scheduler.schedule(session_key, expires_at)
+
+    def load(self, user: str, portal: str) -> Optional[Dict[str, Any]]:
+        """Decrypted state for ``user`` on ``portal``, or None if absent, expired or unreadable"""
+        session_key = self._session_key(user, portal)
+        now = _timestamp(datetime.now())
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT portal, state, expires_at FROM portal_sessions WHERE session_key = ?", (session_key,)
+            ).fetchone()
+            # Only ever hand back a login made on the same portal
+            if row is None or row["portal"] != portal:
+                return None
+            if row["expires_at"] < now:
+                self._conn.execute("DELETE FROM portal_sessions WHERE session_key = ?", (session_key,))
+                self.expiry_scheduler.cancel(session_key)
+                return None
+            self._conn.execute(
+                "UPDATE portal_sessions SET last_used = ?, restore_count = restore_count + 1 WHERE session_key = ?",
+                (now, session_key)
+            )
+
+        try:
+            return json.loads(self._fernet.decrypt(row["state"]))
+        except InvalidToken:
+            # SECRET_KEY changed since the state was stored
+            logger.warning(f"🔐 Dropping undecryptable {portal} session")
+            self.forget(user, portal)
+            return None
+
+    def forget(self, user: str, portal: str) -> bool:
+        session_key = self._session_key(user, portal)
+        with self._lock, self._conn:
+            deleted = self._conn.execute(
+                "DELETE FROM portal_sessions WHERE session_key = ?", (session_key,)
+            ).rowcount
+        self.expiry_scheduler.cancel(session_key)
+        return bool(deleted)
+
+    def evict_expired(self, session_keys: List[str]) -> int:
+        """Delete the given sessions if they have expired (called by the expiry scheduler)"""
+        placeholders = ",".join("?" * len(session_keys))
+        with self._lock, self._conn:
+            return self._conn.execute(
+                f"DELETE FROM portal_sessions WHERE session_key IN ({placeholders}) AND expires_at <= ?",
+                (*session_keys, _timestamp(datetime.now()))
+            ).rowcount
+
+    # Browser side
+
+    def capture(self, driver, user: str, portal: str) -> bool:
+        """Save the cookies and web storage of the page ``driver`` is on (call right after login)"""
+        try:
+            with span("session.capture", portal=portal):
+                storage = driver.execute_script(CAPTURE_STORAGE_SCRIPT)
+                # CDP sees httpOnly cookies, which document.cookie and get_cookies() may miss
+                cookies = driver.execute_cdp_cmd("Network.getCookies", {})["cookies"]
+            self.store(user, portal, {"cookies": cookies, **storage})
+            logger.info(f"🔐 Saved {portal} session ({len(cookies)} cookies)")
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Could not capture {portal} session: {e}")
+            return False
+
+    def restore(self, driver, user: str, portal: str) -> Optional[str]:
+        """
+        Load a saved session into a fresh browser context. Returns the URL the
+        user was on when it was captured (the caller navigates there and checks
+        it is still signed in), or None when there is nothing to restore.
+        """
+        state = self.load(user, portal)
+        if not state:
+            return None
+
+        with span("session.restore", portal=portal):
+            cookies = [
+                {k: cookie[k] for k in COOKIE_PARAM_KEYS if k in cookie}
+                for cookie in state.get("cookies", [])
+            ]
+            for cookie in cookies:
+                if cookie.get("expires", -1) < 0:
+                    cookie.pop("expires", None)
+            driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+
+            if state.get("local") or state.get("session"):
+                source = RESTORE_STORAGE_SCRIPT % {
+                    "origin": json.dumps(state["origin"]),
+                    "local": json.dumps(state.get("local", {})),
+                    "session": json.dumps(state.get("session", {})),
+                }
+                # Registered per page; discard_seed() removes it before the driver is reused
+                script_id = driver.execute_cdp_cmd(
+                    "Page.addScriptToEvaluateOnNewDocument", {"source": source}
+                )["identifier"]
+                driver.session_seed_script = script_id
+
+        logger.info(f"🔐 Restored {portal} session ({len(cookies)} cookies)")
+        return state.get("url")
+
+    @staticmethod
+    def discard_seed(driver):
+        """Stop seeding restored storage into later page loads of this driver"""
+        script_id = getattr(driver, "session_seed_script", None)
+        if script_id:
+            try:
+                driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": script_id})
+            except Exception:
+                pass
+            driver.session_seed_script = None
+
+    def stats(self) -> Dict[str, Any]:
+        now = _timestamp(datetime.now())
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT portal, COUNT(*) AS sessions, COALESCE(SUM(restore_count), 0) AS restores
+                FROM portal_sessions WHERE expires_at >= ? GROUP BY portal
+                """,
+                (now,)
+            ).fetchall()
+        return {row["portal"]: {"sessions": row["sessions"], "restores": row["restores"]} for row in rows}
+
+
+_vault: Optional[SessionVault] = None
+_vault_lock = threading.Lock()
+
+
+def get_session_vault() -> SessionVault:
+    """Get or create the process-wide session vault"""
+    global _vault
+    with _vault_lock:
+        if _vault is None:
+            _vault = SessionVault(
+                settings.RPA_SESSION_VAULT_PATH,
+                ttl_hours=settings.RPA_SESSION_VAULT_TTL_HOURS,
+                secret=settings.SECRET_KEY,
+            )
+        return _vault
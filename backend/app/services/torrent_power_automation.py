@@ -4,20 +4,21 @@ Torrent Power Name Change - AI-Assisted Selenium Automation
 Unified Portal → Official Torrent Power Website Auto-fill
 """
 
-import time
-import json
 import logging
 from datetime import datetime
-from typing import Dict, Any, Optional
-from selenium import webdriver
+from typing import Dict, Any
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.action_chains import ActionChains
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
+
+from app.services.driver_pool import get_rpa_browser
+from app.services.rpa_queue import record_run
+from app.services.rpa_waits import PageWaits
+from app.services.screenshot_writer import capture_screenshot
+from app.services.selector_cache import get_selector_cache, page_fingerprint
+
+PORTAL_KEY = "torrent-power-connect"
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -35,30 +36,18 @@ class TorrentPowerAutomation:
         self.driver = None
         self.session_data = {}
         self.screenshots = []
-        
-        # Chrome options for production
-        self.chrome_options = Options()
-        self.chrome_options.add_argument("--no-sandbox")
-        self.chrome_options.add_argument("--disable-dev-shm-usage")
-        self.chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        self.chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        self.chrome_options.add_experimental_option('useAutomationExtension', False)
-        self.chrome_options.add_argument("--window-size=1280,720")
-        # Keep browser visible for user monitoring
-        # self.chrome_options.add_argument("--headless")  # Commented for visibility
+        self.matched_selectors = {}
         
         logger.info("🚀 TorrentPowerAutomation initialized")
     
     def create_driver(self):
-        """Create Chrome WebDriver instance"""
+        """Check out a Chrome WebDriver from the RPA browser backend"""
         try:
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=self.chrome_options)
+            # Keep browser visible for user monitoring; release any driver left from the last run
+            self.cleanup()
+            self.driver = get_rpa_browser(headless=False).checkout()
             
-            # Remove automation indicators
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            
-            logger.info("✅ Chrome driver created successfully")
+            logger.info("✅ Chrome driver checked out successfully")
             return True
         except Exception as e:
             logger.error(f"❌ Failed to create Chrome driver: {str(e)}")
@@ -66,14 +55,9 @@ class TorrentPowerAutomation:
     
     def take_screenshot(self, step_name: str):
         """Take screenshot for audit/logging"""
-        try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"torrent_automation_{step_name}_{timestamp}.png"
-            self.driver.save_screenshot(f"/app/screenshots/{filename}")
-            self.screenshots.append(filename)
-            logger.info(f"📸 Screenshot saved: {filename}")
-        except Exception as e:
-            logger.error(f"❌ Screenshot failed: {str(e)}")
+        path = capture_screenshot(self.driver, f"torrent_automation_{step_name}")
+        if path:
+            self.screenshots.append(path)
     
     def wait_for_element(self, by: By, value: str, timeout: int = 10):
         """Wait for element with timeout"""
@@ -157,8 +141,12 @@ class TorrentPowerAutomation:
             logger.warning(f"⚠️ No value provided for {field_name}")
             return False
         
-        # Strategy 1: Try predefined selectors
-        for selector in field_config['selectors']:
+        # Strategy 1: Try the selector that worked last time, then predefined selectors
+        selectors = field_config['selectors']
+        if field_config.get('cached'):
+            selectors = [field_config['cached']] + [s for s in selectors if s != field_config['cached']]
+        
+        for selector in selectors:
             try:
                 element = self.driver.find_element(By.CSS_SELECTOR, selector)
                 
@@ -168,11 +156,13 @@ class TorrentPowerAutomation:
                     try:
                         select.select_by_visible_text(value)
                         logger.info(f"✅ {field_name} filled via dropdown: {value}")
+                        self.matched_selectors[field_name] = selector
                         return True
                     except:
                         try:
                             select.select_by_value(value)
                             logger.info(f"✅ {field_name} filled via dropdown value: {value}")
+                            self.matched_selectors[field_name] = selector
                             return True
                         except:
                             continue
@@ -181,6 +171,7 @@ class TorrentPowerAutomation:
                     element.clear()
                     element.send_keys(value)
                     logger.info(f"✅ {field_name} filled via input: {value}")
+                    self.matched_selectors[field_name] = selector
                     return True
                     
             except (NoSuchElementException, Exception):
@@ -197,6 +188,7 @@ class TorrentPowerAutomation:
                     element.clear()
                     element.send_keys(value)
                     logger.info(f"✅ {field_name} filled via label matching: {value}")
+                    self.matched_selectors[field_name] = f"[id='{input_id}']"
                     return True
             except:
                 continue
@@ -209,7 +201,9 @@ class TorrentPowerAutomation:
         Execute the complete automation workflow
         Step 1-7 as defined in the prompt
         """
-        
+        return record_run("torrent-power", user_data, lambda: self._run_workflow(user_data))
+
+    def _run_workflow(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             logger.info("🚀 Starting PRODUCTION-READY Torrent Power Automation")
             
@@ -234,24 +228,38 @@ class TorrentPowerAutomation:
             self.driver.get("https://connect.torrentpower.com/tplcp/application/namechangerequest")
             
             # Wait for page to load completely
-            time.sleep(5)
+            waits = PageWaits(self.driver)
+            waits.settled(timeout=15)
             self.take_screenshot("page_loaded")
             
             # Step 6: Official Website Auto-Fill
             logger.info("🤖 Step 6: Starting AI-assisted auto-fill...")
             
-            # Get intelligent field mappings
+            # Get intelligent field mappings, putting selectors learned on this page version first
             field_mappings = self.smart_field_mapping(self.session_data)
+            selector_cache = get_selector_cache()
+            fingerprint = page_fingerprint(self.driver)
+            for field_name, cached in selector_cache.lookup(PORTAL_KEY, fingerprint).items():
+                if field_name in field_mappings:
+                    field_mappings[field_name]['cached'] = cached
             
-            # Fill each field intelligently
+            # Fill each field intelligently; the page has settled, so missing
+            # selectors should fail immediately instead of waiting out implicit waits
             success_count = 0
             total_fields = len(field_mappings)
+            self.matched_selectors = {}
+            
+            self.driver.implicitly_wait(0)
+            try:
+                for field_name, field_config in field_mappings.items():
+                    logger.info(f"📝 Filling {field_name}...")
+                    if self.fill_field_intelligently(field_name, field_config):
+                        success_count += 1
+                        waits.pace(2)  # Pause between fields for visibility (demo pacing only)
+            finally:
+                self.driver.implicitly_wait(10)
             
-            for field_name, field_config in field_mappings.items():
-                logger.info(f"📝 Filling {field_name}...")
-                if self.fill_field_intelligently(field_name, field_config):
-                    success_count += 1
-                    time.sleep(2)  # Pause between fields for visibility
+            selector_cache.record(PORTAL_KEY, fingerprint, self.matched_selectors)
             
             # Take screenshot after filling
             self.take_screenshot("form_filled")
@@ -261,7 +269,7 @@ class TorrentPowerAutomation:
                 captcha_refresh = self.driver.find_element(By.CSS_SELECTOR, "button[onclick*='captcha'], input[value*='Regenerate'], button:contains('Regenerate')")
                 if captcha_refresh:
                     captcha_refresh.click()
-                    time.sleep(2)
+                    waits.dom_quiet()
                     logger.info("🔄 Captcha refreshed")
             except:
                 logger.info("ℹ️ No captcha refresh button found")
@@ -330,10 +338,11 @@ class TorrentPowerAutomation:
             logger.info("🌐 Browser left open for user completion")
     
     def cleanup(self):
-        """Cleanup resources if needed"""
+        """Return the driver to the pool once the user is done with it"""
         if self.driver:
-            # Don't close driver - leave for user interaction
-            logger.info("🔄 Driver kept alive for user interaction")
+            get_rpa_browser(headless=False).checkin(self.driver)
+            self.driver = None
+            logger.info("🔄 Driver returned to pool")
 
 
 # Singleton instance
@@ -3,17 +3,14 @@ Torrent Power Service - Clean Implementation
 Handles Torrent Power automation using Selenium
 """
 
-import time
 import logging
-from typing import Dict, Any, Optional
-from selenium import webdriver
-from selenium.webdriver.common.by import By
+from typing import Dict, Any
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
+
+from app.services.browser_sessions import get_browser_sessions
+from app.services.driver_pool import get_rpa_browser
+from app.services.recipe_engine import get_recipe_engine
+from app.services.rpa_queue import record_run
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -35,15 +32,9 @@ class TorrentPowerService:
         try:
             logger.info("🌐 Initializing Chrome browser...")
             
-            chrome_options = Options()
-            if self.headless:
-                chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--window-size=1280,720")
-            
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            # Release any driver left from the last run instead of leaking its pool slot
+            self.cleanup()
+            self.driver = get_rpa_browser(headless=self.headless).checkout()
             self.wait = WebDriverWait(self.driver, 10)
             
             logger.info("✅ Browser initialized successfully")
@@ -55,6 +46,9 @@ class TorrentPowerService:
     
     def submit_name_change_application(self, form_data: Dict[str, Any]) -> Dict[str, Any]:
         """Submit name change application to Torrent Power with actual form filling"""
+        return record_run("torrent-power", form_data, lambda: self._submit_name_change(form_data))
+
+    def _submit_name_change(self, form_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             logger.info("🚀 Starting Torrent Power name change automation...")
             
@@ -62,89 +56,34 @@ class TorrentPowerService:
             if not self.initialize_browser():
                 return {"success": False, "error": "Failed to initialize browser"}
             
-            # Navigate to form
+            # Navigate to form and fill it from the torrent-power recipe
             logger.info("📝 Navigating to Torrent Power name change form...")
-            self.driver.get("https://connect.torrentpower.com/tplcp/application/namechangerequest")
-            time.sleep(5)  # Wait for page to load completely
-            
-            # Take initial screenshot
-            try:
-                self.driver.save_screenshot("torrent_initial_page.png")
-                logger.info("📸 Initial page screenshot taken")
-            except:
-                pass
-            
-            # Fill form fields with actual data
-            fields_filled = 0
-            total_fields = 5  # City, Service Number, T No, Mobile, Email
-            
-            # 1. Fill City dropdown
-            try:
-                city_dropdown = self.wait.until(EC.element_to_be_clickable((By.ID, "city")))
-                city_dropdown.click()
-                time.sleep(1)
-                
-                # Select the city from form data
-                city_option = self.driver.find_element(By.XPATH, f"//option[text()='{form_data.get('city', 'Ahmedabad')}']")
-                city_option.click()
-                fields_filled += 1
-                logger.info(f"✅ City filled: {form_data.get('city', 'Ahmedabad')}")
-            except Exception as e:
-                logger.error(f"❌ Failed to fill city: {e}")
+            engine = get_recipe_engine()
+            if not engine.open(self.driver, "torrent-power", headless=self.headless)["success"]:
+                return {"success": False, "error": "Failed to load Torrent Power form"}
             
-            # 2. Fill Service Number
-            try:
-                service_field = self.wait.until(EC.presence_of_element_located((By.NAME, "serviceNumber")))
-                service_field.clear()
-                service_field.send_keys(form_data.get('service_number', ''))
-                fields_filled += 1
-                logger.info(f"✅ Service Number filled: {form_data.get('service_number', '')}")
-            except Exception as e:
-                logger.error(f"❌ Failed to fill service number: {e}")
+            result = engine.fill(self.driver, "torrent-power", form_data)
+            fields_filled = result["total_filled"]
+            total_fields = result["total_fields"]
             
-            # 3. Fill T Number
-            try:
-                t_number_field = self.wait.until(EC.presence_of_element_located((By.NAME, "tNumber")))
-                t_number_field.clear()
-                t_number_field.send_keys(form_data.get('t_number', ''))
-                fields_filled += 1
-                logger.info(f"✅ T Number filled: {form_data.get('t_number', '')}")
-            except Exception as e:
-                logger.error(f"❌ Failed to fill T number: {e}")
-            
-            # 4. Fill Mobile Number
-            try:
-                mobile_field = self.wait.until(EC.presence_of_element_located((By.NAME, "mobileNumber")))
-                mobile_field.clear()
-                mobile_field.send_keys(form_data.get('mobile', ''))
-                fields_filled += 1
-                logger.info(f"✅ Mobile Number filled: {form_data.get('mobile', '')}")
-            except Exception as e:
-                logger.error(f"❌ Failed to fill mobile number: {e}")
-            
-            # 5. Fill Email
-            try:
-                email_field = self.wait.until(EC.presence_of_element_located((By.NAME, "email")))
-                email_field.clear()
-                email_field.send_keys(form_data.get('email', ''))
-                fields_filled += 1
-                logger.info(f"✅ Email filled: {form_data.get('email', '')}")
-            except Exception as e:
-                logger.error(f"❌ Failed to fill email: {e}")
-            
-            # Take final screenshot
-            try:
-                self.driver.save_screenshot("torrent_form_filled.png")
-                logger.info("📸 Form filled screenshot taken")
-            except:
-                pass
+            # Leave a visible browser open for manual review and submission; the
+            # session registry closes it when the user is done or goes idle
+            browser_session_id = None
+            if not self.headless:
+                browser_session_id = get_browser_sessions().detach(
+                    self.driver, self.headless, "torrent-power", label="name change review"
+                )
+                self.driver = None
+                self.wait = None
             
             # Return success result
             return {
-                "success": True,
+                "success": result["success"],
                 "message": f"Form auto-filled successfully! {fields_filled}/{total_fields} fields completed.",
                 "fields_filled": fields_filled,
                 "total_fields": total_fields,
+                "screenshots": result["screenshots"],
+                "browser_session_id": browser_session_id,
                 "next_steps": [
                     "✅ Form fields have been automatically filled",
                     "📝 Please review the filled data for accuracy",
@@ -161,21 +100,21 @@ class TorrentPowerService:
                 "message": "Failed to auto-fill the form. Please fill manually."
             }
         finally:
-            # Keep browser open for user interaction if not headless
-            if not self.headless:
-                logger.info("ℹ️ Browser kept open for manual review and submission")
+            # A no-op when the browser was handed to the session registry
+            self.cleanup()
     
     def cleanup(self):
-        """Clean up resources"""
+        """Return the browser to the pool"""
         try:
             if self.driver:
                 logger.info("🧹 Cleaning up Torrent Power service...")
-                if self.headless:
-                    self.driver.quit()
-                    self.driver = None
+                get_rpa_browser(headless=self.headless).checkin(self.driver)
                 logger.info("✅ Torrent Power service cleanup completed")
         except Exception as e:
             logger.error(f"❌ Cleanup error: {e}")
+        finally:
+            self.driver = None
+            self.wait = None
 
 
 # Global service instance - auto-detect environment
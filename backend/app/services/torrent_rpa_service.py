@@ -3,178 +3,41 @@ Torrent Power RPA Service using Selenium WebDriver
 Real browser automation for form filling
 """
 
-import time
 import os
-import stat
 import logging
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.webdriver.support.ui import WebDriverWait
+
+from app.services.driver_pool import get_rpa_browser
+from app.services.browser_sessions import get_browser_sessions
+from app.services.rpa_waits import PageWaits
+from app.services.recipe_engine import get_recipe_engine
+from app.services.screenshot_writer import capture_screenshot
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Steps, selectors and waits for the name change form live in app/data/portal_recipes.json
+RECIPE_ID = "torrent-power"
+
 class TorrentPowerRPA:
     def __init__(self):
         self.driver = None
         self.wait = None
+        # Headless on Docker/EC2, visible browser for local development
+        is_docker = os.path.exists('/.dockerenv')
+        is_ec2 = os.path.exists('/opt/aws') or 'ec2' in os.uname().nodename.lower()
+        self.headless = is_docker or is_ec2
+        self.demo_pacing = None  # None -> RPA_DEMO_PACING setting
+        self.page_load = None
+        self.screenshots = []
         
     def setup_driver(self):
-        """Setup Chrome WebDriver with proper options for EC2"""
+        """Check out a warm Chrome WebDriver from the shared pool"""
         try:
-            chrome_options = Options()
-            
-            # Check if running in Docker/EC2 environment
-            is_docker = os.path.exists('/.dockerenv')
-            is_ec2 = os.path.exists('/opt/aws') or 'ec2' in os.uname().nodename.lower()
-            
-            logger.info(f"🔍 Environment detection - Docker: {is_docker}, EC2: {is_ec2}")
-            
-            if is_docker or is_ec2:
-                # Docker/EC2 specific options
-                chrome_options.add_argument("--headless=new")  # Use new headless mode
-                chrome_options.add_argument("--no-sandbox")
-                chrome_options.add_argument("--disable-dev-shm-usage")
-                chrome_options.add_argument("--disable-gpu")
-                chrome_options.add_argument("--disable-software-rasterizer")
-                chrome_options.add_argument("--disable-background-timer-throttling")
-                chrome_options.add_argument("--disable-backgrounding-occluded-windows")
-                chrome_options.add_argument("--disable-renderer-backgrounding")
-                chrome_options.add_argument("--disable-features=TranslateUI")
-                chrome_options.add_argument("--disable-ipc-flooding-protection")
-                chrome_options.add_argument("--memory-pressure-off")
-                chrome_options.add_argument("--max_old_space_size=4096")
-                
-                # Set display for X11 forwarding (if available)
-                if 'DISPLAY' not in os.environ:
-                    os.environ['DISPLAY'] = ':99'
-                
-                logger.info("🐳 Using Docker/EC2 optimized Chrome options")
-            else:
-                # Local development - visible browser
-                chrome_options.add_argument("--start-maximized")
-                logger.info("💻 Using local development Chrome options (visible browser)")
-            
-            # Common options for all environments
-            chrome_options.add_argument("--window-size=1920,1080")
-            chrome_options.add_argument("--disable-extensions")
-            chrome_options.add_argument("--disable-plugins")
-            chrome_options.add_argument("--disable-notifications")
-            chrome_options.add_argument("--disable-popup-blocking")
-            chrome_options.add_argument("--disable-translate")
-            chrome_options.add_argument("--disable-logging")
-            chrome_options.add_argument("--disable-login-animations")
-            chrome_options.add_argument("--disable-motion-blur")
-            chrome_options.add_argument("--no-first-run")
-            chrome_options.add_argument("--no-default-browser-check")
-            chrome_options.add_argument("--ignore-certificate-errors")
-            chrome_options.add_argument("--ignore-ssl-errors")
-            chrome_options.add_argument("--ignore-certificate-errors-spki-list")
-            chrome_options.add_argument("--ignore-certificate-errors-ssl-errors")
-            
-            # User agent to avoid detection
-            chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-            
-            # Set Chrome binary path for Docker
-            if is_docker:
-                chrome_options.binary_location = "/usr/bin/google-chrome"
-            
-            # Try multiple ChromeDriver approaches in order of preference
-            driver_initialized = False
-            
-            # Method 1: Use system-installed ChromeDriver (from Dockerfile)
-            try:
-                logger.info("🔧 Trying system ChromeDriver from /usr/bin/chromedriver...")
-                service = Service('/usr/bin/chromedriver')
-                self.driver = webdriver.Chrome(service=service, options=chrome_options)
-                logger.info("✅ Chrome driver initialized with system ChromeDriver")
-                driver_initialized = True
-            except Exception as e:
-                logger.error(f"❌ System ChromeDriver failed: {e}")
-            
-            # Method 2: Try webdriver-manager (with path fix)
-            if not driver_initialized:
-                try:
-                    logger.info("🔧 Trying webdriver-manager...")
-                    from webdriver_manager.chrome import ChromeDriverManager
-                    
-                    # Use webdriver-manager to handle driver installation
-                    driver_path = ChromeDriverManager().install()
-                    logger.info(f"🔍 ChromeDriver path from webdriver-manager: {driver_path}")
-                    
-                    # Fix common webdriver-manager path issue
-                    if 'THIRD_PARTY_NOTICES' in driver_path or not driver_path.endswith('chromedriver'):
-                        # Extract the correct directory and find the actual chromedriver binary
-                        driver_dir = os.path.dirname(driver_path)
-                        
-                        # Look for the actual chromedriver binary
-                        possible_paths = [
-                            os.path.join(driver_dir, 'chromedriver'),
-                            os.path.join(driver_dir, 'chromedriver-linux64', 'chromedriver'),
-                            os.path.join(os.path.dirname(driver_dir), 'chromedriver'),
-                        ]
-                        
-                        for possible_path in possible_paths:
-                            if os.path.exists(possible_path):
-                                driver_path = possible_path
-                                logger.info(f"🔧 Fixed ChromeDriver path: {driver_path}")
-                                break
-                        else:
-                            # Search for any chromedriver file in the directory tree
-                            for root, dirs, files in os.walk(os.path.dirname(driver_dir)):
-                                for file in files:
-                                    if file == 'chromedriver':
-                                        driver_path = os.path.join(root, file)
-                                        logger.info(f"🔧 Found ChromeDriver binary: {driver_path}")
-                                        break
-                                if driver_path != ChromeDriverManager().install():
-                                    break
-                    
-                    # Make sure the driver is executable
-                    if os.path.exists(driver_path):
-                        os.chmod(driver_path, stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
-                        
-                        service = Service(driver_path)
-                        self.driver = webdriver.Chrome(service=service, options=chrome_options)
-                        logger.info("✅ Chrome driver initialized with webdriver-manager")
-                        driver_initialized = True
-                    else:
-                        logger.error(f"❌ ChromeDriver path does not exist: {driver_path}")
-                        
-                except ImportError:
-                    logger.error("❌ webdriver-manager not available")
-                except Exception as e:
-                    logger.error(f"❌ webdriver-manager Chrome driver failed: {e}")
-            
-            # Method 3: Try system PATH (no explicit service)
-            if not driver_initialized:
-                try:
-                    logger.info("🔧 Trying Chrome from system PATH...")
-                    self.driver = webdriver.Chrome(options=chrome_options)
-                    logger.info("✅ Chrome driver initialized from system PATH")
-                    driver_initialized = True
-                except Exception as e:
-                    logger.error(f"❌ System PATH Chrome driver failed: {e}")
-            
-            # If all methods failed
-            if not driver_initialized:
-                raise Exception("All ChromeDriver initialization methods failed")
-            
-            # Set timeouts
-            self.driver.implicitly_wait(10)
-            self.driver.set_page_load_timeout(30)
+            self.driver = get_rpa_browser(headless=self.headless).checkout()
             self.wait = WebDriverWait(self.driver, 20)
-            
-            # Test driver
-            logger.info("🧪 Testing Chrome driver...")
-            self.driver.get("data:text/html,<html><body><h1>Driver Test</h1></body></html>")
-            logger.info("✅ Chrome driver test successful")
-            
+            logger.info("✅ Chrome driver checked out from pool")
             return True
             
         except Exception as e:
@@ -191,27 +54,28 @@ class TorrentPowerRPA:
             
             return False
     
+    def _screenshot(self, label):
+        """Queue a screenshot with the background writer and remember its path"""
+        path = capture_screenshot(self.driver, label)
+        if path:
+            self.screenshots.append(path)
+    
     def navigate_to_torrent_power(self):
         """Navigate to Torrent Power name change form"""
         try:
-            url = "https://connect.torrentpower.com/tplcp/application/namechangerequest"
-            logger.info(f"🌐 Navigating to: {url}")
-            
-            self.driver.get(url)
+            logger.info("🌐 Opening Torrent Power name change form...")
             
-            # Wait for page to load
-            self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "form")))
-            logger.info("✅ Page loaded successfully")
+            opened = get_recipe_engine().open(self.driver, RECIPE_ID, headless=self.headless)
+            self.page_load = opened["page_load"]
+            self.screenshots.extend(opened["screenshots"])
             
-            # Take screenshot for debugging
-            self.driver.save_screenshot("torrent_page_loaded.png")
-            logger.info("📸 Screenshot saved: torrent_page_loaded.png")
+            if not opened["success"]:
+                logger.error("❌ Page load timeout")
+                return False
             
+            logger.info("✅ Page loaded successfully")
             return True
             
-        except TimeoutException:
-            logger.error("❌ Page load timeout")
-            return False
         except Exception as e:
             logger.error(f"❌ Navigation failed: {e}")
             return False
@@ -220,214 +84,18 @@ class TorrentPowerRPA:
         """Fill the Torrent Power form with provided data"""
         try:
             logger.info("🚀 Starting form filling...")
-            filled_fields = []
-            
-            # 1. Fill City Dropdown
-            try:
-                logger.info("🔍 Looking for city dropdown...")
-                city_select = self.wait.until(EC.element_to_be_clickable((By.TAG_NAME, "select")))
-                
-                select = Select(city_select)
-                city = form_data.get('city', 'Ahmedabad')
-                
-                # Try to select by visible text or value
-                options = select.options
-                for option in options:
-                    if city.lower() in option.text.lower() or city.lower() in option.get_attribute('value').lower():
-                        select.select_by_value(option.get_attribute('value'))
-                        filled_fields.append(f"✅ City: {option.text}")
-                        logger.info(f"✅ City selected: {option.text}")
-                        
-                        # Highlight the field
-                        self.driver.execute_script("arguments[0].style.backgroundColor = '#d4edda'; arguments[0].style.border = '2px solid #28a745';", city_select)
-                        break
-                
-                time.sleep(1)  # Wait for any dynamic updates
-                
-            except Exception as e:
-                logger.error(f"❌ City dropdown error: {e}")
-                filled_fields.append("❌ City dropdown not found")
-            
-            # 2. Fill Service Number
-            try:
-                logger.info("🔍 Looking for service number field...")
-                service_selectors = [
-                    "input[placeholder*='Service Number']",
-                    "input[placeholder*='Service']",
-                    "input[name*='service']",
-                    "input[id*='service']"
-                ]
-                
-                service_input = None
-                for selector in service_selectors:
-                    try:
-                        service_input = self.driver.find_element(By.CSS_SELECTOR, selector)
-                        break
-                    except NoSuchElementException:
-                        continue
-                
-                # Fallback to first text input
-                if not service_input:
-                    text_inputs = self.driver.find_elements(By.CSS_SELECTOR, "input[type='text']")
-                    if text_inputs:
-                        service_input = text_inputs[0]
-                
-                if service_input and form_data.get('service_number'):
-                    service_input.clear()
-                    service_input.send_keys(form_data['service_number'])
-                    filled_fields.append(f"✅ Service Number: {form_data['service_number']}")
-                    logger.info(f"✅ Service Number filled: {form_data['service_number']}")
-                    
-                    # Highlight the field
-                    self.driver.execute_script("arguments[0].style.backgroundColor = '#d4edda'; arguments[0].style.border = '2px solid #28a745';", service_input)
-                else:
-                    filled_fields.append("❌ Service Number field not found")
-                
-                time.sleep(0.5)
-                
-            except Exception as e:
-                logger.error(f"❌ Service Number error: {e}")
-                filled_fields.append("❌ Service Number error")
-            
-            # 3. Fill T Number
-            try:
-                logger.info("🔍 Looking for T Number field...")
-                t_selectors = [
-                    "input[placeholder*='T No']",
-                    "input[placeholder*='T-No']",
-                    "input[placeholder*='TNo']",
-                    "input[name*='tno']",
-                    "input[id*='tno']"
-                ]
-                
-                t_input = None
-                for selector in t_selectors:
-                    try:
-                        t_input = self.driver.find_element(By.CSS_SELECTOR, selector)
-                        break
-                    except NoSuchElementException:
-                        continue
-                
-                # Fallback to second text input
-                if not t_input:
-                    text_inputs = self.driver.find_elements(By.CSS_SELECTOR, "input[type='text']")
-                    if len(text_inputs) > 1:
-                        t_input = text_inputs[1]
-                
-                if t_input and form_data.get('t_number'):
-                    t_input.clear()
-                    t_input.send_keys(form_data['t_number'])
-                    filled_fields.append(f"✅ T Number: {form_data['t_number']}")
-                    logger.info(f"✅ T Number filled: {form_data['t_number']}")
-                    
-                    # Highlight the field
-                    self.driver.execute_script("arguments[0].style.backgroundColor = '#d4edda'; arguments[0].style.border = '2px solid #28a745';", t_input)
-                else:
-                    filled_fields.append("❌ T Number field not found")
-                
-                time.sleep(0.5)
-                
-            except Exception as e:
-                logger.error(f"❌ T Number error: {e}")
-                filled_fields.append("❌ T Number error")
-            
-            # 4. Fill Mobile Number
-            try:
-                logger.info("🔍 Looking for mobile number field...")
-                mobile_selectors = [
-                    "input[type='tel']",
-                    "input[placeholder*='Mobile']",
-                    "input[placeholder*='mobile']",
-                    "input[name*='mobile']",
-                    "input[id*='mobile']"
-                ]
-                
-                mobile_input = None
-                for selector in mobile_selectors:
-                    try:
-                        mobile_input = self.driver.find_element(By.CSS_SELECTOR, selector)
-                        break
-                    except NoSuchElementException:
-                        continue
-                
-                # Fallback to third text input
-                if not mobile_input:
-                    text_inputs = self.driver.find_elements(By.CSS_SELECTOR, "input[type='text']")
-                    if len(text_inputs) > 2:
-                        mobile_input = text_inputs[2]
-                
-                if mobile_input and form_data.get('mobile'):
-                    mobile_input.clear()
-                    mobile_input.send_keys(form_data['mobile'])
-                    filled_fields.append(f"✅ Mobile: {form_data['mobile']}")
-                    logger.info(f"✅ Mobile filled: {form_data['mobile']}")
-                    
-                    # Highlight the field
-                    self.driver.execute_script("arguments[0].style.backgroundColor = '#d4edda'; arguments[0].style.border = '2px solid #28a745';", mobile_input)
-                else:
-                    filled_fields.append("❌ Mobile field not found")
-                
-                time.sleep(0.5)
-                
-            except Exception as e:
-                logger.error(f"❌ Mobile error: {e}")
-                filled_fields.append("❌ Mobile error")
-            
-            # 5. Fill Email
-            try:
-                logger.info("🔍 Looking for email field...")
-                email_selectors = [
-                    "input[type='email']",
-                    "input[placeholder*='Email']",
-                    "input[placeholder*='email']",
-                    "input[name*='email']",
-                    "input[id*='email']"
-                ]
-                
-                email_input = None
-                for selector in email_selectors:
-                    try:
-                        email_input = self.driver.find_element(By.CSS_SELECTOR, selector)
-                        break
-                    except NoSuchElementException:
-                        continue
-                
-                # Fallback to fourth text input
-                if not email_input:
-                    text_inputs = self.driver.find_elements(By.CSS_SELECTOR, "input[type='text']")
-                    if len(text_inputs) > 3:
-                        email_input = text_inputs[3]
-                
-                if email_input and form_data.get('email'):
-                    email_input.clear()
-                    email_input.send_keys(form_data['email'])
-                    filled_fields.append(f"✅ Email: {form_data['email']}")
-                    logger.info(f"✅ Email filled: {form_data['email']}")
-                    
-                    # Highlight the field
-                    self.driver.execute_script("arguments[0].style.backgroundColor = '#d4edda'; arguments[0].style.border = '2px solid #28a745';", email_input)
-                else:
-                    filled_fields.append("❌ Email field not found")
-                
-                time.sleep(0.5)
-                
-            except Exception as e:
-                logger.error(f"❌ Email error: {e}")
-                filled_fields.append("❌ Email error")
-            
-            # Take final screenshot
-            self.driver.save_screenshot("torrent_form_filled.png")
-            logger.info("📸 Final screenshot saved: torrent_form_filled.png")
+            result = get_recipe_engine().fill(self.driver, RECIPE_ID, form_data, demo_pacing=self.demo_pacing)
+            self.screenshots.extend(result["screenshots"])
             
             # Show success notification on the page
-            success_count = len([f for f in filled_fields if f.startswith('✅')])
+            success_count = result["total_filled"]
             
             notification_script = f"""
             const notification = document.createElement('div');
             notification.innerHTML = `
                 <div style="position: fixed; top: 20px; right: 20px; background: #28a745; color: white; padding: 20px 30px; border-radius: 10px; font-family: Arial, sans-serif; font-size: 16px; z-index: 999999; box-shadow: 0 4px 20px rgba(0,0,0,0.3); max-width: 400px;">
                     <strong>🤖 RPA Auto-fill Completed!</strong><br>
-                    Fields filled: {success_count}/5<br>
+                    Fields filled: {success_count}/{result["total_fields"]}<br>
                     <small style="font-size: 14px; margin-top: 10px; display: block;">
                         RPA successfully filled the form fields.<br>
                         Please review and submit the form.
@@ -445,15 +113,8 @@ class TorrentPowerRPA:
             
             self.driver.execute_script(notification_script)
             
-            logger.info(f"📊 Form filling completed: {success_count}/5 fields filled")
-            
-            return {
-                "success": success_count > 0,
-                "filled_fields": filled_fields,
-                "total_filled": success_count,
-                "total_fields": 5,
-                "screenshots": ["torrent_page_loaded.png", "torrent_form_filled.png"]
-            }
+            result["screenshots"] = list(self.screenshots)
+            return result
             
         except Exception as e:
             logger.error(f"❌ Form filling failed: {e}")
@@ -465,32 +126,45 @@ class TorrentPowerRPA:
                 "total_fields": 5
             }
     
-    def keep_browser_open(self, duration=300):
-        """Keep browser open for user interaction"""
+    def keep_browser_open(self, idle_timeout=300, show_alert=True):
+        """
+        Leave the browser open for the user to review and submit. The driver
+        moves to the browser session registry, which closes it once the user
+        is done or stops interacting for ``idle_timeout`` seconds.
+        """
         try:
-            logger.info(f"🕐 Keeping browser open for {duration} seconds for user interaction...")
             logger.info("👤 User can now review the form and submit manually")
             
-            # Show a message to user
-            message_script = """
-            alert('🎉 RPA Auto-fill Completed!\\n\\nThe form has been filled automatically.\\n\\nPlease review the data and click Submit to complete your application.\\n\\nThe browser will stay open for your convenience.');
-            """
-            self.driver.execute_script(message_script)
+            if show_alert:
+                # Show a message to user
+                message_script = """
+                alert('🎉 RPA Auto-fill Completed!\\n\\nThe form has been filled automatically.\\n\\nPlease review the data and click Submit to complete your application.\\n\\nThe browser will stay open for your convenience.');
+                """
+                self.driver.execute_script(message_script)
             
-            # Keep browser open
-            time.sleep(duration)
+            session_id = get_browser_sessions().detach(
+                self.driver, self.headless, RECIPE_ID, label="name change review", idle_timeout=idle_timeout
+            )
+            # The registry owns the driver now; close_driver() must not return it to the pool
+            self.driver = None
+            self.wait = None
+            return session_id
             
         except Exception as e:
             logger.error(f"❌ Error keeping browser open: {e}")
+            return None
     
     def close_driver(self):
-        """Close the browser driver"""
+        """Return the browser driver to the pool"""
         try:
             if self.driver:
-                self.driver.quit()
-                logger.info("✅ Browser closed")
+                get_rpa_browser(headless=self.headless).checkin(self.driver)
+                logger.info("✅ Browser returned to pool")
         except Exception as e:
             logger.error(f"❌ Error closing browser: {e}")
+        finally:
+            self.driver = None
+            self.wait = None
     
     def run_automation(self, form_data, keep_open=True, visible_mode=False):
         """Run the complete RPA automation"""
@@ -508,10 +182,11 @@ class TorrentPowerRPA:
             
             # Fill form
             result = self.fill_form(form_data)
+            result["page_load"] = self.page_load
             
-            if result["success"] and keep_open:
-                # Keep browser open for user interaction
-                self.keep_browser_open(300)  # 5 minutes
+            # Only a visible browser can be reviewed; a headless one goes straight back to the pool
+            if result["success"] and keep_open and not self.headless:
+                result["browser_session_id"] = self.keep_browser_open(idle_timeout=300)
             
             return result
             
@@ -519,41 +194,16 @@ class TorrentPowerRPA:
             logger.error(f"❌ RPA automation failed: {e}")
             return {"success": False, "error": str(e)}
         finally:
-            if not keep_open:
-                self.close_driver()
+            # A no-op when keep_browser_open() handed the driver to the session registry
+            self.close_driver()
 
     def run_visible_automation(self, form_data):
         """Run automation with visible browser for debugging"""
         try:
             logger.info("🚀 Starting VISIBLE Torrent Power RPA Automation...")
             
-            # Temporarily modify Chrome options for visible mode
-            original_setup = self.setup_driver
-            
-            def visible_setup():
-                chrome_options = Options()
-                # Visible browser options
-                chrome_options.add_argument("--start-maximized")
-                chrome_options.add_argument("--disable-notifications")
-                chrome_options.add_argument("--disable-popup-blocking")
-                chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-                
-                try:
-                    from webdriver_manager.chrome import ChromeDriverManager
-                    service = Service(ChromeDriverManager().install())
-                    self.driver = webdriver.Chrome(service=service, options=chrome_options)
-                    logger.info("✅ Visible Chrome driver initialized")
-                except ImportError:
-                    self.driver = webdriver.Chrome(options=chrome_options)
-                    logger.info("✅ Visible Chrome driver initialized (system PATH)")
-                
-                self.driver.implicitly_wait(10)
-                self.driver.set_page_load_timeout(30)
-                self.wait = WebDriverWait(self.driver, 20)
-                return True
-            
-            # Use visible setup
-            self.setup_driver = visible_setup
+            # Use the visible driver pool for this run
+            self.headless = False
             
             # Setup driver
             if not self.setup_driver():
@@ -567,8 +217,8 @@ class TorrentPowerRPA:
             result = self.fill_form_visible(form_data)
             
             # Keep browser open longer for debugging
-            logger.info("🕐 Keeping visible browser open for 10 minutes for debugging...")
-            time.sleep(600)  # 10 minutes
+            if result["success"]:
+                result["browser_session_id"] = self.keep_browser_open(idle_timeout=600, show_alert=False)
             
             return result
             
@@ -582,7 +232,7 @@ class TorrentPowerRPA:
         """Fill form with visible feedback and slower pace"""
         try:
             logger.info("🚀 Starting VISIBLE form filling...")
-            filled_fields = []
+            waits = PageWaits(self.driver, demo_pacing=True)  # Visible mode is always paced
             
             # Add a banner to show automation is running
             banner_script = """
@@ -598,74 +248,21 @@ class TorrentPowerRPA:
             document.body.style.marginTop = '60px';
             """
             self.driver.execute_script(banner_script)
-            time.sleep(2)  # Let user see the banner
-            
-            # 1. Fill City Dropdown (with visual feedback)
-            try:
-                logger.info("🔍 [VISIBLE] Looking for city dropdown...")
-                
-                # Highlight what we're looking for
-                highlight_script = """
-                const selects = document.querySelectorAll('select');
-                selects.forEach(select => {
-                    select.style.border = '3px solid #ffc107';
-                    select.style.backgroundColor = '#fff3cd';
-                });
-                """
-                self.driver.execute_script(highlight_script)
-                time.sleep(1)
-                
-                city_select = self.wait.until(EC.element_to_be_clickable((By.TAG_NAME, "select")))
-                
-                select = Select(city_select)
-                city = form_data.get('city', 'Ahmedabad')
-                
-                # Show what we're selecting
-                self.driver.execute_script(f"""
-                    const notification = document.createElement('div');
-                    notification.innerHTML = `
-                        <div style="position: fixed; top: 80px; right: 20px; background: #17a2b8; color: white; padding: 15px; border-radius: 8px; font-family: Arial, sans-serif; z-index: 999998;">
-                            🔍 Selecting City: {city}
-                        </div>
-                    `;
-                    document.body.appendChild(notification);
-                    setTimeout(() => notification.remove(), 3000);
-                """)
-                
-                # Try to select by visible text or value
-                options = select.options
-                for option in options:
-                    if city.lower() in option.text.lower() or city.lower() in option.get_attribute('value').lower():
-                        select.select_by_value(option.get_attribute('value'))
-                        filled_fields.append(f"✅ City: {option.text}")
-                        logger.info(f"✅ [VISIBLE] City selected: {option.text}")
-                        
-                        # Highlight success
-                        self.driver.execute_script("arguments[0].style.backgroundColor = '#d4edda'; arguments[0].style.border = '3px solid #28a745';", city_select)
-                        break
-                
-                time.sleep(2)  # Slower pace for visibility
-                
-            except Exception as e:
-                logger.error(f"❌ [VISIBLE] City dropdown error: {e}")
-                filled_fields.append("❌ City dropdown not found")
-            
-            # Continue with other fields using similar visible approach...
-            # (I'll implement the rest similarly but keeping response concise)
-            
-            # Take final screenshot
-            self.driver.save_screenshot("torrent_form_filled_visible.png")
-            logger.info("📸 Visible mode screenshot saved")
+            waits.pace(2)  # Let user see the banner
+            
+            # Same recipe as headless runs; demo pacing makes each step watchable
+            result = get_recipe_engine().fill(self.driver, RECIPE_ID, form_data, demo_pacing=True)
+            self.screenshots.extend(result["screenshots"])
             
             # Show completion notification
-            success_count = len([f for f in filled_fields if f.startswith('✅')])
+            success_count = result["total_filled"]
             
             completion_script = f"""
             const completion = document.createElement('div');
             completion.innerHTML = `
                 <div style="position: fixed; top: 50%; left: 50%; transform: translate(-50%, -50%); background: #28a745; color: white; padding: 30px; border-radius: 15px; font-family: Arial, sans-serif; font-size: 20px; z-index: 999999; box-shadow: 0 10px 30px rgba(0,0,0,0.5); text-align: center; min-width: 400px;">
                     <h2 style="margin: 0 0 15px 0;">🎉 RPA AUTOMATION COMPLETED!</h2>
-                    <p style="margin: 10px 0; font-size: 18px;">Fields Successfully Filled: {success_count}/5</p>
+                    <p style="margin: 10px 0; font-size: 18px;">Fields Successfully Filled: {success_count}/{result["total_fields"]}</p>
                     <p style="margin: 10px 0; font-size: 16px;">Please review the form and submit when ready.</p>
                     <p style="margin: 15px 0 0 0; font-size: 14px; opacity: 0.9;">Browser will remain open for your convenience.</p>
                 </div>
@@ -675,14 +272,9 @@ class TorrentPowerRPA:
             
             self.driver.execute_script(completion_script)
             
-            return {
-                "success": success_count > 0,
-                "filled_fields": filled_fields,
-                "total_filled": success_count,
-                "total_fields": 5,
-                "screenshots": ["torrent_form_filled_visible.png"],
-                "mode": "visible"
-            }
+            result["screenshots"] = list(self.screenshots)
+            result["mode"] = "visible"
+            return result
             
         except Exception as e:
             logger.error(f"❌ [VISIBLE] Form filling failed: {e}")
@@ -4,28 +4,104 @@ Stores and retrieves user data for form filling
 """
 import json
 import logging
-from typing import Dict, Any, Optional
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 import hashlib
 import os
 
+from app.services.expiry_scheduler import ExpiryScheduler
+
 logger = logging.getLogger(__name__)
 
+# Reads refresh last_used at most this often, so lookups don't take the write lock
+LAST_USED_RESOLUTION = timedelta(hours=1)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (
+    user_key TEXT PRIMARY KEY,
+    mobile TEXT NOT NULL,
+    email TEXT,
+    form_data TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL,
+    last_used TEXT,
+    usage_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_user_data_mobile ON user_data (mobile, expires_at);
+CREATE INDEX IF NOT EXISTS idx_user_data_expires ON user_data (expires_at);
+"""
+
+def _timestamp(value: datetime) -> str:
+    # Fixed-width ISO timestamps compare correctly as strings in SQL
+    return value.isoformat(timespec="microseconds")
+
 class UserDataService:
-    """Service to store and retrieve user data for automation"""
+    """
+    Service to store and retrieve user data for automation
+
+    Records live in a SQLite database indexed by mobile number and expiry, so
+    lookups and cleanup touch only matching rows. Legacy ``user_*.json`` files
+    from the old file-per-user store are imported on start-up.
+
+    Every record is also registered with an ExpiryScheduler, whose background
+    task (started in the app lifespan) deletes it as soon as it expires.
+    """
     
-    def __init__(self):
-        self.data_dir = "user_data"
+    def __init__(self, data_dir: str = "user_data"):
+        self.data_dir = data_dir
         os.makedirs(self.data_dir, exist_ok=True)
+        self.db_path = os.path.join(self.data_dir, "user_data.db")
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._import_legacy_files()
+        
+        self.expiry_scheduler = ExpiryScheduler(self.evict_expired)
+        for row in self._conn.execute("SELECT user_key, expires_at FROM user_data"):
+            self.expiry_scheduler.schedule(row["user_key"], datetime.fromisoformat(row["expires_at"]))
         
     def _generate_user_key(self, mobile: str, email: str = None) -> str:
         """Generate unique key for user based on mobile and email"""
         identifier = f"{mobile}_{email or 'no_email'}"
         return hashlib.md5(identifier.encode()).hexdigest()
     
-    def _get_user_file_path(self, user_key: str) -> str:
-        """Get file path for user data"""
-        return os.path.join(self.data_dir, f"user_{user_key}.json")
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        data = dict(row)
+        data["form_data"] = json.loads(data["form_data"])
+        return data
+    
+    def _import_legacy_files(self):
+        """Move records from the old one-JSON-file-per-user layout into the database"""
+        imported = 0
+        for filename in os.listdir(self.data_dir):
+            if not (filename.startswith("user_") and filename.endswith(".json")):
+                continue
+            file_path = os.path.join(self.data_dir, filename)
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                with self._lock, self._conn:
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO user_data VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (data["user_key"], data["mobile"], data.get("email"),
+                         json.dumps(data.get("form_data", {}), ensure_ascii=False),
+                         _timestamp(datetime.fromisoformat(data["created_at"])),
+                         _timestamp(datetime.fromisoformat(data["expires_at"])),
+                         data.get("last_used"), data.get("usage_count", 0))
+                    )
+                os.remove(file_path)
+                imported += 1
+            except Exception as e:
+                logger.warning(f"Skipping unreadable legacy user data file {filename}: {e}")
+        
+        if imported:
+            logger.info(f"Imported {imported} legacy user data files into {self.db_path}")
     
     def store_user_data(self, mobile: str, form_data: Dict[str, Any], 
                        email: str = None, expire_hours: int = 24) -> str:
@@ -43,33 +119,28 @@ class UserDataService:
         """
         try:
             user_key = self._generate_user_key(mobile, email)
-            file_path = self._get_user_file_path(user_key)
-            
-            # Prepare data with metadata
-            user_data = {
-                "user_key": user_key,
-                "mobile": mobile,
-                "email": email,
-                "form_data": form_data,
-                "created_at": datetime.now().isoformat(),
-                "expires_at": (datetime.now() + timedelta(hours=expire_hours)).isoformat(),
-                "last_used": datetime.now().isoformat(),
-                "usage_count": 1
-            }
-            
-            # Check if user data already exists
-            if os.path.exists(file_path):
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        existing_data = json.load(f)
-                    user_data["usage_count"] = existing_data.get("usage_count", 0) + 1
-                    user_data["created_at"] = existing_data.get("created_at", user_data["created_at"])
-                except:
-                    pass
+            now = datetime.now()
+            expires_at = now + timedelta(hours=expire_hours)
             
-            # Save user data
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(user_data, f, indent=2, ensure_ascii=False)
+            # An existing record keeps its created_at and bumps usage_count
+            with self._lock, self._conn:
+                self._conn.execute(
+                    """
+                    INSERT INTO user_data (user_key, mobile, email, form_data, created_at,
+                                           expires_at, last_used, usage_count)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+                    ON CONFLICT(user_key) DO UPDATE SET
+                        mobile = excluded.mobile,
+                        email = excluded.email,
+                        form_data = excluded.form_data,
+                        expires_at = excluded.expires_at,
+                        last_used = excluded.last_used,
+                        usage_count = user_data.usage_count + 1
+                    """,
+                    (user_key, mobile, email, json.dumps(form_data, ensure_ascii=False),
+                     _timestamp(now), _timestamp(expires_at), _timestamp(now))
+                )
+            self.expiry_scheduler.schedule(user_key, expires_at)
             
             logger.info(f"User data stored for key: {user_key}")
             return user_key
@@ -89,28 +160,33 @@ class UserDataService:
             User data if found and not expired, None otherwise
         """
         try:
-            file_path = self._get_user_file_path(user_key)
-            
-            if not os.path.exists(file_path):
-                logger.warning(f"User data not found for key: {user_key}")
-                return None
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                user_data = json.load(f)
-            
-            # Check if data has expired
-            expires_at = datetime.fromisoformat(user_data["expires_at"])
-            if datetime.now() > expires_at:
-                logger.warning(f"User data expired for key: {user_key}")
-                # Clean up expired data
-                os.remove(file_path)
-                return None
-            
-            # Update last used timestamp
-            user_data["last_used"] = datetime.now().isoformat()
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(user_data, f, indent=2, ensure_ascii=False)
+            current = datetime.now()
+            now = _timestamp(current)
+            with self._lock, self._conn:
+                row = self._conn.execute(
+                    "SELECT * FROM user_data WHERE user_key = ?", (user_key,)
+                ).fetchone()
+                
+                if row is None:
+                    logger.warning(f"User data not found for key: {user_key}")
+                    return None
+                
+                # Check if data has expired
+                if row["expires_at"] < now:
+                    logger.warning(f"User data expired for key: {user_key}")
+                    # Clean up expired data
+                    self._conn.execute("DELETE FROM user_data WHERE user_key = ?", (user_key,))
+                    self.expiry_scheduler.cancel(user_key)
+                    return None
+                
+                # Only a stale last_used is rewritten; most reads stay read-only
+                refreshed = not row["last_used"] or row["last_used"] < _timestamp(current - LAST_USED_RESOLUTION)
+                if refreshed:
+                    self._conn.execute("UPDATE user_data SET last_used = ? WHERE user_key = ?", (now, user_key))
             
+            user_data = self._row_to_dict(row)
+            if refreshed:
+                user_data["last_used"] = now
             logger.info(f"User data retrieved for key: {user_key}")
             return user_data
             
@@ -136,26 +212,18 @@ class UserDataService:
             if user_data:
                 return user_data
             
-            # If not found, search through all user files
-            for filename in os.listdir(self.data_dir):
-                if filename.startswith("user_") and filename.endswith(".json"):
-                    file_path = os.path.join(self.data_dir, filename)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                        
-                        if data.get("mobile") == mobile:
-                            # Check if expired
-                            expires_at = datetime.fromisoformat(data["expires_at"])
-                            if datetime.now() <= expires_at:
-                                return data
-                            else:
-                                # Clean up expired data
-                                os.remove(file_path)
-                    except:
-                        continue
+            # Otherwise the most recently used unexpired record for this mobile
+            with self._lock:
+                row = self._conn.execute(
+                    """
+                    SELECT * FROM user_data
+                    WHERE mobile = ? AND expires_at >= ?
+                    ORDER BY last_used DESC LIMIT 1
+                    """,
+                    (mobile, _timestamp(datetime.now()))
+                ).fetchone()
             
-            return None
+            return self._row_to_dict(row) if row else None
             
         except Exception as e:
             logger.error(f"Failed to find user by mobile: {e}")
@@ -179,13 +247,17 @@ class UserDataService:
             
             # Update form data and metadata
             existing_data["form_data"].update(form_data)
-            existing_data["last_used"] = datetime.now().isoformat()
-            existing_data["usage_count"] = existing_data.get("usage_count", 0) + 1
             
-            # Save updated data
-            file_path = self._get_user_file_path(user_key)
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(existing_data, f, indent=2, ensure_ascii=False)
+            with self._lock, self._conn:
+                self._conn.execute(
+                    """
+                    UPDATE user_data
+                    SET form_data = ?, last_used = ?, usage_count = usage_count + 1
+                    WHERE user_key = ?
+                    """,
+                    (json.dumps(existing_data["form_data"], ensure_ascii=False),
+                     _timestamp(datetime.now()), user_key)
+                )
             
             logger.info(f"User data updated for key: {user_key}")
             return True
@@ -205,10 +277,14 @@ class UserDataService:
             True if deleted successfully, False otherwise
         """
         try:
-            file_path = self._get_user_file_path(user_key)
+            with self._lock, self._conn:
+                deleted = self._conn.execute(
+                    "DELETE FROM user_data WHERE user_key = ?", (user_key,)
+                ).rowcount
             
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            self.expiry_scheduler.cancel(user_key)
+            
+            if deleted:
                 logger.info(f"User data deleted for key: {user_key}")
                 return True
             else:
@@ -219,35 +295,37 @@ class UserDataService:
             logger.error(f"Failed to delete user data: {e}")
             return False
     
+    def evict_expired(self, user_keys: List[str]) -> int:
+        """
+        Delete the given records if they have expired (called by the expiry scheduler)
+        
+        Returns:
+            Number of records deleted
+        """
+        placeholders = ",".join("?" * len(user_keys))
+        with self._lock, self._conn:
+            return self._conn.execute(
+                f"DELETE FROM user_data WHERE user_key IN ({placeholders}) AND expires_at <= ?",
+                (*user_keys, _timestamp(datetime.now()))
+            ).rowcount
+    
     def cleanup_expired_data(self) -> int:
         """
-        Clean up expired user data files
+        Clean up expired user data
         
         Returns:
-            Number of files cleaned up
+            Number of records cleaned up
         """
         cleaned_count = 0
         
         try:
-            for filename in os.listdir(self.data_dir):
-                if filename.startswith("user_") and filename.endswith(".json"):
-                    file_path = os.path.join(self.data_dir, filename)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                        
-                        expires_at = datetime.fromisoformat(data["expires_at"])
-                        if datetime.now() > expires_at:
-                            os.remove(file_path)
-                            cleaned_count += 1
-                            logger.info(f"Cleaned expired data: {filename}")
-                    except:
-                        # Remove corrupted files
-                        os.remove(file_path)
-                        cleaned_count += 1
-                        logger.info(f"Cleaned corrupted data: {filename}")
+            # Range delete on the expiry index - only expired rows are touched
+            with self._lock, self._conn:
+                cleaned_count = self._conn.execute(
+                    "DELETE FROM user_data WHERE expires_at < ?", (_timestamp(datetime.now()),)
+                ).rowcount
             
-            logger.info(f"Cleanup completed. Removed {cleaned_count} files.")
+            logger.info(f"Cleanup completed. Removed {cleaned_count} records.")
             return cleaned_count
             
         except Exception as e:
@@ -262,51 +340,47 @@ class UserDataService:
             Statistics dictionary
         """
         try:
-            stats = {
-                "total_users": 0,
-                "active_users": 0,
-                "expired_users": 0,
-                "total_usage": 0,
-                "most_used_fields": {},
-                "recent_activity": []
-            }
-            
-            for filename in os.listdir(self.data_dir):
-                if filename.startswith("user_") and filename.endswith(".json"):
-                    file_path = os.path.join(self.data_dir, filename)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                        
-                        stats["total_users"] += 1
-                        stats["total_usage"] += data.get("usage_count", 0)
-                        
-                        # Check if expired
-                        expires_at = datetime.fromisoformat(data["expires_at"])
-                        if datetime.now() > expires_at:
-                            stats["expired_users"] += 1
-                        else:
-                            stats["active_users"] += 1
-                        
-                        # Track field usage
-                        for field_name in data.get("form_data", {}).keys():
-                            stats["most_used_fields"][field_name] = stats["most_used_fields"].get(field_name, 0) + 1
-                        
-                        # Recent activity
-                        stats["recent_activity"].append({
-                            "user_key": data["user_key"][:8] + "...",  # Partial key for privacy
-                            "last_used": data.get("last_used"),
-                            "usage_count": data.get("usage_count", 0)
-                        })
-                        
-                    except:
-                        continue
-            
-            # Sort recent activity
-            stats["recent_activity"].sort(key=lambda x: x["last_used"], reverse=True)
-            stats["recent_activity"] = stats["recent_activity"][:10]  # Top 10
+            now = _timestamp(datetime.now())
+            with self._lock:
+                totals = self._conn.execute(
+                    """
+                    SELECT COUNT(*) AS total_users,
+                           COALESCE(SUM(expires_at < ?), 0) AS expired_users,
+                           COALESCE(SUM(usage_count), 0) AS total_usage
+                    FROM user_data
+                    """,
+                    (now,)
+                ).fetchone()
+                
+                # Track field usage
+                field_rows = self._conn.execute(
+                    """
+                    SELECT field.key AS field_name, COUNT(*) AS users
+                    FROM user_data, json_each(user_data.form_data) AS field
+                    GROUP BY field.key
+                    """
+                ).fetchall()
+                
+                # Recent activity
+                recent_rows = self._conn.execute(
+                    "SELECT user_key, last_used, usage_count FROM user_data ORDER BY last_used DESC LIMIT 10"
+                ).fetchall()
             
-            return stats
+            return {
+                "total_users": totals["total_users"],
+                "active_users": totals["total_users"] - totals["expired_users"],
+                "expired_users": totals["expired_users"],
+                "total_usage": totals["total_usage"],
+                "most_used_fields": {row["field_name"]: row["users"] for row in field_rows},
+                "recent_activity": [
+                    {
+                        "user_key": row["user_key"][:8] + "...",  # Partial key for privacy
+                        "last_used": row["last_used"],
+                        "usage_count": row["usage_count"]
+                    }
+                    for row in recent_rows
+                ]
+            }
             
         except Exception as e:
             logger.error(f"Failed to get user stats: {e}")
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Runtime files (user_data/, screenshots/, data/*.json, the SQLite database)
+# are relative to the working directory; keep them out of the source tree
+os.chdir(tempfile.mkdtemp(prefix="portal-tests-"))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
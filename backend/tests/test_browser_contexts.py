@@ -0,0 +1,63 @@
+import pytest
+
+from app.services import browser_contexts
+from app.services.browser_contexts import BrowserContextPool
+from app.services.memory_governor import MemoryGovernor
+
+
+class FakeHost:
+    window_handles = ["host"]
+    capabilities = {"goog:chromeOptions": {"debuggerAddress": "127.0.0.1:9222"}}
+
+    def __init__(self):
+        self.contexts = set()
+
+    def execute_script(self, script):
+        return 1
+
+    def execute_cdp_cmd(self, cmd, params):
+        if cmd == "Target.createBrowserContext":
+            self.contexts.add("ctx-1")
+            return {"browserContextId": "ctx-1"}
+        if cmd == "Target.createTarget":
+            return {"targetId": "tab-1"}
+        if cmd == "Target.disposeBrowserContext":
+            self.contexts.discard(params["browserContextId"])
+        return {}
+
+
+class BrokenSwitch:
+    def window(self, handle):
+        raise RuntimeError("no such window")
+
+
+class AttachedDriver:
+    """ChromeDriver session whose tab disappears before it is set up"""
+
+    def __init__(self):
+        self.switch_to = BrokenSwitch()
+        self.quit_calls = 0
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+def test_failed_attach_quits_the_chromedriver(monkeypatch):
+    governor = MemoryGovernor(driver_max_mb=0, pressure_percent=0, shm_max_percent=0,
+                              checkout_wait=0, sample_interval=60)
+    monkeypatch.setattr(browser_contexts, "get_memory_governor", lambda: governor)
+    attached = AttachedDriver()
+    monkeypatch.setattr(browser_contexts, "create_chrome_driver", lambda options: attached)
+
+    pool = BrowserContextPool(max_contexts=1, checkout_timeout=1)
+    host = pool._host = FakeHost()
+
+    with pytest.raises(RuntimeError):
+        pool.checkout()
+
+    assert attached.quit_calls == 1
+    assert host.contexts == set()
+    # The slot came back: a second attempt gets as far as attaching again
+    with pytest.raises(RuntimeError):
+        pool.checkout(timeout=0.1)
+    assert attached.quit_calls == 2
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+from app.services import bulk_submission, rpa_queue
+from app.services.bulk_submission import parse_applications, validate_rows
+
+
+@pytest.fixture(autouse=True)
+def demo_mode(monkeypatch):
+    # demo_http_recipe (gujarat-gas -> demo-gas) only counts in DEMO mode
+    monkeypatch.setattr(rpa_queue.settings, "RPA_MODE", "DEMO")
+
+
+TORRENT = {"service_number": "12345", "t_number": "T1", "mobile": "9876543210", "email": "a@example.com"}
+GAS = {"consumer_number": "GG1", "name": "Asha Patel", "mobile": "+91 98765-43210"}
+
+
+def ndjson(*records):
+    return "\n".join(json.dumps(record) for record in records).encode()
+
+
+# parse_applications
+
+def test_parse_csv_uses_line_numbers_and_strips_values():
+    body = (
+        "\ufeffsupplier,service_number,t_number,mobile,email\n"
+        "Torrent-Power , 12345 ,T1,9876543210,a@example.com\n"
+        "gujarat-gas,,,9876543210,\n"
+    ).encode()
+
+    rows = parse_applications(body, "text/csv")
+
+    assert [row.row for row in rows] == [2, 3]
+    assert rows[0].supplier == "torrent-power"
+    assert rows[0].data == TORRENT
+    # Empty cells are dropped rather than submitted as blanks
+    assert rows[1].data == {"mobile": "9876543210"}
+    assert not rows[0].errors and not rows[1].errors
+
+
+def test_parse_ndjson_reports_bad_lines_without_dropping_the_rest():
+    body = b'{"supplier_id": "gujarat-gas", "consumer_number": "GG1"}\n\n{not json\n[1, 2]\n'
+
+    rows = parse_applications(body, "application/x-ndjson")
+
+    assert [row.row for row in rows] == [1, 3, 4]
+    assert rows[0].supplier == "gujarat-gas"
+    assert rows[0].data == {"consumer_number": "GG1"}
+    assert rows[1].errors[0].startswith("Invalid JSON")
+    assert rows[2].errors == ["Row is not an object"]
+
+
+def test_parse_sniffs_format_without_content_type():
+    assert parse_applications(ndjson({"supplier": "torrent-power", **TORRENT}))[0].data == TORRENT
+    rows = parse_applications(b"target_website,mobile\ntorrent-power,9876543210\n")
+    assert rows[0].supplier == "torrent-power"
+    assert rows[0].data == {"mobile": "9876543210"}
+
+
+def test_parse_removes_every_supplier_column_from_the_data():
+    rows = parse_applications(ndjson({"supplier": "gujarat-gas", "target_website": "x", "mobile": "9876543210"}))
+    assert rows[0].supplier == "gujarat-gas"
+    assert rows[0].data == {"mobile": "9876543210"}
+
+
+# validate_rows
+
+def test_validate_groups_valid_rows_by_supplier():
+    rows = parse_applications(ndjson(
+        {"supplier": "torrent-power", **TORRENT},
+        {"supplier": "gujarat-gas", **GAS},
+        {"supplier": "torrent-power", **TORRENT, "service_number": "67890"},
+    ))
+
+    groups = validate_rows(rows)
+
+    assert {supplier: [row.row for row in group] for supplier, group in groups.items()} == {
+        "torrent-power": [1, 3],
+        "gujarat-gas": [2],
+    }
+    assert all(not row.errors for row in rows)
+
+
+def test_validate_reports_every_problem_on_its_row():
+    rows = parse_applications(ndjson(
+        {"service_number": "1"},
+        {"supplier": "nope", "mobile": "9876543210"},
+        {"supplier": "torrent-power", "service_number": "1", "mobile": "12", "email": "nobody"},
+        {"supplier": "gujarat-gas", "mobile": "9876543210"},
+    ))
+
+    groups = validate_rows(rows)
+
+    assert groups == {}
+    assert rows[0].errors == ["Missing supplier"]
+    assert rows[1].errors == ["No automated submission for supplier 'nope'"]
+    assert rows[2].errors == ["Missing t_number", "Invalid mobile number", "Invalid email address"]
+    # Required fields come from the HTTP recipe, with its accepted source keys; defaulted ones are skipped
+    assert rows[3].errors == ["Missing consumer_number", "Missing new_name or applicant_name or name"]
+
+
+def test_validate_skips_rows_that_failed_to_parse():
+    rows = parse_applications(b'{"supplier": "torrent-power"\n', "application/json")
+    assert validate_rows(rows) == {}
+    assert len(rows[0].errors) == 1
+
+
+def test_validate_looks_up_each_supplier_once(monkeypatch):
+    calls = []
+    lookup = bulk_submission._required_fields
+    monkeypatch.setattr(bulk_submission, "_required_fields", lambda supplier: calls.append(supplier) or lookup(supplier))
+
+    validate_rows(parse_applications(ndjson(*[{"supplier": "gujarat-gas", **GAS}] * 5)))
+
+    assert calls == ["gujarat-gas"]
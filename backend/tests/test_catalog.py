@@ -0,0 +1,100 @@
+import os
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.data import catalog
+from app.data.catalog import ServiceCatalog
+from app.routers import services_data
+
+DATA = {
+    "gas": [{"id": "gujarat-gas", "name": "Gujarat Gas Ltd", "automation_type": "direct_form"}],
+    "water": [{"id": "amc-water", "name": "AMC Water"}],
+}
+
+
+def write(path, data, mtime):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "services_data.json"
+    write(path, DATA, 1_000_000)
+    return path
+
+
+@pytest.fixture
+def client(monkeypatch, data_file):
+    monkeypatch.setattr(catalog, "_catalog", ServiceCatalog(str(data_file), check_interval=0))
+    app = FastAPI()
+    app.include_router(services_data.router)
+    return TestClient(app)
+
+
+def test_indexes_are_built_per_snapshot(data_file):
+    service_catalog = ServiceCatalog(str(data_file))
+
+    assert service_catalog.get_supplier("gujarat-gas") == (DATA["gas"][0], "gas")
+    assert service_catalog.get_supplier_by_name("AMC WATER")[1] == "water"
+    assert service_catalog.get_supplier("nope") == (None, None)
+    assert [s["id"] for s in service_catalog.get_by_automation_type("manual_only")] == ["amc-water"]
+
+
+def test_render_builds_once_per_version(data_file):
+    service_catalog = ServiceCatalog(str(data_file), check_interval=0)
+    builds = []
+
+    def builder(snapshot):
+        builds.append(snapshot.version)
+        return {"count": len(snapshot.suppliers)}
+
+    body, etag = service_catalog.snapshot().render("count", builder)
+    assert service_catalog.snapshot().render("count", builder) == (body, etag)
+    assert builds == [1]
+    assert json.loads(body) == {"count": 2}
+
+    write(data_file, {"gas": DATA["gas"]}, 2_000_000)
+    body, new_etag = service_catalog.snapshot().render("count", builder)
+    assert builds == [1, 2]
+    assert json.loads(body) == {"count": 1}
+    assert new_etag != etag
+
+
+def test_reload_failure_keeps_last_good_version(data_file):
+    service_catalog = ServiceCatalog(str(data_file), check_interval=0)
+    data_file.write_text("{broken", encoding="utf-8")
+    os.utime(data_file, (2_000_000, 2_000_000))
+
+    assert service_catalog.version == 1
+    assert service_catalog.get_supplier("gujarat-gas")[0] is not None
+
+
+def test_etag_revalidation_answers_304(client):
+    response = client.get("/api/services/data")
+    assert response.status_code == 200
+    assert response.json() == DATA
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == catalog.CACHE_CONTROL
+
+    for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        cached = client.get("/api/services/data", headers={"If-None-Match": header})
+        assert cached.status_code == 304, header
+        assert cached.content == b""
+        assert cached.headers["etag"] == etag
+
+    assert client.get("/api/services/data", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_changed_catalog_invalidates_the_etag(client, data_file):
+    etag = client.get("/api/services/data").headers["etag"]
+    write(data_file, {"gas": DATA["gas"]}, 2_000_000)
+
+    response = client.get("/api/services/data", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json() == {"gas": DATA["gas"]}
+    assert response.headers["etag"] != etag
@@ -0,0 +1,123 @@
+from urllib.parse import urlsplit
+
+import pytest
+
+from app.services import driver_pool
+from app.services.driver_pool import ChromeDriverPool
+from app.services.memory_governor import MemoryGovernor
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def window(self, handle):
+        self._driver.current = handle
+
+
+class FakeBrowser:
+    """Just enough of a Chrome driver to hold cookies and storage across tabs"""
+
+    def __init__(self):
+        self.tabs = {"main": ["about:blank"]}
+        self.current = "main"
+        self.cookies = []
+        self.storage = {}
+        self.switch_to = FakeSwitchTo(self)
+
+    # What a job does
+    def visit(self, url, storage=None, cookie_domain=None, tab=None):
+        tab = tab or self.current
+        self.tabs.setdefault(tab, []).append(url)
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        if storage:
+            self.storage.setdefault(origin, {}).update(storage)
+        self.cookies.append({"name": "session", "domain": cookie_domain or parts.hostname})
+
+    # WebDriver surface used by the pool
+    @property
+    def window_handles(self):
+        return list(self.tabs)
+
+    @property
+    def current_url(self):
+        return self.tabs[self.current][-1]
+
+    def close(self):
+        del self.tabs[self.current]
+
+    def delete_all_cookies(self):
+        # WebDriver only reaches the cookies of the page it is on
+        host = urlsplit(self.current_url).hostname
+        self.cookies = [cookie for cookie in self.cookies if cookie["domain"].lstrip(".") != host]
+
+    def get(self, url):
+        self.tabs[self.current].append(url)
+
+    def execute_script(self, script):
+        return 1
+
+    def execute_cdp_cmd(self, cmd, params):
+        if cmd == "Page.getNavigationHistory":
+            return {"entries": [{"url": url} for url in self.tabs[self.current]]}
+        if cmd == "Page.resetNavigationHistory":
+            self.tabs[self.current] = self.tabs[self.current][-1:]
+        elif cmd == "Network.getAllCookies":
+            return {"cookies": list(self.cookies)}
+        elif cmd == "Network.clearBrowserCookies":
+            self.cookies = []
+        elif cmd == "Storage.clearDataForOrigin":
+            assert params["storageTypes"] == "all"
+            self.storage.pop(params["origin"], None)
+        return {}
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # No memory limits: the driver must come back because it was reset, not recycled
+    governor = MemoryGovernor(driver_max_mb=0, pressure_percent=0, shm_max_percent=0,
+                              checkout_wait=0, sample_interval=60)
+    monkeypatch.setattr(driver_pool, "get_memory_governor", lambda: governor)
+    browser = FakeBrowser()
+    pool = ChromeDriverPool(size=1, max_uses=10, checkout_timeout=1)
+    monkeypatch.setattr(pool, "_launch", lambda: browser)
+    return pool
+
+
+def test_checked_in_driver_comes_back_without_cookies_or_storage(pool):
+    driver = pool.checkout()
+    # Portal page, an SSO cookie on another host and a login popup with its own storage
+    driver.visit("https://portal.example/form", storage={"applicant": "A"})
+    driver.visit("https://portal.example/dashboard", cookie_domain=".sso.example")
+    driver.visit("https://login.example/otp", storage={"token": "secret"}, tab="popup")
+    driver.storage["https://sso.example"] = {"sso": "A"}
+    driver.current = "main"
+
+    pool.checkin(driver)
+    reused = pool.checkout()
+
+    assert reused is driver
+    assert reused.cookies == []
+    assert reused.storage == {}
+    assert reused.window_handles == ["main"]
+    assert reused.current_url == "about:blank"
+
+
+def test_failed_reset_quits_the_driver(pool, monkeypatch):
+    driver = pool.checkout()
+
+    def broken(cmd, params):
+        raise RuntimeError("target closed")
+
+    monkeypatch.setattr(driver, "execute_cdp_cmd", broken)
+    quit_calls = []
+    monkeypatch.setattr(driver, "quit", lambda: quit_calls.append(True))
+
+    pool.checkin(driver)
+
+    assert quit_calls == [True]
+    assert pool._idle.empty()
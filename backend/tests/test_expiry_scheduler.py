@@ -0,0 +1,107 @@
+import time
+import asyncio
+from datetime import datetime
+
+from app.services.expiry_scheduler import ExpiryScheduler
+
+
+def at(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp)
+
+
+def test_pops_due_keys_in_deadline_order():
+    scheduler = ExpiryScheduler(lambda keys: len(keys))
+    for key, deadline in (("c", 300), ("a", 100), ("d", 400), ("b", 200)):
+        scheduler.schedule(key, at(deadline))
+
+    assert scheduler._pop_due(50) == []
+    assert scheduler._pop_due(250) == ["a", "b"]
+    assert scheduler._pop_due(1000) == ["c", "d"]
+    assert scheduler._heap == []
+
+
+def test_rescheduled_and_cancelled_keys_are_skipped_lazily():
+    scheduler = ExpiryScheduler(lambda keys: len(keys))
+    scheduler.schedule("moved", at(100))
+    scheduler.schedule("cancelled", at(150))
+    scheduler.schedule("kept", at(200))
+    scheduler.schedule("moved", at(500))
+    scheduler.cancel("cancelled")
+
+    assert len(scheduler._heap) == 4
+    assert scheduler._pop_due(300) == ["kept"]
+    assert scheduler._pop_due(600) == ["moved"]
+    assert scheduler._deadlines == {}
+
+
+def test_next_delay_ignores_superseded_entries():
+    scheduler = ExpiryScheduler(lambda keys: len(keys), max_sleep=60)
+    assert scheduler._next_delay(0) == 60
+
+    scheduler.schedule("key", at(1010))
+    scheduler.schedule("key", at(1030))
+    assert scheduler._next_delay(1000) == 30
+    assert len(scheduler._heap) == 1
+
+    # Overdue deadlines mean no sleep; far ones are capped at max_sleep
+    assert scheduler._next_delay(2000) == 0
+    assert scheduler._next_delay(0) == 60
+
+
+def test_metrics_report_live_backlog():
+    scheduler = ExpiryScheduler(lambda keys: len(keys))
+    scheduler.schedule("a", at(time.time() + 100))
+    scheduler.schedule("a", at(time.time() + 200))
+    scheduler.schedule("b", at(time.time() + 300))
+
+    metrics = scheduler.metrics()
+
+    assert metrics["backlog"] == 2
+    assert metrics["heap_size"] == 2
+    assert 150 < metrics["next_expiry_in_seconds"] <= 200
+    assert metrics["running"] is False
+
+
+def test_run_evicts_at_deadline_and_wakes_for_earlier_ones():
+    evicted = []
+
+    async def scenario():
+        scheduler = ExpiryScheduler(lambda keys: evicted.extend(keys) or len(keys), max_sleep=30)
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.05)
+        # Scheduled while the loop sleeps its full max_sleep; must cut that short
+        scheduler.schedule("soon", at(time.time() + 0.1))
+        scheduler.schedule("later", at(time.time() + 60))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+
+    assert evicted == ["soon"]
+    assert scheduler.evicted_count == 1
+    assert scheduler.metrics()["backlog"] == 1
+
+
+def test_failed_eviction_is_retried():
+    calls = []
+
+    def evict(keys):
+        calls.append(list(keys))
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return len(keys)
+
+    async def scenario():
+        scheduler = ExpiryScheduler(evict, retry_delay=0.1)
+        scheduler.schedule("key", at(time.time() - 1))
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.5)
+        task.cancel()
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+
+    assert calls == [["key"], ["key"]]
+    assert scheduler.evicted_count == 1
+    assert scheduler.last_error is None
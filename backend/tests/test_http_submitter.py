@@ -0,0 +1,152 @@
+from urllib.parse import parse_qs
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import demo_government_simple
+from app.services import http_submitter
+from app.services.http_submitter import FormParser, NeedsBrowser, build_payload, submit_http
+
+APPLICATION = {"consumer_number": "CN123", "name": "Asha Patel", "mobile": "9876543210", "city": "surat"}
+
+
+def parse(html):
+    parser = FormParser()
+    parser.feed(html)
+    return parser
+
+
+@pytest.fixture
+def portal(monkeypatch):
+    """The demo government portal in-process, recording every form the client posts"""
+    monkeypatch.setattr(http_submitter.settings, "RPA_MODE", "DEMO")
+    monkeypatch.setattr(http_submitter.settings, "DEMO_BASE_URL", "http://testserver/demo-govt")
+    app = FastAPI()
+    app.include_router(demo_government_simple.router)
+    client = TestClient(app)
+    client.posted = []
+
+    def record(request):
+        if request.method == "POST":
+            client.posted.append(parse_qs(request.content.decode(), keep_blank_values=True))
+
+    client.event_hooks["request"].append(record)
+    return client
+
+
+# FormParser
+
+def test_parses_the_demo_electricity_form():
+    parser = parse(demo_government_simple.get_electricity_form("torrent-power"))
+
+    form, = parser.forms
+    assert form["id"] == "applicationForm"
+    assert form["action"] == "/demo-govt/torrent-power/submit"
+    assert form["method"] == "post"
+    fields = {field["name"]: field for field in form["fields"]}
+    assert list(fields) == ["city", "consumerNumber", "applicantName", "mobile", "email", "address"]
+    assert fields["city"]["type"] == "select"
+    assert fields["city"]["value"] == ""
+    assert [option["value"] for option in fields["city"]["options"]][:3] == ["", "Ahmedabad", "Gandhinagar"]
+    assert fields["mobile"]["required"] and not fields["email"]["required"]
+
+
+def test_parses_hidden_checked_selected_and_csrf_values():
+    parser = parse("""
+        <meta name="CSRF-Token" content="tok123">
+        <input name="outside" value="ignored">
+        <form action="/go" id="f">
+          <input type="hidden" name="state" value="abc">
+          <input type="checkbox" name="agree" value="yes" checked>
+          <input type="checkbox" name="news" value="yes">
+          <select name="zone"><option>North</option><option selected>South </option></select>
+          <textarea name="note">hello</textarea>
+        </form>
+    """)
+
+    assert parser.meta == {"csrf-token": "tok123"}
+    form, = parser.forms
+    assert form["method"] == "get"
+    assert {field["name"]: field["value"] for field in form["fields"]} == {
+        "state": "abc", "agree": "yes", "news": None, "zone": "South", "note": "hello",
+    }
+
+
+# build_payload
+
+PLAN = {"fields": {"city": ["city"], "consumerNumber": ["consumer_number"], "applicantName": ["name"],
+                   "mobile": ["mobile"]},
+        "defaults": {"city": "Ahmedabad"}}
+
+
+def test_payload_overlays_mapped_values_and_matches_options():
+    form, = parse(demo_government_simple.get_electricity_form("torrent-power")).forms
+
+    payload = build_payload(form, PLAN, APPLICATION)
+
+    assert payload["city"] == "Surat"
+    assert payload["consumerNumber"] == "CN123"
+    assert build_payload(form, PLAN, {**APPLICATION, "city": ""})["city"] == "Ahmedabad"
+
+
+def test_payload_errors():
+    form, = parse(demo_government_simple.get_electricity_form("torrent-power")).forms
+
+    with pytest.raises(ValueError, match="No 'city' option"):
+        build_payload(form, PLAN, {**APPLICATION, "city": "Mumbai"})
+    with pytest.raises(ValueError, match="applicantName"):
+        build_payload(form, PLAN, {**APPLICATION, "name": ""})
+
+    captcha, = parse('<form><input name="captcha_code" required></form>').forms
+    with pytest.raises(NeedsBrowser):
+        build_payload(captcha, PLAN, APPLICATION)
+
+
+# submit_http
+
+def test_submits_the_demo_form(portal):
+    result = submit_http("demo-electricity", APPLICATION, "torrent-power", client=portal)
+
+    assert result["success"] is True
+    assert result["demo"] is True
+    assert result["confirmation_number"].startswith("APP")
+    assert result["fields_submitted"] == ["address", "applicantName", "city", "consumerNumber", "email", "mobile"]
+    # Untouched optional inputs go out empty, as a browser would send them
+    assert portal.posted == [{"city": ["Surat"], "consumerNumber": ["CN123"], "applicantName": ["Asha Patel"],
+                              "mobile": ["9876543210"], "email": [""], "address": [""]}]
+
+
+def test_client_is_reused_across_suppliers(portal):
+    gas = {**APPLICATION, "bp_number": "BP9"}
+    for supplier in ("gujarat-gas", "adani-gas"):
+        assert submit_http("demo-gas", gas, supplier, client=portal)["success"]
+
+    assert len(portal.posted) == 2
+    assert not portal.is_closed
+
+
+def test_invalid_data_fails_without_posting(portal):
+    result = submit_http("demo-electricity", {**APPLICATION, "mobile": ""}, "torrent-power", client=portal)
+
+    assert result["success"] is False
+    assert result["fallback"] is False
+    assert "mobile" in result["error"]
+    assert portal.posted == []
+
+
+def test_demo_recipe_refused_outside_demo_mode(portal, monkeypatch):
+    monkeypatch.setattr(http_submitter.settings, "RPA_MODE", "PRODUCTION")
+
+    result = submit_http("demo-electricity", APPLICATION, "torrent-power", client=portal)
+
+    assert result["success"] is False
+    assert "demo portal" in result["error"]
+    assert portal.posted == []
+
+
+def test_recipe_without_http_plan_falls_back_to_browser():
+    result = submit_http("torrent-power", APPLICATION, "torrent-power")
+
+    assert result == {"success": False, "fallback": True, "engine": "http",
+                      "error": "torrent-power has no HTTP plan"}
@@ -0,0 +1,94 @@
+import pytest
+
+from app.database import Base, engine
+from app.services import login_assisted_service as service_module
+from app.services.login_assisted_service import LoginAssistedService
+from app.services.session_vault import SessionVault
+
+
+class FakePool:
+    def __init__(self):
+        self.out = set()
+
+    def checkout(self):
+        driver = object()
+        self.out.add(driver)
+        return driver
+
+    def checkin(self, driver, discard=False):
+        self.out.remove(driver)
+
+
+class FakeSessions:
+    def __init__(self):
+        self.detached = []
+
+    def detach(self, driver, headless, portal, label=""):
+        self.detached.append((driver, portal))
+        return "review-1"
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    Base.metadata.create_all(bind=engine)
+    pool = FakePool()
+    monkeypatch.setattr(service_module, "get_rpa_browser", lambda headless=True: pool)
+    return pool
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    sessions = FakeSessions()
+    monkeypatch.setattr(service_module, "get_browser_sessions", lambda: sessions)
+    return sessions
+
+
+def test_failed_flow_gives_the_driver_back(pool, sessions):
+    def flow(job):
+        job.setup_driver()
+        raise TimeoutError("login page did not load")
+
+    result = LoginAssistedService._run("adani-gas", {}, flow)
+
+    assert result["success"] is False
+    assert pool.out == set()
+    assert sessions.detached == []
+
+
+def test_filled_form_is_left_open_as_a_review_session(pool, sessions):
+    def flow(job):
+        job.setup_driver()
+        return {"success": True}
+
+    result = LoginAssistedService._run("pgvcl", {}, flow)
+
+    assert result["browser_session_id"] == "review-1"
+    [(driver, portal)] = sessions.detached
+    assert portal == "pgvcl"
+    # The registry owns the browser now; it is checked in when the review ends
+    assert pool.out == {driver}
+
+
+def test_concurrent_flows_do_not_share_a_browser(pool, sessions):
+    drivers = []
+
+    def flow(job):
+        drivers.append(job.setup_driver())
+        if len(drivers) == 1:
+            # A second request arrives while the first is still waiting for login
+            LoginAssistedService._run("adani-gas", {}, flow)
+        return {"success": False, "error": "Login timeout or failed"}
+
+    LoginAssistedService._run("pgvcl", {}, flow)
+
+    assert len(drivers) == 2 and drivers[0] is not drivers[1]
+    assert pool.out == set()
+
+
+def test_saved_login_is_only_restored_for_its_own_portal(tmp_path):
+    vault = SessionVault(str(tmp_path / "vault.db"), ttl_hours=1, secret="test-secret")
+    vault.store("7", "pgvcl", {"cookies": [], "url": "https://portal.example/home"})
+
+    assert vault.load("7", "pgvcl")["url"] == "https://portal.example/home"
+    assert vault.load("7", "adani-gas") is None
+    assert vault.load("8", "pgvcl") is None
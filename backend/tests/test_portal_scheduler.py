@@ -0,0 +1,176 @@
+import types
+
+import pytest
+
+from app.services import portal_scheduler
+from app.services.portal_scheduler import CircuitBreaker, PortalScheduler, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(portal_scheduler, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    for name, value in {
+        "RPA_PORTAL_MAX_IN_FLIGHT": 2,
+        "RPA_PORTAL_RATE_PER_MINUTE": 60,
+        "RPA_PORTAL_BURST": 3,
+        "RPA_BREAKER_FAILURE_THRESHOLD": 2,
+        "RPA_BREAKER_RESET_SECONDS": 30,
+    }.items():
+        monkeypatch.setattr(portal_scheduler.settings, name, value)
+
+
+# TokenBucket
+
+def test_bucket_allows_a_burst_then_waits_for_refill(clock):
+    bucket = TokenBucket(rate_per_minute=30, burst=2)
+
+    assert bucket.try_take() == 0
+    assert bucket.try_take() == 0
+    assert bucket.try_take() == pytest.approx(2.0)  # One token every 2s
+
+    clock.advance(2)
+    assert bucket.try_take() == 0
+
+
+def test_bucket_never_fills_past_capacity(clock):
+    bucket = TokenBucket(rate_per_minute=60, burst=2)
+    clock.advance(3600)
+    bucket.refund()
+
+    assert [bucket.try_take() for _ in range(3)][:2] == [0, 0]
+    assert bucket.tokens < 1
+
+
+def test_bucket_without_rate_retries_later(clock):
+    bucket = TokenBucket(rate_per_minute=0, burst=1)
+    bucket.try_take()
+
+    assert bucket.try_take() == portal_scheduler.IN_FLIGHT_RETRY_SECONDS
+
+
+# CircuitBreaker
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60)
+    breaker.record(False)
+    breaker.record(True)  # A success resets the count
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.state == "closed"
+
+    breaker.record(False)
+    assert breaker.state == "open"
+    assert breaker.open_for() == pytest.approx(60)
+    assert breaker.allow() == pytest.approx(60)
+
+
+def test_breaker_lets_one_probe_through_after_reset(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+    breaker.record(False)
+    clock.advance(60)
+
+    assert breaker.allow() == 0
+    assert breaker.state == "half_open"
+    # Only one probe at a time
+    assert breaker.allow() == portal_scheduler.IN_FLIGHT_RETRY_SECONDS
+
+    breaker.record(True)
+    assert breaker.state == "closed"
+    assert breaker.allow() == 0
+
+
+def test_failed_probe_reopens_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_seconds=60)
+    for _ in range(5):
+        breaker.record(False)
+    clock.advance(60)
+    breaker.allow()
+
+    breaker.record(False)
+
+    assert breaker.state == "open"
+    assert breaker.open_for() == pytest.approx(60)
+
+
+# PortalScheduler.admit
+
+def test_admit_enforces_the_in_flight_limit(clock, limits):
+    scheduler = PortalScheduler()
+
+    assert scheduler.admit("test-portal").admitted
+    assert scheduler.admit("test-portal").admitted
+    held = scheduler.admit("test-portal")
+    assert (held.admitted, held.reason) == (False, "in_flight_limit")
+
+    # Other portals have their own gate
+    assert scheduler.admit("other-portal").admitted
+
+    scheduler.release("test-portal", success=True)
+    assert scheduler.admit("test-portal").admitted
+
+
+def test_admit_rate_limits_after_the_burst(clock, limits):
+    scheduler = PortalScheduler()
+    for _ in range(3):
+        assert scheduler.admit("test-portal").admitted
+        scheduler.release("test-portal", success=True)
+
+    limited = scheduler.admit("test-portal")
+    assert (limited.admitted, limited.reason) == (False, "rate_limited")
+    assert limited.retry_after == pytest.approx(1.0)
+
+    clock.advance(1)
+    assert scheduler.admit("test-portal").admitted
+
+
+def test_admit_fails_fast_while_the_circuit_is_open(clock, limits):
+    scheduler = PortalScheduler()
+    for _ in range(2):
+        scheduler.admit("test-portal")
+        scheduler.release("test-portal", success=False)
+
+    held = scheduler.admit("test-portal")
+    assert (held.admitted, held.reason) == (False, "circuit_open")
+    assert held.retry_after == pytest.approx(30)
+    assert scheduler.stats()["test-portal"]["breaker"] == "open"
+
+    clock.advance(30)
+    probe = scheduler.admit("test-portal")
+    assert probe.admitted
+    # The probe holds the half-open breaker; a second job waits for its outcome
+    second = scheduler.admit("test-portal")
+    assert (second.admitted, second.reason) == (False, "circuit_open")
+
+    scheduler.release("test-portal", success=True)
+    assert scheduler.stats()["test-portal"]["breaker"] == "closed"
+
+
+def test_catalog_limits_override_the_defaults(clock, limits, monkeypatch):
+    class Catalog:
+        @staticmethod
+        def get_supplier(portal):
+            return {"id": portal, "rpa_limits": {"max_in_flight": 1}}, "electricity"
+
+    monkeypatch.setattr(portal_scheduler, "get_catalog", lambda: Catalog)
+    scheduler = PortalScheduler()
+
+    assert scheduler.max_in_flight("pgvcl") == 1
+    assert scheduler.admit("pgvcl").admitted
+    assert scheduler.admit("pgvcl").reason == "in_flight_limit"
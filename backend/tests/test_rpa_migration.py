@@ -0,0 +1,56 @@
+from sqlalchemy import inspect, text
+
+from app.database import Base, SessionLocal, engine
+from app.models import RPASubmission, RPASubmissionStatus
+from app.services.rpa_queue import RPAJobQueue, migrate_rpa_submissions
+
+# rpa_submissions as released before anonymous jobs and leases
+OLD_SCHEMA = """
+CREATE TABLE rpa_submissions (
+    id INTEGER NOT NULL PRIMARY KEY,
+    application_id INTEGER NOT NULL REFERENCES applications (id),
+    target_website VARCHAR(255),
+    target_url VARCHAR(500),
+    status VARCHAR(10),
+    submission_data JSON,
+    response_data JSON,
+    confirmation_number VARCHAR(100),
+    error_message TEXT,
+    retry_count INTEGER,
+    max_retries INTEGER,
+    started_at DATETIME,
+    completed_at DATETIME,
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+)
+"""
+
+
+def test_old_table_is_rebuilt_for_anonymous_jobs():
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE rpa_submissions"))
+        conn.execute(text(OLD_SCHEMA))
+        conn.execute(text("CREATE INDEX ix_rpa_submissions_id ON rpa_submissions (id)"))
+        conn.execute(text(
+            "INSERT INTO rpa_submissions (id, application_id, target_website, status, retry_count, max_retries) "
+            "VALUES (7, 3, 'torrent-power', 'SUCCESS', 0, 3)"
+        ))
+
+    migrate_rpa_submissions()
+    migrate_rpa_submissions()  # Runs on every start
+
+    columns = {column["name"]: column for column in inspect(engine).get_columns("rpa_submissions")}
+    assert columns["application_id"]["nullable"]
+    assert {"available_at", "lease_owner", "lease_expires_at"} <= set(columns)
+
+    db = SessionLocal()
+    try:
+        old = db.query(RPASubmission).filter(RPASubmission.id == 7).one()
+        assert (old.application_id, old.status) == (3, RPASubmissionStatus.SUCCESS)
+
+        queue = RPAJobQueue(workers=1, retry_backoff=1, inline=False)
+        job = queue.enqueue(db, "torrent-power", {"service_number": "1"})
+        assert job.application_id is None
+        assert job.id == 8
+    finally:
+        db.close()
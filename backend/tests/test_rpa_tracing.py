@@ -0,0 +1,107 @@
+import pytest
+
+from app.services.rpa_tracing import Histogram, add_span, aggregate_traces, current_tracer, span, trace_run
+
+
+# Histogram
+
+def test_quantile_returns_bucket_upper_bound():
+    histogram = Histogram()
+    for value in (5, 20, 20, 300):
+        histogram.record(value)
+
+    # Two of four samples are at or under 25ms
+    assert histogram.quantile(0.5) == 25
+    # The bucket bound (500) is capped at the largest sample seen
+    assert histogram.quantile(0.95) == 300
+    assert histogram.quantile(0) == 10
+
+
+def test_quantile_of_open_ended_bucket_is_the_max():
+    histogram = Histogram()
+    histogram.record(5)
+    histogram.record(90000.04)
+
+    assert histogram.quantile(0.99) == 90000.0
+    assert histogram.summary()["buckets"]["inf"] == 1
+
+
+def test_sample_on_a_bound_lands_in_that_bucket():
+    histogram = Histogram()
+    histogram.record(100)
+
+    assert histogram.summary()["buckets"]["le_100"] == 1
+    assert histogram.quantile(0.5) == 100
+
+
+def test_empty_histogram_summary():
+    summary = Histogram().summary()
+
+    assert summary["count"] == 0
+    assert summary["mean_ms"] == 0
+    assert summary["p50_ms"] == 0
+    assert sum(summary["buckets"].values()) == 0
+
+
+# aggregate_traces
+
+def test_aggregate_groups_by_portal_span_and_field():
+    traces = [
+        {"portal": "torrent-power", "total_ms": 1200, "spans": [
+            {"name": "page.load", "duration_ms": 800},
+            {"name": "field.fill", "field": "mobile", "duration_ms": 40},
+            {"name": "field.fill", "field": "email", "duration_ms": 30},
+            {"name": "unfinished"},
+        ]},
+        {"portal": "torrent-power", "total_ms": 2000, "spans": [
+            {"name": "page.load", "duration_ms": 1500},
+            {"name": "field.fill", "field": "mobile", "duration_ms": 60},
+        ]},
+        {"total_ms": 5, "spans": []},
+    ]
+
+    stats = aggregate_traces(traces)
+
+    assert set(stats) == {"torrent-power", "unknown"}
+    torrent = stats["torrent-power"]
+    assert list(torrent) == ["field.fill:email", "field.fill:mobile", "page.load", "total"]
+    assert torrent["total"]["count"] == 2
+    assert torrent["total"]["mean_ms"] == 1600
+    assert torrent["page.load"]["max_ms"] == 1500
+    assert torrent["field.fill:mobile"]["count"] == 2
+    assert stats["unknown"]["total"]["count"] == 1
+
+
+def test_aggregate_of_nothing_is_empty():
+    assert aggregate_traces([]) == {}
+
+
+# trace_run / span
+
+def test_spans_nest_and_record_errors():
+    with trace_run("torrent-power") as tracer:
+        with span("open", url="x"):
+            with span("wait"):
+                pass
+        with pytest.raises(ValueError):
+            with span("fill"):
+                raise ValueError("boom")
+        add_span("field.fill", 12.34, field="mobile")
+
+    assert current_tracer() is None
+    trace = tracer.export()
+    assert trace["portal"] == "torrent-power"
+    assert [(entry["name"], entry["depth"]) for entry in trace["spans"]] == [
+        ("open", 0), ("wait", 1), ("fill", 0), ("field.fill", 0),
+    ]
+    assert trace["spans"][0]["url"] == "x"
+    assert trace["spans"][2]["error"] == "ValueError"
+    assert trace["spans"][3]["duration_ms"] == 12.3
+    assert all("duration_ms" in entry for entry in trace["spans"])
+
+
+def test_span_outside_a_run_is_a_no_op():
+    with span("orphan") as entry:
+        assert entry == {}
+    add_span("orphan", 1)
+    assert current_tracer() is None
@@ -0,0 +1,69 @@
+import pytest
+
+from app.data.search_index import SupplierSearchIndex, tokenize
+
+SUPPLIERS = [
+    {"id": "torrent-power", "name": "Torrent Power Ltd", "category": "electricity", "type": "private",
+     "automation_type": "direct_form", "name_change_facility": "Yes (online form)"},
+    {"id": "gujarat-gas", "name": "Gujarat Gas Ltd", "aliases": ["ગુજરાત ગેસ", "GGL"], "category": "gas",
+     "type": "government", "automation_type": "direct_form"},
+    {"id": "amc-water", "name": "Ahmedabad Municipal Corporation", "category": "water", "type": "government",
+     "automation_type": "login_assisted", "name_change_facility": "Yes (online form via AMC portal)"},
+    {"id": "adani-gas", "name": "Adani Total Gas", "category": "gas", "type": "private",
+     "automation_type": "direct_form"},
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return SupplierSearchIndex(SUPPLIERS)
+
+
+def ids(result):
+    return [supplier["id"] for supplier in result["results"]]
+
+
+def test_tokenize_keeps_indic_words_whole_and_drops_stopwords():
+    assert tokenize("Gujarat Gas Ltd") == ["gujarat", "gas"]
+    assert tokenize("ગુજરાત ગેસ") == ["ગુજરાત", "ગેસ"]
+    assert tokenize("Yes (via the portal)") == ["portal"]
+
+
+def test_exact_name_hit_ranks_first(index):
+    result = index.search("gujarat gas")
+
+    assert ids(result)[0] == "gujarat-gas"
+    # Adani matches only "gas", so it ranks after a supplier matching both tokens
+    assert ids(result) == ["gujarat-gas", "adani-gas"]
+    assert result["results"][0]["score"] > result["results"][1]["score"]
+
+
+def test_prefix_and_joined_id_matches(index):
+    assert ids(index.search("torr")) == ["torrent-power"]
+    assert ids(index.search("torrentpower")) == ["torrent-power"]
+
+
+def test_fuzzy_match_tolerates_typos(index):
+    assert ids(index.search("ahmedbad")) == ["amc-water"]
+    assert ids(index.search("zzzzzz")) == []
+
+
+def test_vernacular_aliases_and_category_names(index):
+    assert ids(index.search("ગુજરાત ગેસ"))[0] == "gujarat-gas"
+    assert ids(index.search("पानी")) == ["amc-water"]
+    assert ids(index.search("light")) == ["torrent-power"]
+
+
+def test_category_filter_and_pagination(index):
+    everything = index.search("gas")
+    assert everything["total"] == 2
+
+    assert ids(index.search("government", category="water")) == ["amc-water"]
+    page = index.search("gas", limit=1, offset=1)
+    assert page["total"] == 2
+    assert ids(page) == ids(everything)[1:]
+
+
+def test_empty_or_stopword_query_finds_nothing(index):
+    assert index.search("") == {"total": 0, "results": []}
+    assert index.search("the and of") == {"total": 0, "results": []}
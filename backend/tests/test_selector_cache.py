@@ -0,0 +1,37 @@
+import json
+import multiprocessing
+
+from app.services.selector_cache import SelectorCache
+
+
+def write_selectors(path, worker):
+    cache = SelectorCache(path)
+    for round_ in range(200):
+        # Big enough that writes take a while and overlap
+        cache.record("torrent-power", "fp-1", {f"field_{worker}_{n}": f"#f{worker}-{round_}" for n in range(200)})
+
+
+def test_record_and_lookup_roundtrip(tmp_path):
+    path = str(tmp_path / "selectors.json")
+    SelectorCache(path).record("torrent-power", "fp-1", {"mobile": "#mobile"})
+
+    cache = SelectorCache(path)
+    assert cache.lookup("torrent-power", "fp-1") == {"mobile": "#mobile"}
+    # A changed page drops the entry
+    assert cache.lookup("torrent-power", "fp-2") == {}
+    assert cache.get("torrent-power") is None
+
+
+def test_concurrent_processes_never_leave_a_torn_file(tmp_path):
+    path = str(tmp_path / "selectors.json")
+    workers = [multiprocessing.Process(target=write_selectors, args=(path, worker)) for worker in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert [worker.exitcode for worker in workers] == [0] * len(workers)
+
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    assert entries["torrent-power"]["fingerprint"] == "fp-1"
+    assert list(tmp_path.glob("*.tmp")) == []
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import user_data_service as service_module
+from app.services.user_data_service import UserDataService
+
+
+@pytest.fixture
+def service(tmp_path):
+    return UserDataService(data_dir=str(tmp_path))
+
+
+def last_used(service, user_key):
+    return service._conn.execute("SELECT last_used FROM user_data WHERE user_key = ?", (user_key,)).fetchone()[0]
+
+
+def test_reads_do_not_write_a_fresh_last_used(service, monkeypatch):
+    user_key = service.store_user_data("9999999999", {"name": "A"})
+    stored = last_used(service, user_key)
+
+    writes = []
+    service._conn.set_trace_callback(lambda sql: writes.append(sql) if sql.startswith("UPDATE") else None)
+    for _ in range(3):
+        assert service.retrieve_user_data(user_key)["form_data"] == {"name": "A"}
+
+    assert writes == []
+    assert last_used(service, user_key) == stored
+
+
+def test_stale_last_used_is_refreshed_on_read(service):
+    user_key = service.store_user_data("9999999999", {"name": "A"})
+    stale = (datetime.now() - service_module.LAST_USED_RESOLUTION - timedelta(minutes=1)).isoformat(timespec="microseconds")
+    with service._conn:
+        service._conn.execute("UPDATE user_data SET last_used = ? WHERE user_key = ?", (stale, user_key))
+
+    data = service.retrieve_user_data(user_key)
+
+    assert data["last_used"] > stale
+    assert last_used(service, user_key) == data["last_used"]
@@ -1,12 +1,46 @@
-import { useState } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { Bot, CheckCircle, AlertCircle, Play, ExternalLink } from 'lucide-react';
 import api from '../api/axios';
 
+// Queued jobs are polled until they finish, up to this long (retries back off between attempts)
+const JOB_POLL_INTERVAL_MS = 2000;
+const JOB_POLL_MAX_WAIT_MS = 10 * 60 * 1000;
+const JOB_POLL_MAX_FAILURES = 5; // Consecutive status checks that may fail before giving up
+
 const TorrentPowerAutomation = ({ userData, onComplete, onClose }) => {
   const [automationStatus, setAutomationStatus] = useState('idle'); // idle, running, completed, failed
   const [result, setResult] = useState(null);
   const [statusMessage, setStatusMessage] = useState('');
   const [processingSteps, setProcessingSteps] = useState([]);
+  // Browser the backend pre-navigates to the portal form while this form is open
+  const reservationRef = useRef(null);
+
+  useEffect(() => {
+    let active = true;
+    api.post('/torrent-automation/prenavigate')
+      .then(({ data }) => {
+        if (!data.success) {
+          console.log('⏭️ Pre-navigation skipped:', data.error);
+          return;
+        }
+        if (active) {
+          reservationRef.current = data.reservation_id;
+        } else {
+          // Closed before the reservation came back
+          api.delete(`/torrent-automation/prenavigate/${data.reservation_id}`).catch(() => {});
+        }
+      })
+      .catch((error) => console.warn('Pre-navigation unavailable:', error));
+
+    return () => {
+      active = false;
+      // Leaving without submitting: give the browser back instead of waiting for the TTL
+      if (reservationRef.current) {
+        api.delete(`/torrent-automation/prenavigate/${reservationRef.current}`).catch(() => {});
+        reservationRef.current = null;
+      }
+    };
+  }, []);
 
   const startAutomation = async () => {
     try {
@@ -24,7 +58,8 @@ const TorrentPowerAutomation = ({ userData, onComplete, onClose }) => {
         t_number: userData.tNumber || userData.t_number || '',
         mobile: userData.mobile || '',
         email: userData.email || '',
-        confirm_email: userData.confirmEmail || userData.email || ''
+        confirm_email: userData.confirmEmail || userData.email || '',
+        reservation_id: reservationRef.current
       };
 
       // Debug: Log the request data
@@ -36,11 +71,19 @@ const TorrentPowerAutomation = ({ userData, onComplete, onClose }) => {
       }
 
       const response = await api.post('/torrent-automation/start-automation', requestData);
+      // The job owns the pre-navigated browser now
+      reservationRef.current = null;
 
       console.log('✅ Automation request sent successfully');
       console.log('📥 Response received:', response.data);
 
-      const automationResult = response.data;
+      let automationResult = response.data;
+
+      // The backend queues the browser session - poll the job until it finishes
+      if (automationResult.job_id) {
+        setStatusMessage('Waiting for automation to finish...');
+        automationResult = await pollAutomationJob(automationResult.job_id);
+      }
 
       console.log('🔍 Debug - automation_details:', automationResult.automation_details);
       console.log('🔍 Debug - filled_fields:', automationResult.filled_fields);
@@ -72,7 +115,7 @@ const TorrentPowerAutomation = ({ userData, onComplete, onClose }) => {
         }
       } else {
         setAutomationStatus('failed');
-        setStatusMessage(`Automation failed: ${automationResult.message}`);
+        setStatusMessage(automationResult.timed_out ? automationResult.message : `Automation failed: ${automationResult.message}`);
         setResult(automationResult);
       }
 
@@ -102,6 +145,41 @@ const TorrentPowerAutomation = ({ userData, onComplete, onClose }) => {
     }
   };
 
+  const pollAutomationJob = async (jobId) => {
+    const deadline = Date.now() + JOB_POLL_MAX_WAIT_MS;
+    let failedPolls = 0;
+
+    while (Date.now() < deadline) {
+      await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+      let job;
+      try {
+        ({ data: job } = await api.get(`/torrent-automation/jobs/${jobId}`));
+        failedPolls = 0;
+      } catch (error) {
+        // Ride out brief network or server hiccups; give up once they persist
+        failedPolls += 1;
+        console.warn(`⚠️ Job status check ${failedPolls}/${JOB_POLL_MAX_FAILURES} failed:`, error);
+        if (failedPolls >= JOB_POLL_MAX_FAILURES || error.response?.status === 404) {
+          throw error;
+        }
+        continue;
+      }
+      console.log('🔄 Job status:', job.status);
+
+      if (job.finished) {
+        return job;
+      }
+      setStatusMessage(job.message);
+    }
+
+    return {
+      success: false,
+      timed_out: true,
+      message: `Automation is still running after ${JOB_POLL_MAX_WAIT_MS / 60000} minutes. It may finish in the background - check job #${jobId} again later.`,
+      job_id: jobId
+    };
+  };
+
   const openTorrentPowerManually = () => {
     // Store data in localStorage for potential auto-fill
     const torrentData = {